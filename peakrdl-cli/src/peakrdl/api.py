@@ -0,0 +1,388 @@
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Union, Sequence, Tuple, Hashable
+import os
+import time
+import argparse
+from collections import OrderedDict
+
+from systemrdl import RDLCompiler
+
+from .config.loader import load_cfg
+from .subcommand import ExporterSubcommand
+from .incindex import IncludeIndex
+from .output import OutputBackend
+from . import process_input
+from . import cache
+from .plugins import hooks
+
+if TYPE_CHECKING:
+    from systemrdl.node import RootNode, AddrmapNode
+    from .config.loader import AppConfig
+    from .plugins.importer import ImporterPlugin
+    from .subcommand import Subcommand
+
+
+def _get_defaults(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    """
+    Get a namespace containing the default value of each of the parser's
+    arguments, without parsing anything.
+    """
+    options = argparse.Namespace()
+    for action in parser._actions: # pylint: disable=protected-access
+        if action.dest != argparse.SUPPRESS:
+            setattr(options, action.dest, action.default)
+    for k, v in parser._defaults.items(): # pylint: disable=protected-access
+        setattr(options, k, v)
+    return options
+
+
+def _apply_options(options: argparse.Namespace, overrides: Dict[str, Any]) -> None:
+    for k, v in overrides.items():
+        if not hasattr(options, k):
+            raise TypeError(f"Unknown option '{k}'")
+        setattr(options, k, v)
+
+
+def _get_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class _StampedCache:
+    """
+    Values derived from the contents of files and directories, which are
+    reused for as long as the stamps of all of them are unchanged.
+
+    Adding or removing files changes the stamp of their directory, so a value
+    derived from directory listings is also invalidated by new files.
+    """
+    def __init__(self) -> None:
+        self._entries: Dict[Hashable, Tuple[List[Tuple[str, Optional[Tuple[int, int]]]], Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stamps, value = entry
+        for path, stamp in stamps:
+            if _get_stamp(path) != stamp:
+                del self._entries[key]
+                return None
+        return value
+
+    def set(self, key: Hashable, stamps: List[Tuple[str, Optional[Tuple[int, int]]]], value: Any) -> None:
+        self._entries[key] = (stamps, value)
+
+
+class _Design:
+    """
+    A compiled design, and the elaborated roots produced from it
+    """
+    def __init__(self, rdlc: RDLCompiler) -> None:
+        self.rdlc = rdlc
+        self.roots: 'OrderedDict[str, RootNode]' = OrderedDict()
+
+
+class Session:
+    """
+    An in-process PeakRDL session.
+
+    A session loads the PeakRDL configuration and plugins once, and keeps
+    a bounded cache of the most recently compiled and elaborated designs so
+    that repeated requests for the same design reuse earlier work.
+
+    Unlike the command line tool, errors are raised as exceptions rather than
+    exiting the process. Compile errors are reported to stderr and raise
+    ``systemrdl.RDLCompileError``.
+
+    Parameters
+    ----------
+    cfg_path: str
+        Path to a PeakRDL TOML configuration file. If not set, the
+        configuration file is discovered the same way as the command line tool.
+    cache_size: int
+        Maximum number of compiled designs to keep.
+    """
+    def __init__(self, cfg_path: Optional[str] = None, cache_size: int = 8) -> None:
+        # Deferred since the main module imports all built-in subcommands
+        from .main import load_plugins # pylint: disable=import-outside-toplevel
+
+        #: Loaded PeakRDL configuration
+        self.cfg: 'AppConfig' = load_cfg(cfg_path)
+
+        importers, subcommands = load_plugins(self.cfg)
+        #: Importer plugins
+        self.importers: 'List[ImporterPlugin]' = importers
+        #: All subcommands, keyed by name
+        self.subcommands: 'Dict[str, Subcommand]' = {sc.name: sc for sc in subcommands}
+
+        self.cache_size = cache_size
+        self._designs: 'OrderedDict[str, _Design]' = OrderedDict()
+
+        self._compile_parser = argparse.ArgumentParser(add_help=False)
+        process_input.add_rdl_compile_arguments(self._compile_parser)
+        process_input.add_elaborate_arguments(self._compile_parser)
+        process_input.add_importer_arguments(self._compile_parser, self.importers)
+        self._export_parsers: Dict[str, argparse.ArgumentParser] = {}
+
+        # Include closures and library file lists, so that checking whether a
+        # design is still up to date does not read unchanged files again
+        self._dependencies = _StampedCache()
+
+    @property
+    def exporters(self) -> List[str]:
+        """
+        Names of the available exporters
+        """
+        return [name for name, sc in self.subcommands.items() if isinstance(sc, ExporterSubcommand)]
+
+    def _get_exporter(self, name: str) -> ExporterSubcommand:
+        subcommand = self.subcommands.get(name)
+        if not isinstance(subcommand, ExporterSubcommand):
+            raise ValueError(f"Unknown exporter '{name}'")
+        return subcommand
+
+    def _get_compile_options(self, input_files: Sequence[str], incdirs: Optional[Sequence[str]], defines: Optional[Dict[str, str]], libdirs: Optional[Sequence[str]], importer_options: Dict[str, Any]) -> argparse.Namespace:
+        options = _get_defaults(self._compile_parser)
+        options.input_files = list(input_files)
+        options.incdirs = list(incdirs or [])
+        options.libdirs = list(libdirs or [])
+        options.defines = [f"{k}={v}" for k, v in (defines or {}).items()]
+        _apply_options(options, importer_options)
+        return options
+
+    def _get_library_files(self, libdirs: List[str]) -> List[str]:
+        """
+        Get all SystemRDL files in the library directories
+        """
+        key = ("libdirs", tuple(libdirs))
+        files: Optional[List[str]] = self._dependencies.get(key)
+        if files is None:
+            files = []
+            stamps = []
+            for libdir in libdirs:
+                for dirpath, dirnames, filenames in os.walk(os.path.realpath(libdir)):
+                    dirnames.sort()
+                    stamps.append((dirpath, _get_stamp(dirpath)))
+                    files.extend(
+                        os.path.join(dirpath, filename) for filename in sorted(filenames)
+                        if filename.endswith(".rdl")
+                    )
+            self._dependencies.set(key, stamps, files)
+        return files
+
+    def _get_include_closure(self, path: str, incdirs: List[str]) -> List[str]:
+        """
+        Get all files that a file may include. Only scanned again if the file,
+        any file it includes, or a directory an include may resolve from changed
+        """
+        key = ("includes", os.path.abspath(path), tuple(incdirs))
+        closure: Optional[List[str]] = self._dependencies.get(key)
+        if closure is None:
+            # Stamp the file before scanning it, so that a change during the
+            # scan is detected next time
+            watched = [path, os.path.dirname(os.path.abspath(path))] + incdirs
+            stamps = [(p, _get_stamp(p)) for p in watched]
+            closure = sorted(IncludeIndex(incdirs).get_include_closure(path))
+            for p in closure:
+                stamps.append((p, _get_stamp(p)))
+                stamps.append((os.path.dirname(p), _get_stamp(os.path.dirname(p))))
+            self._dependencies.set(key, stamps, closure)
+        return closure
+
+    def _get_compile_key(self, options: argparse.Namespace, importer_options: Dict[str, Any]) -> str:
+        # Changes to the input files, or any file they may include, invalidate
+        # previously compiled designs. Which library files get loaded depends
+        # on the contents of all of them, so every library file is stamped
+        files = list(options.input_files)
+        if options.libdirs:
+            files.extend(self._get_library_files(options.libdirs))
+
+        stamps = []
+        for path in files:
+            paths = [path]
+            if path.endswith(".rdl"):
+                paths.extend(self._get_include_closure(path, options.incdirs))
+            for p in paths:
+                stamp = _get_stamp(p)
+                if stamp is None:
+                    stamps.append([p, None, None])
+                else:
+                    stamps.append([os.path.realpath(p), stamp[0], stamp[1]])
+
+        return cache.hash_key(
+            stamps,
+            options.incdirs,
+            options.libdirs,
+            options.defines,
+            # Library files that get compiled depend on the requested top
+            options.top_def_names if options.libdirs else None,
+            # Importer options are not necessarily JSON-serializable
+            {k: repr(v) for k, v in importer_options.items()},
+        )
+
+    def _get_design(self, options: argparse.Namespace, importer_options: Dict[str, Any]) -> _Design:
+        key = self._get_compile_key(options, importer_options)
+        design = self._designs.get(key)
+        if design is not None:
+            self._designs.move_to_end(key)
+            return design
+
+        rdlc = RDLCompiler()
+
+        # Register UDPs of all exporters so that any of them can export
+        # the design
+        registered_udps = set()
+        for name in self.exporters:
+            for udp in self._get_exporter(name).udp_definitions:
+                if udp.name not in registered_udps:
+                    rdlc.register_udp(udp)
+                    registered_udps.add(udp.name)
+
+        process_input.process_input(rdlc, self.importers, options.input_files, options)
+
+        design = _Design(rdlc)
+        self._designs[key] = design
+        while len(self._designs) > self.cache_size:
+            self._designs.popitem(last=False)
+        return design
+
+    def compile(
+            self,
+            input_files: Union[str, Sequence[str]],
+            incdirs: Optional[Sequence[str]] = None,
+            defines: Optional[Dict[str, str]] = None,
+            libdirs: Optional[Sequence[str]] = None,
+            **importer_options: Any
+        ) -> RDLCompiler:
+        """
+        Compile input files, or return the previously compiled design if the
+        same inputs were already compiled.
+
+        Parameters
+        ----------
+        input_files:
+            One or more input files. Non-SystemRDL files are loaded using the
+            importer plugins.
+        incdirs:
+            Include search directories
+        defines:
+            Preprocessor macro definitions
+        libdirs:
+            SystemRDL library directories
+        importer_options:
+            Values of importer-specific options, using the same names as their
+            command line argument destinations.
+
+        Returns
+        -------
+        ``systemrdl.RDLCompiler``
+            Compiler instance containing the compiled design. It shall not be
+            used to compile more files.
+        """
+        if isinstance(input_files, str):
+            input_files = [input_files]
+        options = self._get_compile_options(input_files, incdirs, defines, libdirs, importer_options)
+        return self._get_design(options, importer_options).rdlc
+
+    def elaborate(
+            self,
+            input_files: Union[str, Sequence[str]],
+            top: Optional[str] = None,
+            inst_name: Optional[str] = None,
+            parameters: Optional[Dict[str, Any]] = None,
+            incdirs: Optional[Sequence[str]] = None,
+            defines: Optional[Dict[str, str]] = None,
+            libdirs: Optional[Sequence[str]] = None,
+            **importer_options: Any
+        ) -> 'RootNode':
+        """
+        Compile and elaborate input files.
+
+        Compilation is shared with :meth:`compile`, and elaborated designs are
+        also reused if the same top, instance name and parameters are requested
+        again.
+
+        Parameters
+        ----------
+        top:
+            Name of the addrmap to elaborate. Defaults to the last one that was
+            defined.
+        inst_name:
+            Override the top-level instance name.
+        parameters:
+            Top-level parameter values, keyed by parameter name.
+
+        See :meth:`compile` for the remaining parameters.
+        """
+        if isinstance(input_files, str):
+            input_files = [input_files]
+        options = self._get_compile_options(input_files, incdirs, defines, libdirs, importer_options)
+        options.top_def_name = top
+        options.top_def_names = [top] if top else []
+        design = self._get_design(options, importer_options)
+
+        key = repr((top, inst_name, sorted((parameters or {}).items())))
+        root = design.roots.get(key)
+        if root is not None:
+            design.roots.move_to_end(key)
+            return root
+
+        hooks.dispatch("pre_elaborate", top)
+        t_start = time.perf_counter()
+        root = design.rdlc.elaborate(
+            top_def_name=top,
+            inst_name=inst_name,
+            parameters=parameters or {},
+        )
+        hooks.dispatch("post_elaborate", root.top, time.perf_counter() - t_start)
+        design.roots[key] = root
+        while len(design.roots) > self.cache_size:
+            design.roots.popitem(last=False)
+        return root
+
+    def export(self, name: str, node: 'AddrmapNode', **options: Any) -> None:
+        """
+        Export a node using an exporter plugin.
+
+        Parameters
+        ----------
+        name:
+            Name of the exporter, as used on the command line.
+        node:
+            Top-level addrmap node to export.
+        options:
+            Values of the exporter's options, using the same names as its
+            command line argument destinations. For example, ``output``.
+            Unspecified options use their command line defaults.
+
+            If the exporter supports output backends, ``output`` can also be an
+            :class:`~peakrdl.output.OutputBackend`, such as a
+            :class:`~peakrdl.output.MemoryOutput`.
+        """
+        exporter = self._get_exporter(name)
+
+        output_backend = options.get("output")
+        if isinstance(output_backend, OutputBackend):
+            if not exporter.supports_output_backend:
+                raise ValueError(f"Exporter '{name}' does not support output backends")
+            options = dict(options, output=output_backend.name)
+        else:
+            output_backend = None
+
+        parser = self._export_parsers.get(name)
+        if parser is None:
+            parser = argparse.ArgumentParser(add_help=False)
+            exporter.add_arguments(parser, self.importers)
+            self._export_parsers[name] = parser
+
+        export_options = _get_defaults(parser)
+        _apply_options(export_options, options)
+        export_options.subcommand = exporter
+        export_options.output_backend = output_backend
+        if exporter.generates_output_file and export_options.output is None:
+            raise ValueError(f"Exporter '{name}' requires an 'output' option")
+
+        exporter._run_export(node, export_options) # pylint: disable=protected-access
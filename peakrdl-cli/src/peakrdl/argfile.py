@@ -2,8 +2,11 @@ import sys
 import os
 import shlex
 import re
+import hashlib
 from typing import List, Optional, Set, Match
 
+from . import cache
+
 def expand_tokens(argv: List[str], path: str) -> List[str]:
     """
     Expand environment variables in args
@@ -41,9 +44,16 @@ def parse_argfile(path: str) -> List[str]:
         sys.exit(1)
 
     with open(path, "r", encoding='utf-8') as f:
-        args = shlex.split(f.read(), comments=True)
-        args = expand_tokens(args, path)
-        return args
+        s = f.read()
+
+    if "${{this_dir}}" in s:
+        # Paths relative to the argfile are the same wherever it is checked
+        # out, so cache keys can refer to them relative to its directory
+        cache.add_argfile_anchor(path, hashlib.sha256(s.encode("utf-8")).hexdigest())
+
+    args = shlex.split(s, comments=True)
+    args = expand_tokens(args, path)
+    return args
 
 
 def expand_argfile(argv: List[str], _pathlist: Optional[Set[str]] = None) -> List[str]:
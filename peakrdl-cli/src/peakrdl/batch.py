@@ -0,0 +1,518 @@
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import contextlib
+import io
+from collections import OrderedDict
+
+from systemrdl import RDLCompiler, RDLCompileError
+from systemrdl.messages import MessageHandler, MessagePrinter
+
+from .config import schema
+from .subcommand import ExporterSubcommand
+from . import process_input
+from . import stats
+from .incindex import IncludeIndex
+from .plugins import hooks
+
+if sys.version_info[0:2] < (3, 11):
+    import tomli as tomllib
+else:
+    import tomllib
+
+if TYPE_CHECKING:
+    from systemrdl.node import RootNode
+    from .plugins.importer import ImporterPlugin
+    from .subcommand import Subcommand
+
+
+MANIFEST_SCHEMA = schema.normalize({
+    "jobs": [{
+        "name": schema.String(),
+        "inputs": [schema.FilePath(shall_exist=False)],
+        "incdirs": [schema.DirectoryPath(shall_exist=False)],
+        "defines": [schema.String()],
+        "parameters": [schema.String()],
+        "top": schema.String(),
+        "rename": schema.String(),
+        "args": [schema.String()],
+        "exports": [{
+            "exporter": schema.String(),
+            "output": schema.Path(shall_exist=False),
+            "args": [schema.String()],
+        }],
+    }],
+})
+
+
+class Job:
+    """
+    A single job from a batch manifest.
+
+    A job describes one design, and one or more exports of that design.
+    Jobs that share the same compile inputs are grouped so that their design
+    is compiled and elaborated only once.
+    """
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.spec = spec
+        self.name: str = spec["name"]
+
+    @property
+    def compile_argv(self) -> List[str]:
+        """
+        Command-line arguments that determine the elaborated design
+        """
+        argv = list(self.spec["inputs"])
+        for incdir in self.spec["incdirs"]:
+            argv.extend(["-I", incdir])
+        for define in self.spec["defines"]:
+            argv.extend(["-D", define])
+        for param in self.spec["parameters"]:
+            argv.extend(["-P", param])
+        if self.spec["top"] is not None:
+            argv.extend(["--top", self.spec["top"]])
+        if self.spec["rename"] is not None:
+            argv.extend(["--rename", self.spec["rename"]])
+        argv.extend(self.spec["args"])
+        return argv
+
+    @property
+    def compile_key(self) -> str:
+        """
+        Jobs that have identical compile keys share the same elaborated design.
+        """
+        return json.dumps(self.compile_argv)
+
+    @property
+    def spec_hash(self) -> str:
+        """
+        Hash of the job's full specification.
+        Used to detect whether a job from a previous run can be resumed.
+        """
+        s = json.dumps(self.spec, sort_keys=True)
+        return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+    def get_export_argvs(self) -> List[List[str]]:
+        """
+        Full command-line for each of the job's exports
+        """
+        argvs = []
+        for export in self.spec["exports"]:
+            argv = [export["exporter"]] + self.compile_argv
+            if export["output"] is not None:
+                argv.extend(["-o", export["output"]])
+            argv.extend(export["args"])
+            argvs.append(argv)
+        return argvs
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.spec)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> 'Job':
+        return cls(d)
+
+
+def load_manifest(path: str) -> List[Job]:
+    """
+    Load a batch manifest TOML file.
+
+    Raises a ValueError if the manifest is invalid.
+    """
+    if not os.path.isfile(path):
+        raise ValueError(f"error: manifest file not found: {path}")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        s = f.read()
+    try:
+        raw_data = tomllib.loads(s)
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"{path}: error: {str(e)}") from e
+
+    try:
+        data = MANIFEST_SCHEMA.extract(raw_data, os.path.abspath(path), "")
+    except schema.SchemaException as e:
+        raise ValueError(f"{path}: error: {str(e)}") from e
+
+    jobs = []
+    names = set()
+    for i, spec in enumerate(data["jobs"]):
+        if spec["name"] is None:
+            spec["name"] = f"job{i}"
+        if spec["name"] in names:
+            raise ValueError(f"{path}: error: jobs[{i}]: Duplicate job name '{spec['name']}'")
+        names.add(spec["name"])
+        if not spec["inputs"]:
+            raise ValueError(f"{path}: error: jobs[{i}]: Job '{spec['name']}' does not specify any inputs")
+        if not spec["exports"]:
+            raise ValueError(f"{path}: error: jobs[{i}]: Job '{spec['name']}' does not specify any exports")
+        for j, export in enumerate(spec["exports"]):
+            if export["exporter"] is None:
+                raise ValueError(f"{path}: error: jobs[{i}].exports[{j}]: Missing 'exporter'")
+        jobs.append(Job(spec))
+    return jobs
+
+
+def group_jobs(jobs: List[Job]) -> List[List[Job]]:
+    """
+    Group jobs that share the same compile key, preserving manifest order.
+    """
+    groups: Dict[str, List[Job]] = OrderedDict()
+    for job in jobs:
+        groups.setdefault(job.compile_key, []).append(job)
+    return list(groups.values())
+
+
+#-------------------------------------------------------------------------------
+# Job execution
+#-------------------------------------------------------------------------------
+class BatchContext:
+    """
+    Loaded plugins and argument parser used to run jobs.
+    One is created per process.
+    """
+    def __init__(self, importers: 'List[ImporterPlugin]', subcommands: 'List[Subcommand]', parser: argparse.ArgumentParser) -> None:
+        self.importers = importers
+        self.subcommands = subcommands
+        self.parser = parser
+
+    @classmethod
+    def from_cfg_path(cls, cfg_path: Optional[str]) -> 'BatchContext':
+        # Deferred since the main module imports all built-in subcommands
+        from .main import load_plugins, get_arg_parser # pylint: disable=import-outside-toplevel
+        from .config.loader import load_cfg # pylint: disable=import-outside-toplevel
+        cfg = load_cfg(cfg_path)
+        importers, subcommands = load_plugins(cfg)
+        parser = get_arg_parser(cfg, importers, subcommands)
+        return cls(importers, subcommands, parser)
+
+    def parse_export_argv(self, argv: List[str]) -> argparse.Namespace:
+        """
+        Parse an export's command-line.
+
+        Raises a ValueError if the arguments are invalid.
+        """
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            try:
+                options = self.parser.parse_args(argv)
+            except SystemExit as e:
+                raise ValueError(err.getvalue().strip() or f"Invalid arguments: {argv}") from e
+        if not isinstance(options.subcommand, ExporterSubcommand):
+            raise ValueError(f"'{options.subcommand.name}' is not an exporter")
+        return options
+
+
+def get_compile_signature(options: argparse.Namespace, importers: 'List[ImporterPlugin]') -> Tuple:
+    """
+    Options that determine the compiled design, other than defines.
+    All exports of a job group shall share the same signature.
+    """
+    libdirs = tuple(options.libdirs)
+    return (
+        tuple(options.input_files),
+        tuple(options.incdirs or []),
+        libdirs,
+        # Which library files are loaded depends on the tops
+        tuple(options.top_def_names) if libdirs else (),
+        # Importer options are not necessarily hashable
+        tuple(
+            (importer.name, repr(sorted(importer.get_import_cache_options(options).items())))
+            for importer in importers
+        ),
+    )
+
+
+def get_input_files(options: argparse.Namespace) -> List[str]:
+    """
+    Files that a design compiled with the given options may depend on: the
+    input files, all files they may include, and all library files.
+    """
+    inc_index = IncludeIndex(options.incdirs or [])
+    files = set()
+    for path in options.input_files:
+        files.add(os.path.realpath(path))
+        if path.endswith(".rdl"):
+            files.update(inc_index.get_include_closure(path))
+    for libdir in options.libdirs:
+        for dirpath, dirnames, filenames in os.walk(os.path.realpath(libdir)):
+            dirnames.sort()
+            files.update(
+                os.path.join(dirpath, filename) for filename in filenames
+                if filename.endswith(".rdl")
+            )
+    return sorted(files)
+
+
+def get_input_fingerprint(paths: List[str]) -> str:
+    """
+    Hash of the paths and contents of files. Files that cannot be read are
+    hashed as missing.
+    """
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            digest = "missing"
+        h.update(f"{path}\0{digest}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class _GroupDesigns:
+    """
+    Designs that are compiled and elaborated for a group of jobs.
+    Each unique set of defines is compiled once, and each unique target
+    elaborated once, no matter how many exports use it.
+    """
+    def __init__(self, ctx: 'BatchContext', compile_options: argparse.Namespace, udp_definitions: List[Any]) -> None:
+        self.ctx = ctx
+        self.compile_options = compile_options
+        self.udp_definitions = udp_definitions
+        self.compiled: Dict[Tuple[str, ...], RDLCompiler] = {}
+        self.elaborated: Dict[Tuple, 'RootNode'] = {}
+
+        #: Time spent compiling and elaborating by the last call of each
+        self.compile_time = 0.0
+        self.elaborate_time = 0.0
+
+    def compile(self, defines: Tuple[str, ...]) -> RDLCompiler:
+        self.compile_time = 0.0
+        rdlc = self.compiled.get(defines)
+        if rdlc is None:
+            t_start = time.perf_counter()
+            rdlc = RDLCompiler()
+            for udp in self.udp_definitions:
+                rdlc.register_udp(udp)
+            compile_options = argparse.Namespace(**vars(self.compile_options))
+            compile_options.defines = list(defines)
+            process_input.process_input(rdlc, self.ctx.importers, compile_options.input_files, compile_options)
+            self.compiled[defines] = rdlc
+            self.compile_time = time.perf_counter() - t_start
+        return rdlc
+
+    def elaborate(self, rdlc: RDLCompiler, target_options: argparse.Namespace) -> 'RootNode':
+        self.elaborate_time = 0.0
+        key = (
+            tuple(target_options.defines), target_options.top_def_name,
+            target_options.inst_name, tuple(target_options.parameters),
+        )
+        root = self.elaborated.get(key)
+        if root is None:
+            t_start = time.perf_counter()
+            parameters = process_input.parse_parameters(rdlc, target_options.parameters)
+            hooks.dispatch("pre_elaborate", target_options.top_def_name)
+            root = rdlc.elaborate(
+                top_def_name=target_options.top_def_name,
+                inst_name=target_options.inst_name,
+                parameters=parameters
+            )
+            self.elaborate_time = time.perf_counter() - t_start
+            hooks.dispatch("post_elaborate", root.top, self.elaborate_time)
+            self.elaborated[key] = root
+        return root
+
+
+def run_export(designs: _GroupDesigns, options: argparse.Namespace) -> Tuple[float, float]:
+    """
+    Run one export, including any tops and variants it sweeps over.
+    Returns the time spent compiling and elaborating for it.
+    """
+    subcommand = options.subcommand
+    cfg_variants = {}
+    if subcommand.app_cfg is not None:
+        cfg_variants = subcommand.app_cfg.peakrdl_cfg['variants']
+    variants = process_input.get_variants(MessageHandler(MessagePrinter()), options, cfg_variants)
+
+    variant_groups: Dict[Tuple[str, ...], List[process_input.Variant]] = {}
+    for variant in variants:
+        variant_groups.setdefault(tuple(variant.defines), []).append(variant)
+
+    compile_time = 0.0
+    elaborate_time = 0.0
+    outputs: List[argparse.Namespace] = []
+    for defines, group in variant_groups.items():
+        rdlc = designs.compile(defines)
+        compile_time += designs.compile_time
+
+        targets = process_input.get_elaborate_targets(rdlc, options, group)
+        target_options = [target.get_options(options) for target in targets]
+        outputs.extend(target_options)
+        process_input.check_unique_outputs(rdlc.msg, outputs)
+
+        for t_options in target_options:
+            root = designs.elaborate(rdlc, t_options)
+            elaborate_time += designs.elaborate_time
+            top_node = process_input.scope_design(rdlc.msg, root, t_options)
+            stats.check_limits(rdlc.msg, top_node, t_options)
+            subcommand._run_export(top_node, t_options) # pylint: disable=protected-access
+    return compile_time, elaborate_time
+
+
+def run_job_group(ctx: BatchContext, jobs: List[Job]) -> List[Dict[str, Any]]:
+    """
+    Compile and elaborate the design shared by a group of jobs once, then run
+    all of their exports.
+
+    Exports are expanded into their tops and variants the same way as on the
+    command line. Each unique set of defines is compiled once, and each
+    unique top and set of parameters is elaborated once.
+
+    Returns a result record for each job.
+    """
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[Job, Dict[str, Any], List[argparse.Namespace]]] = []
+
+    # Parse all export command lines first
+    signature = None
+    for job in jobs:
+        result: Dict[str, Any] = {
+            "name": job.name,
+            "spec_hash": job.spec_hash,
+            "status": "ok",
+            "compile_time": 0.0,
+            "elaborate_time": 0.0,
+            "elapsed": 0.0,
+            "exports": [],
+        }
+        results.append(result)
+        try:
+            export_options = [ctx.parse_export_argv(argv) for argv in job.get_export_argvs()]
+            for options in export_options:
+                if signature is None:
+                    signature = get_compile_signature(options, ctx.importers)
+                elif get_compile_signature(options, ctx.importers) != signature:
+                    raise ValueError(
+                        f"Export '{options.subcommand.name}' changes the input files, "
+                        "include directories, library directories or importer "
+                        "options that the job's design is compiled with. "
+                        "Describe it in a separate job"
+                    )
+        except ValueError as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            continue
+        pending.append((job, result, export_options))
+
+    if not pending:
+        return results
+
+    udp_definitions = []
+    registered_udps = set()
+    for _, _, export_options in pending:
+        for options in export_options:
+            for udp in options.subcommand.udp_definitions:
+                if udp.name not in registered_udps:
+                    udp_definitions.append(udp)
+                    registered_udps.add(udp.name)
+    designs = _GroupDesigns(ctx, pending[0][2][0], udp_definitions)
+
+    # Fingerprint the inputs before they are compiled, so that changes made
+    # during the run are detected when resuming
+    input_files = get_input_files(designs.compile_options)
+    input_fingerprint = get_input_fingerprint(input_files)
+
+    # Run all exports
+    for _, result, export_options in pending:
+        result["input_files"] = input_files
+        result["input_fingerprint"] = input_fingerprint
+        t_job = time.perf_counter()
+        for options in export_options:
+            export_result: Dict[str, Any] = {
+                "exporter": options.subcommand.name,
+                "output": getattr(options, "output", None),
+                "status": "ok",
+            }
+            t_export = time.perf_counter()
+            try:
+                compile_time, elaborate_time = run_export(designs, options)
+                result["compile_time"] += compile_time
+                result["elaborate_time"] += elaborate_time
+            except Exception as e: # pylint: disable=broad-except
+                export_result["status"] = "failed"
+                if isinstance(e, RDLCompileError):
+                    export_result["error"] = str(e) or "Compile failed"
+                else:
+                    export_result["error"] = f"{type(e).__name__}: {e}"
+                result["status"] = "failed"
+                result.setdefault("error", export_result["error"])
+            export_result["elapsed"] = time.perf_counter() - t_export
+            result["exports"].append(export_result)
+        result["elapsed"] = time.perf_counter() - t_job
+
+    return results
+
+
+# Per-process context when running jobs in a process pool
+_worker_ctx: Optional[BatchContext] = None
+
+def _init_worker(cfg_path: Optional[str]) -> None:
+    global _worker_ctx # pylint: disable=global-statement
+    _worker_ctx = BatchContext.from_cfg_path(cfg_path)
+
+def _run_job_group_in_worker(job_dicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    assert _worker_ctx is not None
+    jobs = [Job.from_dict(d) for d in job_dicts]
+    return run_job_group(_worker_ctx, jobs)
+
+
+#-------------------------------------------------------------------------------
+# Reports
+#-------------------------------------------------------------------------------
+def load_report(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the job results of a previous run, keyed by job name
+    """
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {result["name"]: result for result in data.get("jobs", [])}
+
+
+def write_report(path: str, manifest_path: str, results: List[Dict[str, Any]], elapsed: float) -> None:
+    data = {
+        "manifest": os.path.abspath(manifest_path),
+        "elapsed": elapsed,
+        "jobs": results,
+    }
+    # Write atomically so that an interrupted run leaves a usable report
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def get_unit_id(jobs: List[Job]) -> str:
+    """
+    Stable identifier of a group of jobs when distributed via a work queue
+    """
+    s = json.dumps([job.spec for job in jobs], sort_keys=True)
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
+
+
+def get_abandoned_results(jobs: List[Job], attempts: int) -> List[Dict[str, Any]]:
+    """
+    Failed result records for a group of jobs that could not be completed
+    """
+    return [
+        {
+            "name": job.name,
+            "spec_hash": job.spec_hash,
+            "status": "failed",
+            "error": f"Abandoned after {attempts} attempts",
+            "compile_time": 0.0,
+            "elaborate_time": 0.0,
+            "elapsed": 0.0,
+            "exports": [],
+        }
+        for job in jobs
+    ]
@@ -0,0 +1,356 @@
+from typing import Optional, Any, Dict, List, Tuple
+import os
+import re
+import json
+import hmac
+import hashlib
+import zipfile
+
+# Overrides the default cache location. Set from the PeakRDL config's
+# 'cache_dir' option
+_cache_dir: Optional[str] = None
+
+# Number of hits and misses of each cache namespace during this process
+_stats: Dict[str, Dict[str, int]] = {}
+
+# Directories that paths in cache keys are made relative to. Set from the
+# PeakRDL config's 'project_roots' option. If empty, the current working
+# directory is used.
+_project_roots: List[str] = []
+
+# File containing the secret key that authenticates cache archives. Set from
+# the PeakRDL config's 'cache_archive_key' option
+_archive_key_path: Optional[str] = None
+
+# Argfiles whose ${{this_dir}} was expanded -> digest of their contents
+_argfiles: Dict[str, str] = {}
+
+# Namespaces that can be shared between machines through cache archives, and
+# the extension of their entries.
+# Library indexes validate each file by its contents, and importer results are
+# keyed by the contents of the imported file, so both give hits in a fresh
+# checkout. Other namespaces are never shared:
+# - Include directory listings, since they can only be validated by the
+#   directory's modification time, which differs in every checkout
+# - Incremental export state, which refers to outputs in one particular checkout
+ARCHIVE_NAMESPACES = {
+    "libindex": ".json",
+    "imports": ".pickle",
+}
+
+# Namespaces whose entries are only shared through archives that are signed
+# with the archive key. Pickled importer results run arbitrary code when they
+# are loaded, so they must not be accepted from an archive of unknown origin.
+SIGNED_NAMESPACES = ("imports",)
+
+# Matches the relative path of a cache entry that may be stored in an archive
+ARCHIVE_ENTRY_REGEX = re.compile("|".join(
+    r"%s/[0-9a-f]{64}%s" % (namespace, re.escape(ext))
+    for namespace, ext in ARCHIVE_NAMESPACES.items()
+))
+
+# Name of the archive member that holds the signature of all other members
+ARCHIVE_SIGNATURE_NAME = "SIGNATURE"
+
+def set_cache_dir(path: Optional[str]) -> None:
+    global _cache_dir # pylint: disable=global-statement
+    _cache_dir = path
+
+
+def set_archive_key_path(path: Optional[str]) -> None:
+    global _archive_key_path # pylint: disable=global-statement
+    _archive_key_path = path
+
+
+def get_archive_key() -> Optional[bytes]:
+    """
+    Get the secret key that cache archives are signed with, if one is configured.
+
+    Raises OSError if the configured key file cannot be read.
+    """
+    if _archive_key_path is not None:
+        with open(_archive_key_path, "rb") as f:
+            key = f.read().strip()
+    else:
+        key = os.environ.get("PEAKRDL_CACHE_ARCHIVE_KEY", "").encode("utf-8")
+    return key or None
+
+
+def set_project_roots(paths: List[str]) -> None:
+    _project_roots[:] = [os.path.abspath(path) for path in paths]
+
+
+def add_argfile_anchor(path: str, content_digest: str) -> None:
+    """
+    Register an argfile whose directory paths outside of the project roots can
+    be made relative to
+    """
+    _argfiles.setdefault(os.path.abspath(path), content_digest)
+
+
+def _get_anchors() -> List[List[str]]:
+    roots = _project_roots or [os.getcwd()]
+    anchors = [[root, f"${{{{project_root{i}}}}}"] for i, root in enumerate(roots)]
+    argfile_dirs = set()
+    for path, content_digest in _argfiles.items():
+        if os.path.dirname(path) in argfile_dirs:
+            continue
+        argfile_dirs.add(os.path.dirname(path))
+        # Identify the argfile's directory by the argfile's location relative
+        # to the project root, and its contents. Both are the same in every
+        # checkout, but differ between argfiles in other directories.
+        try:
+            location = os.path.relpath(path, roots[0]).replace(os.sep, "/")
+        except ValueError:
+            # On a different drive than the project root
+            location = path
+        digest = hashlib.sha256(f"{location}\n{content_digest}".encode("utf-8")).hexdigest()[:16]
+        anchors.append([os.path.dirname(path), f"${{{{this_dir:{digest}}}}}"])
+    return anchors
+
+
+def portable_path(path: str) -> str:
+    """
+    Express a path relative to the project root, or another anchor directory, so
+    that it is the same in every checkout of the project.
+    Paths outside of all anchors are returned as absolute paths.
+    """
+    path = os.path.abspath(path)
+    for anchor, name in _get_anchors():
+        if path == anchor or path.startswith(anchor.rstrip(os.sep) + os.sep):
+            rel_path = os.path.relpath(path, anchor).replace(os.sep, "/")
+            return f"{name}/{rel_path}"
+    return path
+
+
+def resolve_path(path: str) -> str:
+    """
+    Resolve a path that was returned by portable_path()
+    """
+    for anchor, name in _get_anchors():
+        if path.startswith(name + "/"):
+            return os.path.normpath(os.path.join(anchor, path[len(name) + 1:]))
+    return path
+
+
+def make_portable(value: Any) -> Any:
+    """
+    Replace any absolute paths in a value, or in the lists, tuples and dicts it
+    contains, with portable paths
+    """
+    if isinstance(value, str):
+        if os.path.isabs(value):
+            return portable_path(value)
+        return value
+    if isinstance(value, (list, tuple)):
+        return type(value)(make_portable(v) for v in value)
+    if isinstance(value, dict):
+        return {k: make_portable(v) for k, v in value.items()}
+    return value
+
+
+def get_cache_dir() -> str:
+    """
+    Get the root directory of PeakRDL's persistent caches
+    """
+    if _cache_dir is not None:
+        return _cache_dir
+    if "PEAKRDL_CACHE_DIR" in os.environ:
+        return os.environ["PEAKRDL_CACHE_DIR"]
+    xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(xdg_cache, "peakrdl")
+
+
+def hash_key(*parts: Any) -> str:
+    """
+    Compute a cache key from a sequence of JSON-serializable parts
+    """
+    s = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+def get_path(namespace: str, key: str, ext: str = ".json") -> str:
+    """
+    Get the path of a cache entry
+    """
+    return os.path.join(get_cache_dir(), namespace, key + ext)
+
+
+def _load(namespace: str, key: str, ext: str, mode: str) -> Optional[Any]:
+    stats = _stats.setdefault(namespace, {"hits": 0, "misses": 0})
+    try:
+        if mode == "b":
+            with open(get_path(namespace, key, ext), "rb") as fb:
+                data: Any = fb.read()
+        else:
+            with open(get_path(namespace, key, ext), "r", encoding="utf-8") as f:
+                data = json.load(f)
+    except (OSError, ValueError):
+        stats["misses"] += 1
+        return None
+    stats["hits"] += 1
+    return data
+
+
+def _save(namespace: str, key: str, ext: str, data: bytes) -> None:
+    path = get_path(namespace, key, ext)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def load_json(namespace: str, key: str) -> Optional[Any]:
+    """
+    Load a JSON cache entry.
+    Returns None if the entry does not exist or is unreadable.
+    """
+    return _load(namespace, key, ".json", "t")
+
+
+def save_json(namespace: str, key: str, data: Any) -> None:
+    """
+    Save a JSON cache entry.
+    Caching is best-effort. Failures to write are silently ignored.
+    """
+    _save(namespace, key, ".json", json.dumps(data).encode("utf-8"))
+
+
+def delete(namespace: str, key: str, ext: str = ".json") -> None:
+    """
+    Delete a cache entry, if it exists.
+    Failures to delete are silently ignored.
+    """
+    try:
+        os.remove(get_path(namespace, key, ext))
+    except OSError:
+        pass
+
+
+def load_bytes(namespace: str, key: str, ext: str = ".bin") -> Optional[bytes]:
+    """
+    Load a binary cache entry.
+    Returns None if the entry does not exist or is unreadable.
+    """
+    return _load(namespace, key, ext, "b")
+
+
+def save_bytes(namespace: str, key: str, data: bytes, ext: str = ".bin") -> None:
+    """
+    Save a binary cache entry.
+    Caching is best-effort. Failures to write are silently ignored.
+    """
+    _save(namespace, key, ext, data)
+
+
+def get_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get the number of hits and misses of each cache namespace since the last
+    call to reset_stats()
+    """
+    return {namespace: dict(stats) for namespace, stats in _stats.items()}
+
+
+def reset_stats() -> None:
+    _stats.clear()
+
+
+def _sign_archive(key: bytes, members: Dict[str, bytes]) -> str:
+    """
+    Compute the signature of the members of an archive
+    """
+    digests = sorted(
+        [name, hashlib.sha256(data).hexdigest()]
+        for name, data in members.items()
+    )
+    return hmac.new(key, json.dumps(digests).encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def export_archive(path: str, namespaces: Optional[List[str]] = None, key: Optional[bytes] = None) -> int:
+    """
+    Pack the entries of all shareable cache namespaces, or of the given ones,
+    into a zip archive.
+
+    If a key is given, the archive is signed with it. Entries of signed
+    namespaces are only exported into signed archives.
+    Returns the number of entries that were exported.
+
+    Raises ValueError if a signed namespace is requested without a key.
+    """
+    if namespaces is None:
+        namespaces = [
+            namespace for namespace in ARCHIVE_NAMESPACES
+            if key is not None or namespace not in SIGNED_NAMESPACES
+        ]
+    elif key is None:
+        for namespace in namespaces:
+            if namespace in SIGNED_NAMESPACES:
+                raise ValueError(f"Entries of namespace '{namespace}' can only be exported into signed archives, but no cache archive key is configured")
+
+    cache_dir = get_cache_dir()
+    members: Dict[str, bytes] = {}
+    for namespace in ARCHIVE_NAMESPACES:
+        if namespace not in namespaces:
+            continue
+        ns_dir = os.path.join(cache_dir, namespace)
+        if not os.path.isdir(ns_dir):
+            continue
+        for filename in sorted(os.listdir(ns_dir)):
+            name = f"{namespace}/{filename}"
+            if ARCHIVE_ENTRY_REGEX.fullmatch(name):
+                with open(os.path.join(ns_dir, filename), "rb") as f:
+                    members[name] = f.read()
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+        if key is not None:
+            zf.writestr(ARCHIVE_SIGNATURE_NAME, _sign_archive(key, members))
+    return len(members)
+
+
+def import_archive(path: str, key: Optional[bytes] = None) -> Tuple[int, int]:
+    """
+    Unpack the entries of an archive created by export_archive() into the cache.
+    Existing entries with the same key are replaced.
+
+    Entries of signed namespaces are only imported if the archive's signature
+    matches the given key. Otherwise they are skipped.
+    Returns the number of entries that were imported and skipped.
+
+    Raises ValueError if the archive is signed, but its signature does not match
+    the key.
+    """
+    with zipfile.ZipFile(path, "r") as zf:
+        # Ignore anything that is not a shareable cache entry, and paths that
+        # would be outside of the cache directory
+        members = {
+            name: zf.read(name) for name in zf.namelist()
+            if ARCHIVE_ENTRY_REGEX.fullmatch(name)
+        }
+        signature: Optional[bytes] = None
+        if ARCHIVE_SIGNATURE_NAME in zf.namelist():
+            signature = zf.read(ARCHIVE_SIGNATURE_NAME).strip()
+
+    authenticated = False
+    if key is not None and signature is not None:
+        expected = _sign_archive(key, members).encode("utf-8")
+        if not hmac.compare_digest(signature, expected):
+            raise ValueError("Cache archive signature does not match the configured cache archive key")
+        authenticated = True
+
+    count = 0
+    skipped = 0
+    for name, data in members.items():
+        namespace, filename = name.split("/")
+        if namespace in SIGNED_NAMESPACES and not authenticated:
+            skipped += 1
+            continue
+        key_name, ext = os.path.splitext(filename)
+        _save(namespace, key_name, ext, data)
+        count += 1
+    return count, skipped
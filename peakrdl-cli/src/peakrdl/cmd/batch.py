@@ -0,0 +1,169 @@
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ..subcommand import Subcommand
+from ..work_queue import WorkQueue
+from .. import batch
+
+if TYPE_CHECKING:
+    import argparse
+    from ..plugins.importer import ImporterPlugin
+
+
+class Batch(Subcommand):
+    name = "batch"
+    short_desc = "run many export jobs described by a manifest file"
+    long_desc = (
+        "Run the export jobs described by a TOML manifest file. "
+        "Jobs that share identical compile inputs are compiled and elaborated "
+        "only once, and independent jobs are distributed across a pool of "
+        "worker processes."
+    )
+
+    @property
+    def cfg_path(self) -> Optional[str]:
+        if self.app_cfg is None:
+            return None
+        return self.app_cfg.path or None
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        grp = parser.add_argument_group("batch args")
+        grp.add_argument(
+            "manifest",
+            help="Batch manifest TOML file"
+        )
+        grp.add_argument(
+            "-j", "--jobs",
+            dest="jobs",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (default: number of CPUs)"
+        )
+        grp.add_argument(
+            "--report",
+            dest="report",
+            default=None,
+            help="Path to write the per-job status/timing report JSON. "
+                "Defaults to the manifest's path with a '.report.json' extension"
+        )
+        grp.add_argument(
+            "--resume",
+            default=False,
+            action="store_true",
+            help="Skip jobs that completed successfully in a previous run, as "
+                "recorded in the report file"
+        )
+        grp.add_argument(
+            "--queue",
+            dest="queue",
+            metavar="DIR",
+            default=None,
+            help="Instead of running jobs locally, place them in a shared-directory "
+                "work queue to be processed by one or more 'peakrdl worker' processes"
+        )
+        grp.add_argument(
+            "--no-wait",
+            dest="wait",
+            default=True,
+            action="store_false",
+            help="When using --queue, exit once jobs are queued instead of "
+                "waiting for their results"
+        )
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        try:
+            jobs = batch.load_manifest(options.manifest)
+        except ValueError as e:
+            print(e.args[0], file=sys.stderr)
+            sys.exit(1)
+
+        report_path = options.report or (os.path.splitext(options.manifest)[0] + ".report.json")
+
+        # Carry over results from the previous run
+        results: Dict[str, Dict[str, Any]] = {}
+        if options.resume:
+            prev_results = batch.load_report(report_path)
+            todo = []
+            fingerprints: Dict[Tuple[str, ...], str] = {}
+            for job in jobs:
+                prev = prev_results.get(job.name)
+                if prev and prev["status"] == "ok" and prev["spec_hash"] == job.spec_hash:
+                    # Input files, or files they include, may have been edited
+                    input_files = tuple(prev.get("input_files", ()))
+                    if input_files not in fingerprints:
+                        fingerprints[input_files] = batch.get_input_fingerprint(list(input_files))
+                    if prev.get("input_fingerprint") != fingerprints[input_files]:
+                        todo.append(job)
+                        continue
+                    prev["resumed"] = True
+                    results[job.name] = prev
+                else:
+                    todo.append(job)
+        else:
+            todo = jobs
+
+        groups = batch.group_jobs(todo)
+        t_start = time.perf_counter()
+
+        def report_group(group_results: List[Dict[str, Any]]) -> None:
+            for result in group_results:
+                results[result["name"]] = result
+                print(f"[{result['status']}] {result['name']} ({result['elapsed']:.2f}s)")
+            ordered = [results[job.name] for job in jobs if job.name in results]
+            batch.write_report(report_path, options.manifest, ordered, time.perf_counter() - t_start)
+
+        if options.queue:
+            queue = WorkQueue(options.queue)
+            unit_ids = []
+            for group in groups:
+                unit_id = batch.get_unit_id(group)
+                queue.enqueue(unit_id, [job.to_dict() for job in group])
+                unit_ids.append(unit_id)
+            print(f"Queued {len(unit_ids)} designs in {options.queue}")
+            if not options.wait:
+                return
+
+            # Collect results as workers publish them
+            while unit_ids:
+                remaining = []
+                for unit_id in unit_ids:
+                    unit_results = queue.get_result(unit_id)
+                    if unit_results is None:
+                        remaining.append(unit_id)
+                    else:
+                        report_group(unit_results)
+                unit_ids = remaining
+                if unit_ids:
+                    time.sleep(0.5)
+        elif options.jobs <= 1 or len(groups) <= 1:
+            ctx = batch.BatchContext.from_cfg_path(self.cfg_path)
+            for group in groups:
+                report_group(batch.run_job_group(ctx, group))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(options.jobs, len(groups)),
+                initializer=batch._init_worker,
+                initargs=(self.cfg_path,)
+            ) as executor:
+                futures = [
+                    executor.submit(batch._run_job_group_in_worker, [job.to_dict() for job in group])
+                    for group in groups
+                ]
+                for future in as_completed(futures):
+                    report_group(future.result())
+
+        # Final report always reflects the complete manifest order
+        ordered = [results[job.name] for job in jobs if job.name in results]
+        batch.write_report(report_path, options.manifest, ordered, time.perf_counter() - t_start)
+
+        n_failed = sum(1 for result in ordered if result["status"] != "ok")
+        n_skipped = sum(1 for result in ordered if result.get("resumed"))
+        print(
+            f"{len(ordered)} jobs: {len(ordered) - n_failed} ok ({n_skipped} resumed), "
+            f"{n_failed} failed. {len(groups)} unique designs compiled"
+        )
+        if n_failed:
+            sys.exit(1)
@@ -0,0 +1,284 @@
+from typing import TYPE_CHECKING, List, Dict, Set, Tuple, Optional, Iterator, Any
+import os
+import re
+import sys
+import zipfile
+import marshal
+import subprocess
+import importlib.util
+
+from ..subcommand import Subcommand
+from ..config.loader import BOOTSTRAP_SCHEMA
+from ..plugins.entry_points import get_entry_points, get_name_from_dist, ENTRY_POINT_GROUPS
+
+if TYPE_CHECKING:
+    import argparse
+    from importlib.metadata import Distribution
+    from ..plugins.importer import ImporterPlugin
+
+
+# Module at the root of the archive that holds the pre-resolved plugin table
+BUNDLE_MODULE_NAME = "_peakrdl_bundle"
+
+MAIN_TEMPLATE = """\
+import {bundle_module}
+from peakrdl.plugins import entry_points
+from peakrdl.config import loader
+
+entry_points.use_bundled_entry_points({bundle_module}.ENTRY_POINTS)
+loader.FROZEN_SEARCH_PATHS.update({bundle_module}.SEARCH_PATHS)
+
+from peakrdl.main import main
+main()
+"""
+
+
+class Bundle(Subcommand):
+    name = "bundle"
+    short_desc = "freeze PeakRDL and its plugins into a single precompiled zipapp"
+    long_desc = (
+        "Freeze PeakRDL, the SystemRDL compiler, all installed plugins and any "
+        "modules from the configured python_search_paths into a single "
+        "executable zipapp. Modules are stored as precompiled bytecode and "
+        "plugins are pre-resolved so that starting the bundle does not need "
+        "to scan the Python path."
+    )
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        grp = parser.add_argument_group("bundle args")
+        grp.add_argument(
+            "-o",
+            dest="output",
+            required=True,
+            help="Output path of the zipapp",
+        )
+        grp.add_argument(
+            "--python",
+            dest="python",
+            default=sys.executable,
+            help="Interpreter used in the bundle's shebang line. It must be the "
+                "same Python version as the interpreter currently running PeakRDL, "
+                "which it defaults to"
+        )
+        grp.add_argument(
+            "--no-isolate",
+            dest="isolate",
+            default=True,
+            action="store_false",
+            help="Do not start the interpreter in isolated mode. By default, the "
+                "bundle is started with 'python -IS' so that site-packages and "
+                "PYTHONPATH are not scanned on startup."
+        )
+        grp.add_argument(
+            "-O",
+            dest="optimize",
+            type=int,
+            choices=[0, 1, 2],
+            default=0,
+            help="Bytecode optimization level (default: 0)"
+        )
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        # Only needed here, so that it does not slow down the startup of other
+        # subcommands
+        if sys.version_info >= (3,8,0):
+            from importlib import metadata # pylint: disable=import-outside-toplevel
+        else: # pragma: no cover
+            import importlib_metadata as metadata # type: ignore # pylint: disable=import-outside-toplevel,import-error
+
+        # Bytecode is compiled by this interpreter, and is only loadable by the
+        # same Python version
+        if options.python != sys.executable:
+            try:
+                target_version = get_python_version(options.python)
+            except (OSError, subprocess.SubprocessError, ValueError) as e:
+                print(f"error: Unable to determine the version of interpreter '{options.python}': {e}", file=sys.stderr)
+                sys.exit(1)
+            if target_version != sys.version_info[:2]:
+                print(
+                    f"error: Interpreter '{options.python}' is Python {target_version[0]}.{target_version[1]}, "
+                    f"but the bundle's bytecode is compiled for Python {sys.version_info[0]}.{sys.version_info[1]}. "
+                    "Run 'peakrdl bundle' using the target interpreter instead",
+                    file=sys.stderr
+                )
+                sys.exit(1)
+
+        assert self.app_cfg is not None
+        bootstrap_cfg = BOOTSTRAP_SCHEMA.extract(self.app_cfg.raw_data, self.app_cfg.path, "")
+        search_paths = bootstrap_cfg['peakrdl']['python_search_paths']
+
+        # Resolve the plugin table and the distributions that need to be frozen
+        plugin_table: Dict[str, List[Tuple[str, str, Optional[str], Optional[str]]]] = {}
+        dist_names = ["peakrdl-cli"]
+        for group in ENTRY_POINT_GROUPS:
+            plugin_table[group] = []
+            for ep, dist in get_entry_points(group):
+                if dist:
+                    dist_name = get_name_from_dist(dist)
+                    plugin_table[group].append((ep.name, ep.value, dist_name, dist.version))
+                    dist_names.append(dist_name)
+                else:
+                    plugin_table[group].append((ep.name, ep.value, None, None))
+
+        members: Dict[str, str] = {}
+        for dist in iter_dist_closure(metadata, dist_names):
+            for top_name in get_top_level_names(dist):
+                collect_module_files(top_name, members)
+        for spath in search_paths:
+            collect_search_path_files(spath, members)
+
+        if options.isolate:
+            shebang = f"#!{options.python} -IS\n"
+        else:
+            shebang = f"#!{options.python}\n"
+
+        with open(options.output, "wb") as f:
+            f.write(shebang.encode("utf-8"))
+            with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for arcname, src_path in sorted(members.items()):
+                    if src_path.endswith(".py"):
+                        zf.writestr(arcname + "c", compile_pyc(src_path, arcname, options.optimize))
+                    else:
+                        zf.write(src_path, arcname)
+
+                bundle_src = (
+                    f"ENTRY_POINTS = {plugin_table!r}\n"
+                    f"SEARCH_PATHS = {search_paths!r}\n"
+                )
+                zf.writestr(BUNDLE_MODULE_NAME + ".py", bundle_src)
+                zf.writestr("__main__.py", MAIN_TEMPLATE.format(bundle_module=BUNDLE_MODULE_NAME))
+        os.chmod(options.output, 0o755)
+
+
+def iter_dist_closure(metadata: Any, dist_names: List[str]) -> Iterator['Distribution']:
+    """
+    Yield the given distributions, and all the installed distributions they
+    depend on.
+
+    ``metadata`` is the ``importlib.metadata`` module, or its backport.
+    """
+    visited: Set[str] = set()
+    pending = list(dist_names)
+    while pending:
+        name = pending.pop()
+        key = re.sub(r"[-_.]+", "-", name).lower()
+        if key in visited:
+            continue
+        visited.add(key)
+        try:
+            dist = metadata.distribution(name)
+        except metadata.PackageNotFoundError:
+            # Optional or platform-specific dependency that is not installed
+            continue
+        yield dist
+
+        for req in dist.requires or []:
+            if "extra ==" in req:
+                continue
+            m = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", req)
+            if m:
+                pending.append(m.group(0))
+
+
+def get_top_level_names(dist: 'Distribution') -> List[str]:
+    """
+    Determine the importable top-level module names provided by a distribution
+    """
+    top_level = dist.read_text("top_level.txt")
+    if top_level:
+        return [name for name in top_level.split() if name]
+
+    names = set()
+    for file in dist.files or []:
+        parts = file.parts
+        if not parts or parts[0] == ".." or parts[0].endswith((".dist-info", ".egg-info")):
+            continue
+        if len(parts) == 1:
+            if parts[0].endswith(".py"):
+                names.add(parts[0][:-3])
+        else:
+            names.add(parts[0])
+    return sorted(names)
+
+
+def collect_module_files(top_name: str, members: Dict[str, str]) -> None:
+    """
+    Locate an importable top-level module and add all of its files to the
+    archive member map.
+    """
+    try:
+        spec = importlib.util.find_spec(top_name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return
+
+    if spec.submodule_search_locations:
+        for pkg_dir in spec.submodule_search_locations:
+            collect_package_dir(pkg_dir, top_name, members)
+    elif spec.origin and spec.origin.endswith(".py"):
+        members[top_name + ".py"] = spec.origin
+    elif spec.origin and os.path.isfile(spec.origin):
+        print(f"warning: extension module '{top_name}' cannot be loaded from a bundle. Skipping", file=sys.stderr)
+
+
+def collect_package_dir(pkg_dir: str, arc_prefix: str, members: Dict[str, str]) -> None:
+    for dirpath, dirnames, filenames in os.walk(pkg_dir):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+        rel_dir = os.path.relpath(dirpath, pkg_dir)
+        if rel_dir == ".":
+            arc_dir = arc_prefix
+        else:
+            arc_dir = arc_prefix + "/" + rel_dir.replace(os.sep, "/")
+        for filename in filenames:
+            if filename.endswith((".pyc", ".pyo")):
+                continue
+            if filename.endswith((".so", ".pyd")):
+                # Native extensions cannot be imported from a zip archive.
+                # Packages that ship them are expected to provide a pure-Python
+                # fallback.
+                continue
+            members[arc_dir + "/" + filename] = os.path.join(dirpath, filename)
+
+
+def collect_search_path_files(spath: str, members: Dict[str, str]) -> None:
+    """
+    Add top-level modules and packages found in a configured python search path
+    """
+    if not os.path.isdir(spath):
+        return
+    for entry in sorted(os.listdir(spath)):
+        path = os.path.join(spath, entry)
+        if entry.endswith(".py") and os.path.isfile(path):
+            members.setdefault(entry, path)
+        elif os.path.isfile(os.path.join(path, "__init__.py")):
+            collect_package_dir(path, entry, members)
+
+
+def get_python_version(python: str) -> Tuple[int, int]:
+    """
+    Get the major and minor version of another interpreter
+    """
+    result = subprocess.run(
+        [python, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True, timeout=60,
+    )
+    major, minor = result.stdout.strip().split(".")
+    return int(major), int(minor)
+
+
+def compile_pyc(src_path: str, arcname: str, optimize: int) -> bytes:
+    """
+    Compile a source file into sourceless .pyc contents.
+    """
+    with open(src_path, "rb") as f:
+        source = f.read()
+    code = compile(source, arcname, "exec", dont_inherit=True, optimize=optimize)
+
+    # Unchecked hash-based pyc header. There is no source to check against
+    # inside the bundle, so the hash is never validated.
+    header = importlib.util.MAGIC_NUMBER
+    header += (0b01).to_bytes(4, "little")
+    header += importlib.util.source_hash(source)
+    return header + marshal.dumps(code)
@@ -0,0 +1,95 @@
+from typing import TYPE_CHECKING, List
+import sys
+import argparse
+import zipfile
+
+from ..subcommand import Subcommand
+from .. import cache
+
+if TYPE_CHECKING:
+    from ..plugins.importer import ImporterPlugin
+
+
+class Cache(Subcommand):
+    name = "cache"
+    short_desc = "export or import the PeakRDL cache as a single archive"
+    long_desc = (
+        "Pack the entries of the PeakRDL cache into a single archive, or unpack "
+        "one into the cache. Paths within the project roots are stored relative "
+        "to them, so that an archive created in one checkout of a project gives "
+        "cache hits in another. For example, to reuse the cache across CI runs. "
+        "Cached importer results are only shared through archives that are "
+        "signed with the configured cache archive key."
+    )
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        assert isinstance(parser, argparse.ArgumentParser)
+        actions = parser.add_subparsers(
+            title="actions",
+            dest="cache_action",
+            metavar="ACTION",
+        )
+        actions.required = True
+
+        export_parser = actions.add_parser(
+            "export",
+            help="Pack cache entries into an archive",
+        )
+        export_parser.add_argument(
+            "archive",
+            metavar="FILE",
+            help="Path of the archive to create",
+        )
+        export_parser.add_argument(
+            "--namespace",
+            dest="namespaces",
+            metavar="NAME",
+            action="append",
+            choices=list(cache.ARCHIVE_NAMESPACES),
+            default=None,
+            help="Only export entries of this cache namespace. Can be repeated",
+        )
+
+        import_parser = actions.add_parser(
+            "import",
+            help="Unpack the entries of an archive into the cache",
+        )
+        import_parser.add_argument(
+            "archive",
+            metavar="FILE",
+            help="Path of an archive created by 'peakrdl cache export'",
+        )
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        try:
+            key = cache.get_archive_key()
+        except OSError as e:
+            print(f"error: Unable to read cache archive key: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        if options.cache_action == "export":
+            try:
+                count = cache.export_archive(options.archive, options.namespaces, key)
+            except ValueError as e:
+                print(f"error: {e}", file=sys.stderr)
+                sys.exit(1)
+            except OSError as e:
+                print(f"error: Unable to write cache archive: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Exported {count} cache entries to {options.archive}")
+        else:
+            try:
+                count, skipped = cache.import_archive(options.archive, key)
+            except ValueError as e:
+                print(f"error: {e}", file=sys.stderr)
+                sys.exit(1)
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f"error: Unable to read cache archive: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Imported {count} cache entries into {cache.get_cache_dir()}")
+            if skipped:
+                print(
+                    f"warning: Skipped {skipped} cached importer results, since the "
+                    "archive is not signed with the configured cache archive key",
+                    file=sys.stderr
+                )
@@ -0,0 +1,152 @@
+from typing import TYPE_CHECKING, List
+import sys
+import json
+import argparse
+
+from systemrdl import RDLCompiler
+
+from ..subcommand import Subcommand
+from ..plugins.exporter import get_all_udp_definitions
+from ..snapshot import SnapshotReader, is_snapshot_file, NO_PARENT
+from ..diff import diff_snapshots, format_text, has_differences
+from .snapshot import SnapshotWriter
+from .. import process_input
+from .. import argfile
+
+if TYPE_CHECKING:
+    from ..plugins.importer import ImporterPlugin
+
+
+class Diff(Subcommand):
+    name = "diff"
+    short_desc = "compare the registers and fields of two designs"
+    long_desc = (
+        "Compare the registers and fields of two designs. Each design can be "
+        "a snapshot file written by 'peakrdl snapshot', an argument file (.f) "
+        "containing its input files and compilation args, or a single input file."
+    )
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        grp = parser.add_argument_group("diff args")
+        grp.add_argument(
+            "old",
+            metavar="OLD",
+            help="Original design"
+        )
+        grp.add_argument(
+            "new",
+            metavar="NEW",
+            help="Changed design"
+        )
+        grp.add_argument(
+            "--format",
+            dest="format",
+            choices=["text", "json"],
+            default="text",
+            help="Output format (default: text)"
+        )
+        grp.add_argument(
+            "-o",
+            dest="output",
+            default=None,
+            help="Write the differences to a file instead of stdout"
+        )
+        grp.add_argument(
+            "--exit-code",
+            dest="exit_code",
+            default=False,
+            action="store_true",
+            help="Exit with status 1 if the designs differ"
+        )
+
+        compiler_arg_group = parser.add_argument_group("compilation args (applied to both designs)")
+        compiler_arg_group.add_argument(
+            "-I",
+            dest="incdirs",
+            metavar="INCDIR",
+            action="append",
+            default=[],
+            help='Search directory for files included with `include "filename"',
+        )
+        compiler_arg_group.add_argument(
+            "-D",
+            dest="defines",
+            metavar="MACRO[=VALUE]",
+            action="append",
+            default=[],
+            help="Pre-define a Verilog-style preprocessor macro"
+        )
+        compiler_arg_group.add_argument(
+            "-t", "--top",
+            dest="top",
+            metavar="TOP",
+            default=None,
+            help="Choose which addrmap will be the top-level component"
+        )
+        compiler_arg_group.add_argument(
+            "-P",
+            dest="parameters",
+            metavar="PARAMETER=VALUE",
+            action="append",
+            default=[],
+            help="Specify value for a top-level SystemRDL parameter"
+        )
+
+    def _get_design_parser(self, path: str, importers: 'List[ImporterPlugin]') -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(prog=f"peakrdl diff {path}")
+        process_input.add_rdl_compile_arguments(parser)
+        process_input.add_elaborate_arguments(parser)
+        process_input.add_importer_arguments(parser, importers)
+        return parser
+
+    def load_design(self, path: str, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> SnapshotReader:
+        if is_snapshot_file(path):
+            return SnapshotReader(path)
+
+        if path.endswith(".f"):
+            argv = argfile.expand_argfile(["-f", path])
+        else:
+            argv = [path]
+        for incdir in options.incdirs:
+            argv.extend(["-I", incdir])
+        for define in options.defines:
+            argv.extend(["-D", define])
+        if options.top is not None:
+            argv.extend(["--top", options.top])
+        for param in options.parameters:
+            argv.extend(["-P", param])
+        design_options = self._get_design_parser(path, importers).parse_args(argv)
+
+        rdlc = RDLCompiler()
+        if self.app_cfg is not None:
+            for udp in get_all_udp_definitions(self.app_cfg):
+                rdlc.register_udp(udp)
+        process_input.process_input(rdlc, importers, design_options.input_files, design_options)
+        root = rdlc.elaborate(
+            top_def_name=design_options.top_def_name,
+            inst_name=design_options.inst_name,
+            parameters=process_input.parse_parameters(rdlc, design_options.parameters)
+        )
+
+        writer = SnapshotWriter()
+        writer.add_node(root.top, NO_PARENT)
+        return SnapshotReader.from_bytes(writer.to_bytes())
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        with self.load_design(options.old, importers, options) as old, \
+                self.load_design(options.new, importers, options) as new:
+            result = diff_snapshots(old, new)
+
+        if options.format == "json":
+            text = json.dumps(result, indent=2) + "\n"
+        else:
+            text = "".join(line + "\n" for line in format_text(result))
+
+        if options.output is None:
+            sys.stdout.write(text)
+        else:
+            with open(options.output, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        if options.exit_code and has_differences(result):
+            sys.exit(1)
@@ -1,22 +1,68 @@
-from typing import TYPE_CHECKING
+from typing import Optional, Tuple
 import math
+import argparse
 
-from systemrdl import RDLListener, RDLWalker
-from systemrdl.node import AddrmapNode, RegNode, FieldNode
+from systemrdl import RDLListener, RDLWalker, WalkerAction
+from systemrdl.node import AddrmapNode, RegNode, FieldNode, AddressableNode
 
 from ..subcommand import ExporterSubcommand
+from ..node_index import NodeIndex, get_node_index
 
-if TYPE_CHECKING:
-    import argparse
+
+
+def parse_address_range(s: str) -> Tuple[int, int]:
+    try:
+        start, end = s.split(":")
+        addr_range = (int(start, 0), int(end, 0))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid address range: '{s}'") from None
+    if addr_range[0] > addr_range[1]:
+        raise argparse.ArgumentTypeError(f"invalid address range: '{s}'")
+    return addr_range
 
 
 class DumpListener(RDLListener):
-    def __init__(self, hex_digits: int, unroll: bool, show_fields: bool) -> None:
+    def __init__(self, hex_digits: int, unroll: bool, show_fields: bool, addr_range: Optional[Tuple[int, int]] = None, index: Optional[NodeIndex] = None) -> None:
         self.hex_digits = hex_digits
         self.unroll = unroll
         self.show_fields = show_fields
+        self.addr_range = addr_range
+
+        # Index of the walked design. If not given, it is only built once an
+        # address range needs it
+        self.index = index
+        self.top_node: Optional[AddressableNode] = None
+
+    def in_range(self, node: AddressableNode) -> bool:
+        """
+        Check whether any part of the node overlaps the address range
+        """
+        if self.addr_range is None:
+            return True
+
+        if self.unroll:
+            start = node.absolute_address
+            end = start + node.size - 1
+        else:
+            # Span of all elements of the node, and of its parent arrays
+            if self.index is None:
+                assert self.top_node is not None
+                self.index = get_node_index(self.top_node)
+            start, end = self.index.get_span(node)
+        return start <= self.addr_range[1] and end >= self.addr_range[0]
+
+    def enter_AddressableComponent(self, node: AddressableNode) -> Optional[WalkerAction]:
+        if self.top_node is None:
+            # First node of the walk
+            self.top_node = node
+        if not self.in_range(node):
+            return WalkerAction.SkipDescendants
+        return None
 
     def enter_Reg(self, node: RegNode) -> None:
+        if not self.in_range(node):
+            return
+
         if self.unroll:
             addr = node.absolute_address
             size = node.size
@@ -57,10 +103,19 @@ class Dump(ExporterSubcommand):
             action="store_true",
             help="Show fields"
         )
+        arg_group.add_argument(
+            "--range",
+            dest="addr_range",
+            metavar="ADDR:ADDR",
+            type=parse_address_range,
+            default=None,
+            help="Only show registers that overlap this inclusive absolute "
+                    "address range. For example: 0x1000:0x1fff"
+        )
 
 
     def do_export(self, top_node: AddrmapNode, options: 'argparse.Namespace') -> None:
         hex_digits = math.ceil(top_node.total_size.bit_length() / 4)
         walker = RDLWalker(unroll=options.unroll)
-        listener = DumpListener(hex_digits, options.unroll, options.fields)
+        listener = DumpListener(hex_digits, options.unroll, options.fields, options.addr_range, index=self.get_node_index(top_node))
         walker.walk(top_node, listener)
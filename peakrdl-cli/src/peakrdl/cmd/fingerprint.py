@@ -0,0 +1,37 @@
+from typing import TYPE_CHECKING
+import json
+
+from systemrdl.node import AddrmapNode
+
+from ..subcommand import ExporterSubcommand
+from ..fingerprint import get_fingerprint
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class Fingerprint(ExporterSubcommand):
+    name = "fingerprint"
+    short_desc = "print structural hashes of the register model as JSON"
+    long_desc = (
+        "Compute a stable hash of the elaborated register model, as well as "
+        "the hash of each addrmap and regfile subtree. Designs that produce "
+        "the same fingerprint have identical register maps."
+    )
+    generates_output_file = False
+
+    def add_exporter_arguments(self, arg_group: 'argparse._ActionsContainer') -> None:
+        arg_group.add_argument(
+            "-o",
+            dest="output",
+            default=None,
+            help="Write the fingerprint JSON to a file instead of stdout",
+        )
+
+    def do_export(self, top_node: AddrmapNode, options: 'argparse.Namespace') -> None:
+        fingerprint = get_fingerprint(top_node)
+        if options.output is None:
+            print(json.dumps(fingerprint, indent=2))
+        else:
+            with open(options.output, "w", encoding="utf-8") as f:
+                json.dump(fingerprint, f, indent=2)
@@ -0,0 +1,128 @@
+from typing import TYPE_CHECKING, List, Optional
+import sys
+import json
+
+from ..subcommand import Subcommand
+from ..stats import format_size
+from .. import ledger
+
+if TYPE_CHECKING:
+    import argparse
+    from ..plugins.importer import ImporterPlugin
+
+
+def _format_time(t: float) -> str:
+    return f"{t:.3f}s"
+
+
+def _format_rss(rss: Optional[int]) -> str:
+    if rss is None:
+        return "-"
+    return format_size(rss)
+
+
+class History(Subcommand):
+    name = "history"
+    short_desc = "summarize the run ledger and flag regressions"
+    long_desc = (
+        "Summarize the runs recorded in the run ledger. Reports percentiles of "
+        "the total run time per subcommand and design, and flags runs whose "
+        "time or peak memory regressed against the rolling median of the "
+        "previous runs. The ledger's location is set by the 'ledger' option of "
+        "the PeakRDL configuration."
+    )
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        parser.add_argument(
+            "--ledger",
+            dest="ledger",
+            metavar="PATH",
+            default=None,
+            help="Path to the run ledger. Overrides the PeakRDL configuration"
+        )
+        parser.add_argument(
+            "--subcommand",
+            dest="filter_subcommand",
+            metavar="NAME",
+            default=None,
+            help="Only include runs of this subcommand"
+        )
+        parser.add_argument(
+            "--design",
+            dest="filter_design",
+            metavar="NAME",
+            default=None,
+            help="Only include runs of this top-level design"
+        )
+        parser.add_argument(
+            "--window",
+            dest="window",
+            metavar="N",
+            type=int,
+            default=10,
+            help="Number of previous runs that the rolling median is computed over (default: 10)"
+        )
+        parser.add_argument(
+            "--threshold",
+            dest="threshold",
+            metavar="RATIO",
+            type=float,
+            default=1.5,
+            help="Flag runs that exceed the rolling median by more than this ratio (default: 1.5)"
+        )
+        parser.add_argument(
+            "--format",
+            dest="format",
+            choices=["text", "json"],
+            default="text",
+            help="Output format (default: text)"
+        )
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        path = options.ledger
+        if path is None and self.app_cfg is not None:
+            path = self.app_cfg.peakrdl_cfg['ledger']
+        if path is None:
+            print("error: No run ledger. Set the 'ledger' option in the PeakRDL configuration, or use --ledger", file=sys.stderr)
+            sys.exit(1)
+
+        try:
+            records = ledger.load_records(path)
+        except OSError as e:
+            print(f"error: Unable to read run ledger: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        if options.filter_subcommand is not None:
+            records = [r for r in records if r["subcommand"] == options.filter_subcommand]
+        if options.filter_design is not None:
+            records = [r for r in records if ledger.get_group_key(r)[1] == options.filter_design]
+
+        summary = ledger.summarize(records)
+        regressions = ledger.find_regressions(records, options.window, options.threshold)
+
+        if options.format == "json":
+            print(json.dumps({"summary": summary, "regressions": regressions}, indent=2))
+            return
+
+        print(f"{'subcommand':<16} {'design':<24} {'runs':>6} {'p50':>10} {'p90':>10} {'max':>10} {'peak rss':>10}")
+        for entry in summary:
+            print(
+                f"{entry['subcommand']:<16} {entry['design']:<24} {entry['runs']:>6} "
+                f"{_format_time(entry['p50']):>10} {_format_time(entry['p90']):>10} "
+                f"{_format_time(entry['max']):>10} {_format_rss(entry['peak_rss_max']):>10}"
+            )
+
+        if regressions:
+            print()
+            print(f"Regressions (more than {options.threshold}x the median of up to {options.window} previous runs):")
+            for reg in regressions:
+                if reg["metric"] == "time":
+                    value = _format_time(reg["value"])
+                    median = _format_time(reg["median"])
+                else:
+                    value = _format_rss(reg["value"])
+                    median = _format_rss(int(reg["median"]))
+                print(
+                    f"{reg['time']} {reg['subcommand']} {reg['design']}: "
+                    f"{reg['metric']} {value} vs. median {median} ({reg['ratio']:.1f}x)"
+                )
@@ -17,11 +17,17 @@ class ListGlobals(Subcommand):
     def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
         compiler_arg_group = parser.add_argument_group("compilation args")
         process_input.add_rdl_compile_arguments(compiler_arg_group)
+        process_input.add_list_inputs_argument(compiler_arg_group)
 
         process_input.add_importer_arguments(parser, importers)
 
     def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
         rdlc = RDLCompiler()
+        if options.list_inputs:
+            for path in process_input.list_inputs(rdlc, options.input_files, options):
+                print(path)
+            return
+
         process_input.process_input(rdlc, importers, options.input_files, options)
 
         for name, comp_def in rdlc.root.comp_defs.items():
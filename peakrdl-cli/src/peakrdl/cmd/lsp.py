@@ -0,0 +1,35 @@
+from typing import TYPE_CHECKING, List
+import sys
+
+from ..subcommand import Subcommand
+from ..plugins.exporter import get_all_udp_definitions
+from .. import process_input
+from .. import lsp
+
+if TYPE_CHECKING:
+    import argparse
+    from ..plugins.importer import ImporterPlugin
+
+
+class LanguageServer(Subcommand):
+    name = "lsp"
+    short_desc = "run a language server over stdin/stdout"
+    long_desc = (
+        "Run a Language Server Protocol server that communicates over stdin/stdout. "
+        "The server compiles and elaborates the given input files, and publishes "
+        "diagnostics and address hovers as they are edited. Unsaved edits are "
+        "used in place of the files on disk."
+    )
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        compiler_arg_group = parser.add_argument_group("compilation args")
+        process_input.add_rdl_compile_arguments(compiler_arg_group)
+        process_input.add_elaborate_arguments(compiler_arg_group)
+
+        process_input.add_importer_arguments(parser, importers)
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        # Recognize the UDPs of all exporters
+        udps = get_all_udp_definitions(self.app_cfg) if self.app_cfg is not None else []
+        workspace = lsp.Workspace(importers, udps, options)
+        sys.exit(lsp.run_server(workspace))
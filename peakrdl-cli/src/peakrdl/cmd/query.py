@@ -0,0 +1,135 @@
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+import sys
+import math
+import json
+import argparse
+
+from systemrdl.node import AddrmapNode, AddressableNode
+
+from ..subcommand import ExporterSubcommand
+
+if TYPE_CHECKING:
+    from systemrdl.node import Node
+    from ..node_index import NodeIndex
+
+
+def parse_address(s: str) -> int:
+    try:
+        return int(s, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid address: '{s}'") from None
+
+
+def get_node_info(index: 'NodeIndex', node: 'Node') -> Dict[str, Any]:
+    info: Dict[str, Any] = {
+        "path": node.get_path(),
+        "type": node.type_name,
+    }
+    if isinstance(node, AddressableNode):
+        try:
+            start = node.absolute_address
+            end = start + node.size - 1
+        except ValueError:
+            # Array indexes are not known. Report the span of all elements
+            start, end = index.get_span(node)
+        info["address"] = start
+        info["end_address"] = end
+    return info
+
+
+class Query(ExporterSubcommand):
+    name = "query"
+    short_desc = "look up nodes of the register model by path, address or type"
+    long_desc = (
+        "Look up nodes of the elaborated register model. Nodes are found by "
+        "their hierarchical path, by an absolute address that they contain, "
+        "or by the name of their type. Lookups use an index of the design, "
+        "so they are fast even for very large designs."
+    )
+    generates_output_file = False
+
+    def add_exporter_arguments(self, arg_group: 'argparse._ActionsContainer') -> None:
+        arg_group.add_argument(
+            "--path",
+            dest="query_paths",
+            metavar="PATH",
+            action="append",
+            default=[],
+            help="Find the node at this hierarchical path. Array indexes are "
+                "optional. For example: top.blk[2].ctrl"
+        )
+        arg_group.add_argument(
+            "--address",
+            dest="query_addresses",
+            metavar="ADDR",
+            action="append",
+            type=parse_address,
+            default=[],
+            help="Find the deepest node that contains this absolute address"
+        )
+        arg_group.add_argument(
+            "--type",
+            dest="query_types",
+            metavar="NAME",
+            action="append",
+            default=[],
+            help="Find all instances of this type"
+        )
+        arg_group.add_argument(
+            "--children",
+            default=False,
+            action="store_true",
+            help="Also list the immediate children of each node that is found"
+        )
+        arg_group.add_argument(
+            "--format",
+            dest="format",
+            choices=["text", "json"],
+            default="text",
+            help="Output format (default: text)"
+        )
+
+    def do_export(self, top_node: AddrmapNode, options: 'argparse.Namespace') -> None:
+        index = self.get_node_index(top_node)
+
+        queries: List[Tuple[str, List['Node']]] = []
+        for path in options.query_paths:
+            try:
+                node = index.find_by_path(path)
+            except (ValueError, IndexError) as e:
+                print(f"error: {e}", file=sys.stderr)
+                sys.exit(1)
+            queries.append((f"path {path}", [node] if node is not None else []))
+        for address in options.query_addresses:
+            node = index.find_by_address(address)
+            queries.append((f"address 0x{address:x}", [node] if node is not None else []))
+        for type_name in options.query_types:
+            queries.append((f"type {type_name}", index.get_instances(type_name)))
+
+        results: List[Dict[str, Any]] = []
+        for query, nodes in queries:
+            matches = []
+            for node in nodes:
+                info = get_node_info(index, node)
+                if options.children:
+                    info["children"] = [child.get_path_segment() for child in index.get_children(node)]
+                matches.append(info)
+            results.append({"query": query, "matches": matches})
+
+        if options.format == "json":
+            print(json.dumps(results, indent=2))
+            return
+
+        hex_digits = math.ceil(top_node.total_size.bit_length() / 4)
+        for result in results:
+            print(f"{result['query']}:")
+            if not result["matches"]:
+                print("\tnot found")
+            for info in result["matches"]:
+                if "address" in info:
+                    addr_range = f"0x{info['address']:0{hex_digits}x}-0x{info['end_address']:0{hex_digits}x}: "
+                else:
+                    addr_range = ""
+                print(f"\t{addr_range}{info['path']} ({info['type']})")
+                for child in info.get("children", []):
+                    print(f"\t\t{child}")
@@ -0,0 +1,151 @@
+from typing import TYPE_CHECKING, List, Dict, Tuple
+import struct
+
+from systemrdl.node import AddrmapNode, RegfileNode, MemNode, RegNode, AddressableNode
+
+from ..subcommand import ExporterSubcommand
+from .. import snapshot as fmt
+
+if TYPE_CHECKING:
+    import argparse
+    from systemrdl.node import FieldNode
+
+
+class SnapshotWriter:
+    """
+    Builds the contents of a snapshot file from an elaborated design
+    """
+    def __init__(self) -> None:
+        self.strings: List[bytes] = []
+        self.string_ids: Dict[str, int] = {}
+        self.dims: List[int] = []
+        self.nodes: List[list] = []
+        self.fields: List[tuple] = []
+
+    def add_string(self, s: str) -> int:
+        idx = self.string_ids.get(s)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(s.encode("utf-8"))
+            self.string_ids[s] = idx
+        return idx
+
+    def add_node(self, node: AddressableNode, parent_idx: int) -> None:
+        idx = len(self.nodes)
+        if isinstance(node, RegNode):
+            kind = fmt.NODE_KINDS.index("reg")
+        elif isinstance(node, MemNode):
+            kind = fmt.NODE_KINDS.index("mem")
+        elif isinstance(node, RegfileNode):
+            kind = fmt.NODE_KINDS.index("regfile")
+        else:
+            kind = fmt.NODE_KINDS.index("addrmap")
+
+        dims = node.array_dimensions or []
+        record = [
+            self.add_string(node.inst_name),
+            parent_idx,
+            0, # subtree_end. Filled in below
+            kind,
+            len(dims),
+            0, # regwidth
+            0, # accesswidth
+            0,
+            len(self.dims),
+            len(self.fields),
+            0, # n_fields
+            node.raw_absolute_address,
+            node.size,
+            node.array_stride or 0,
+        ]
+        self.dims.extend(dims)
+        self.nodes.append(record)
+
+        if isinstance(node, RegNode):
+            record[5] = node.get_property('regwidth')
+            record[6] = node.get_property('accesswidth')
+            for field in node.fields():
+                self.add_field(field)
+            record[10] = len(self.fields) - record[9]
+        else:
+            for child in node.children():
+                if isinstance(child, AddressableNode):
+                    self.add_node(child, idx)
+
+        record[2] = len(self.nodes)
+
+    def add_field(self, field: 'FieldNode') -> None:
+        flags = 0
+        reset = field.get_property('reset')
+        if isinstance(reset, int):
+            flags |= fmt.FIELD_HAS_RESET
+            if reset.bit_length() > 64:
+                flags |= fmt.FIELD_WIDE_RESET
+                reset = self.add_string(f"{reset:x}")
+        else:
+            reset = 0
+        if field.is_volatile:
+            flags |= fmt.FIELD_VOLATILE
+
+        onread = field.get_property('onread')
+        onwrite = field.get_property('onwrite')
+        self.fields.append((
+            self.add_string(field.inst_name),
+            field.lsb,
+            field.width,
+            fmt.ACCESS_TYPES.index(field.get_property('sw').name),
+            fmt.ACCESS_TYPES.index(field.get_property('hw').name),
+            fmt.ONREAD_TYPES.index(onread.name) if onread else 0,
+            fmt.ONWRITE_TYPES.index(onwrite.name) if onwrite else 0,
+            flags,
+            reset,
+        ))
+
+    def to_bytes(self) -> bytes:
+        str_offsets = [0]
+        for s in self.strings:
+            str_offsets.append(str_offsets[-1] + len(s))
+
+        sections: List[Tuple[str, bytes]] = [
+            ("str_offsets", struct.pack(f"<{len(str_offsets)}I", *str_offsets)),
+            ("str_data", b"".join(self.strings)),
+            ("dims", struct.pack(f"<{len(self.dims)}I", *self.dims)),
+            ("nodes", b"".join(fmt.NODE_STRUCT.pack(*record) for record in self.nodes)),
+            ("fields", b"".join(fmt.FIELD_STRUCT.pack(*record) for record in self.fields)),
+        ]
+
+        positions = {}
+        pos = fmt.HEADER_STRUCT.size
+        body = []
+        for name, data in sections:
+            # Keep each section 8-byte aligned
+            padding = -pos % 8
+            body.append(b"\x00" * padding)
+            pos += padding
+            positions[name] = pos
+            body.append(data)
+            pos += len(data)
+
+        header = fmt.HEADER_STRUCT.pack(
+            fmt.MAGIC, fmt.VERSION, 0,
+            len(self.strings), len(self.dims), len(self.nodes), len(self.fields),
+            positions["str_offsets"], positions["str_data"], positions["dims"],
+            positions["nodes"], positions["fields"],
+        )
+        return header + b"".join(body)
+
+
+class Snapshot(ExporterSubcommand):
+    name = "snapshot"
+    short_desc = "write a compact binary table of registers and fields"
+    long_desc = (
+        "Write the elaborated register map as a compact binary snapshot file. "
+        "Snapshots can be loaded using peakrdl.snapshot.SnapshotReader, which "
+        "does not depend on the SystemRDL compiler."
+    )
+
+    def do_export(self, top_node: AddrmapNode, options: 'argparse.Namespace') -> None:
+        writer = SnapshotWriter()
+        writer.add_node(top_node, fmt.NO_PARENT)
+        with open(options.output, "wb") as f:
+            f.write(writer.to_bytes())
@@ -0,0 +1,49 @@
+from typing import TYPE_CHECKING
+import json
+
+from systemrdl.node import AddrmapNode
+
+from ..subcommand import ExporterSubcommand
+from ..stats import get_design_stats, format_size
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class Stats(ExporterSubcommand):
+    name = "stats"
+    short_desc = "print the size of the register model"
+    long_desc = (
+        "Print the number of nodes in the register model, both as declared and "
+        "once all arrays are unrolled, as well as its depth, address span and "
+        "register density. Arrays are not unrolled to compute these, so this "
+        "is cheap even for very large designs."
+    )
+    generates_output_file = False
+
+    def add_exporter_arguments(self, arg_group: 'argparse._ActionsContainer') -> None:
+        arg_group.add_argument(
+            "--format",
+            dest="format",
+            choices=["text", "json"],
+            default="text",
+            help="Output format (default: text)"
+        )
+
+    def do_export(self, top_node: AddrmapNode, options: 'argparse.Namespace') -> None:
+        stats = get_design_stats(top_node)
+        if options.format == "json":
+            print(json.dumps(stats.to_dict(), indent=2))
+            return
+
+        print(f"{'':<12} {'declared':>12} {'unrolled':>12}")
+        for kind, n_declared in stats.declared.items():
+            print(f"{kind:<12} {n_declared:>12} {stats.unrolled[kind]:>12}")
+        print(f"{'total':<12} {sum(stats.declared.values()):>12} {stats.total_unrolled:>12}")
+        print()
+        end_address = stats.base_address + max(stats.address_span - 1, 0)
+        print(f"max array expansion: {stats.max_expansion}")
+        print(f"depth:               {stats.depth}")
+        print(f"address span:        0x{stats.base_address:x}-0x{end_address:x} ({format_size(stats.address_span)})")
+        print(f"density:             {stats.density:.1%}")
+        print(f"estimated memory:    {format_size(stats.estimated_memory)}")
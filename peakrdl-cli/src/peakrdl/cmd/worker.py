@@ -0,0 +1,119 @@
+from typing import TYPE_CHECKING, List, Optional
+import time
+
+from ..subcommand import Subcommand
+from ..work_queue import WorkQueue, get_worker_id
+from .. import batch
+
+if TYPE_CHECKING:
+    import argparse
+    from ..plugins.importer import ImporterPlugin
+
+
+class Worker(Subcommand):
+    name = "worker"
+    short_desc = "process batch jobs from a shared-directory work queue"
+    long_desc = (
+        "Claim and run batch jobs that were queued using 'peakrdl batch --queue DIR'. "
+        "Any number of workers, on one or many hosts, can share the same queue "
+        "directory. Jobs held by workers that stopped sending heartbeats are "
+        "retried by the remaining workers."
+    )
+
+    @property
+    def cfg_path(self) -> Optional[str]:
+        if self.app_cfg is None:
+            return None
+        return self.app_cfg.path or None
+
+    def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        grp = parser.add_argument_group("worker args")
+        grp.add_argument(
+            "--queue",
+            dest="queue",
+            metavar="DIR",
+            required=True,
+            help="Shared work queue directory"
+        )
+        grp.add_argument(
+            "--idle-timeout",
+            dest="idle_timeout",
+            metavar="SECONDS",
+            type=float,
+            default=0,
+            help="Keep polling for new work for this long once the queue is "
+                "empty before exiting (default: exit immediately)"
+        )
+        grp.add_argument(
+            "--lease-timeout",
+            dest="lease_timeout",
+            metavar="SECONDS",
+            type=float,
+            default=60,
+            help="Jobs held by a worker that has not sent a heartbeat for this "
+                "long are considered abandoned and are retried (default: 60)"
+        )
+        grp.add_argument(
+            "--heartbeat",
+            dest="heartbeat",
+            metavar="SECONDS",
+            type=float,
+            default=10,
+            help="Interval between lease heartbeats (default: 10)"
+        )
+        grp.add_argument(
+            "--max-attempts",
+            dest="max_attempts",
+            type=int,
+            default=3,
+            help="Give up on a job after this many attempts (default: 3)"
+        )
+        grp.add_argument(
+            "--poll-interval",
+            dest="poll_interval",
+            metavar="SECONDS",
+            type=float,
+            default=1,
+            help="Interval between queue scans while waiting (default: 1)"
+        )
+
+    def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        queue = WorkQueue(options.queue, options.lease_timeout)
+        worker_id = get_worker_id()
+        ctx: Optional[batch.BatchContext] = None
+        idle_since = time.monotonic()
+
+        while True:
+            claimed = False
+            pending = queue.pending_units()
+            for unit_id in pending:
+                lease = queue.try_claim(unit_id, worker_id)
+                if lease is None:
+                    continue
+                claimed = True
+
+                with lease:
+                    lease.start_heartbeat(options.heartbeat)
+                    jobs = [batch.Job.from_dict(d) for d in queue.get_payload(unit_id)]
+                    if lease.attempt > options.max_attempts:
+                        results = batch.get_abandoned_results(jobs, lease.attempt - 1)
+                    else:
+                        if ctx is None:
+                            ctx = batch.BatchContext.from_cfg_path(self.cfg_path)
+                        results = batch.run_job_group(ctx, jobs)
+                    for result in results:
+                        result["worker"] = worker_id
+                        result["attempt"] = lease.attempt
+                        print(f"[{result['status']}] {result['name']} ({result['elapsed']:.2f}s)")
+                    queue.complete(lease, results)
+
+                # Rescan the queue after each unit
+                break
+
+            if claimed:
+                idle_since = time.monotonic()
+                continue
+
+            if not pending and (time.monotonic() - idle_since) >= options.idle_timeout:
+                break
+            time.sleep(options.poll_interval)
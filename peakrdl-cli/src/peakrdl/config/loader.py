@@ -1,8 +1,9 @@
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Set
 import os
 import sys
 
 from . import schema
+from .. import cache
 
 if sys.version_info[0:2] < (3, 11):
     # Prior to py3.11, tomllib is a 3rd party package
@@ -11,6 +12,13 @@ else:
     # py3.11 and onwards, tomli was absorbed into the standard library as tomllib
     import tomllib
 
+class ConfigError(ValueError):
+    """
+    Raised if the PeakRDL configuration file cannot be loaded, or does not
+    match its schema
+    """
+
+
 class AppConfig:
     def __init__(self, path: str, raw_data: Dict[str, Any]) -> None:
         self.path = path
@@ -20,6 +28,17 @@ class AppConfig:
             "plugins": {
                 "importers": {"*": schema.PythonObjectImport()},
                 "exporters": {"*": schema.PythonObjectImport()},
+                "hooks": {"*": schema.PythonObjectImport()},
+            },
+            "cache_dir": schema.DirectoryPath(shall_exist=False),
+            "project_roots": [schema.DirectoryPath(shall_exist=False)],
+            "cache_archive_key": schema.FilePath(shall_exist=False),
+            "ledger": schema.FilePath(shall_exist=False),
+            "variants": {
+                "*": {
+                    "parameters": [schema.String()],
+                    "defines": [schema.String()],
+                },
             },
         })
         self.peakrdl_cfg = self.get_namespace("peakrdl", sch)
@@ -29,8 +48,7 @@ class AppConfig:
         try:
             cfg = sch.extract(data, self.path, name)
         except schema.SchemaException as e:
-            print(f"{self.path}: error: {str(e)}")
-            sys.exit(1)
+            raise ConfigError(f"{self.path}: error: {str(e)}") from e
         return cfg
 
 
@@ -73,6 +91,10 @@ def _discover_cfg_file() -> Optional[str]:
     return None
 
 
+#: Search paths whose modules were frozen into a bundle. These are not added to
+#: sys.path since their contents are already importable.
+FROZEN_SEARCH_PATHS: Set[str] = set()
+
 BOOTSTRAP_SCHEMA = schema.normalize({
     "peakrdl": {
         "python_search_paths": [schema.DirectoryPath(shall_exist=False)]
@@ -83,6 +105,8 @@ def load_cfg(path: Optional[str]) -> AppConfig:
     """
     Careful! This is a secret API!
     sphinx-peakrdl calls this.
+
+    Raises ConfigError if the configuration cannot be loaded.
     """
 
     if path is None:
@@ -97,22 +121,28 @@ def load_cfg(path: Optional[str]) -> AppConfig:
     else:
         # Found file. Parse it
         if not os.path.isfile(path):
-            raise ValueError(f"error: invalid config file path: {path}")
+            raise ConfigError(f"error: invalid config file path: {path}")
 
         with open(path, 'r', encoding='utf-8') as f:
             s = f.read()
         try:
             raw_data = tomllib.loads(s)
         except tomllib.TOMLDecodeError as e:
-            raise ValueError(f"{path}: error: {str(e)}") from e
+            raise ConfigError(f"{path}: error: {str(e)}") from e
 
     # Do a first-pass extraction to fetch additional entries to be added to PYTHONPATH
     try:
         tmp = BOOTSTRAP_SCHEMA.extract(raw_data, path, "")
     except schema.SchemaException as e:
-        print(f"{path}: error: {str(e)}")
-        sys.exit(1)
+        raise ConfigError(f"{path}: error: {str(e)}") from e
     for spath in tmp['peakrdl']['python_search_paths']:
+        if spath in FROZEN_SEARCH_PATHS:
+            continue
         sys.path.append(spath)
 
-    return AppConfig(path, raw_data)
+    cfg = AppConfig(path, raw_data)
+    if cfg.peakrdl_cfg['cache_dir'] is not None:
+        cache.set_cache_dir(cfg.peakrdl_cfg['cache_dir'])
+    cache.set_project_roots(cfg.peakrdl_cfg['project_roots'])
+    cache.set_archive_key_path(cfg.peakrdl_cfg['cache_archive_key'])
+    return cfg
@@ -0,0 +1,198 @@
+from typing import List, Dict, Any, Tuple, Optional, Iterator
+
+from .snapshot import SnapshotReader, ACCESS_TYPES, ONREAD_TYPES, ONWRITE_TYPES, FIELD_VOLATILE
+
+
+class RegEntry:
+    """
+    Register, and its fields, as compared by the diff
+    """
+    def __init__(self, snapshot: SnapshotReader, idx: int) -> None:
+        node = snapshot.get_node(idx)
+        self.path = snapshot.get_path(idx)
+        self.address: int = node.raw_address
+        self.attrs: Dict[str, Any] = {
+            "size": node.size,
+            "regwidth": node.regwidth,
+            "accesswidth": node.accesswidth,
+            "dims": list(snapshot.get_dims(idx)),
+            "stride": node.array_stride if node.n_dims else None,
+        }
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        for field in snapshot.iter_fields(idx):
+            self.fields[snapshot.get_string(field.name)] = {
+                "lsb": field.lsb,
+                "width": field.width,
+                "sw": ACCESS_TYPES[field.sw],
+                "hw": ACCESS_TYPES[field.hw],
+                "onread": ONREAD_TYPES[field.onread],
+                "onwrite": ONWRITE_TYPES[field.onwrite],
+                "reset": snapshot.get_reset(field),
+                "volatile": bool(field.flags & FIELD_VOLATILE),
+            }
+
+    def get_layout(self) -> Tuple[Any, ...]:
+        """
+        Everything except the register's name and address
+        """
+        return (sorted(self.attrs.items()), sorted(self.fields.items()))
+
+
+def get_registers(snapshot: SnapshotReader) -> Dict[str, RegEntry]:
+    regs = {}
+    for idx in snapshot.iter_registers():
+        entry = RegEntry(snapshot, idx)
+        regs[entry.path] = entry
+    return regs
+
+
+def _compare_attrs(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[Any]]:
+    return {k: [old[k], new[k]] for k in old if old[k] != new[k]}
+
+
+def diff_snapshots(old: SnapshotReader, new: SnapshotReader) -> Dict[str, Any]:
+    """
+    Compare the registers and fields of two designs.
+
+    Registers are aligned by path. Registers that only exist in one of the
+    designs are then merged by address, and ones that have an identical layout
+    at the same address are reported as renamed.
+
+    All lists in the result are sorted by address.
+    """
+    old_regs = get_registers(old)
+    new_regs = get_registers(new)
+
+    result: Dict[str, List[Dict[str, Any]]] = {
+        "added": [],
+        "removed": [],
+        "renamed": [],
+        "moved": [],
+        "changed": [],
+    }
+
+    for path, old_reg in old_regs.items():
+        new_reg = new_regs.get(path)
+        if new_reg is None:
+            continue
+        if old_reg.address != new_reg.address:
+            result["moved"].append({
+                "path": path,
+                "old_address": old_reg.address,
+                "new_address": new_reg.address,
+            })
+        change = _diff_reg(old_reg, new_reg)
+        if change is not None:
+            result["changed"].append(change)
+
+    # Sorted merge of unmatched registers by address
+    removed = sorted((r for p, r in old_regs.items() if p not in new_regs), key=lambda r: r.address)
+    added = sorted((r for p, r in new_regs.items() if p not in old_regs), key=lambda r: r.address)
+    i = j = 0
+    while i < len(removed) or j < len(added):
+        old_entry = removed[i] if i < len(removed) else None
+        new_entry = added[j] if j < len(added) else None
+        if old_entry is not None and new_entry is not None and old_entry.address == new_entry.address:
+            if old_entry.get_layout() == new_entry.get_layout():
+                result["renamed"].append({
+                    "old_path": old_entry.path,
+                    "new_path": new_entry.path,
+                    "address": old_entry.address,
+                })
+            else:
+                result["removed"].append({"path": old_entry.path, "address": old_entry.address})
+                result["added"].append({"path": new_entry.path, "address": new_entry.address})
+            i += 1
+            j += 1
+        elif old_entry is not None and (new_entry is None or old_entry.address < new_entry.address):
+            result["removed"].append({"path": old_entry.path, "address": old_entry.address})
+            i += 1
+        elif new_entry is not None:
+            result["added"].append({"path": new_entry.path, "address": new_entry.address})
+            j += 1
+
+    result["moved"].sort(key=lambda d: d["new_address"])
+    result["changed"].sort(key=lambda d: d["address"])
+    return result
+
+
+def _diff_reg(old_reg: RegEntry, new_reg: RegEntry) -> Optional[Dict[str, Any]]:
+    changes = _compare_attrs(old_reg.attrs, new_reg.attrs)
+
+    added_fields = [name for name in new_reg.fields if name not in old_reg.fields]
+    removed_fields = [name for name in old_reg.fields if name not in new_reg.fields]
+    changed_fields = {}
+    for name, old_field in old_reg.fields.items():
+        new_field = new_reg.fields.get(name)
+        if new_field is None:
+            continue
+        field_changes = _compare_attrs(old_field, new_field)
+        if field_changes:
+            changed_fields[name] = field_changes
+
+    if not (changes or added_fields or removed_fields or changed_fields):
+        return None
+    return {
+        "path": new_reg.path,
+        "address": new_reg.address,
+        "changes": changes,
+        "added_fields": added_fields,
+        "removed_fields": removed_fields,
+        "changed_fields": changed_fields,
+    }
+
+
+def has_differences(result: Dict[str, Any]) -> bool:
+    return any(result.values())
+
+
+def _fmt_value(value: Any) -> str:
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    if isinstance(value, int):
+        return f"0x{value:x}"
+    return str(value)
+
+
+def _fmt_changes(changes: Dict[str, List[Any]]) -> str:
+    return ", ".join(f"{k} {_fmt_value(old)} -> {_fmt_value(new)}" for k, (old, new) in changes.items())
+
+
+def format_text(result: Dict[str, Any]) -> Iterator[str]:
+    """
+    Format a diff result as human-readable lines.
+
+    Consecutive registers that moved by the same offset are summarized on one
+    line, so that inserting a register does not report every one after it.
+    """
+    for entry in result["removed"]:
+        yield f"- {entry['path']} @ 0x{entry['address']:x}"
+    for entry in result["added"]:
+        yield f"+ {entry['path']} @ 0x{entry['address']:x}"
+    for entry in result["renamed"]:
+        yield f"= {entry['old_path']} renamed to {entry['new_path']} @ 0x{entry['address']:x}"
+
+    moved = result["moved"]
+    i = 0
+    while i < len(moved):
+        delta = moved[i]["new_address"] - moved[i]["old_address"]
+        j = i + 1
+        while j < len(moved) and moved[j]["new_address"] - moved[j]["old_address"] == delta:
+            j += 1
+        sign = "+" if delta >= 0 else "-"
+        if j - i == 1:
+            entry = moved[i]
+            yield f"> {entry['path']} moved 0x{entry['old_address']:x} -> 0x{entry['new_address']:x}"
+        else:
+            yield f"> {j - i} registers moved by {sign}0x{abs(delta):x}: {moved[i]['path']} ... {moved[j - 1]['path']}"
+        i = j
+
+    for entry in result["changed"]:
+        if entry["changes"]:
+            yield f"~ {entry['path']}: {_fmt_changes(entry['changes'])}"
+        for name in entry["removed_fields"]:
+            yield f"- {entry['path']}.{name}"
+        for name in entry["added_fields"]:
+            yield f"+ {entry['path']}.{name}"
+        for name, changes in entry["changed_fields"].items():
+            yield f"~ {entry['path']}.{name}: {_fmt_changes(changes)}"
@@ -0,0 +1,145 @@
+from typing import Any, Dict, List, Optional, Tuple
+import enum
+import hashlib
+import json
+
+from systemrdl.node import Node, AddressableNode, FieldNode, AddrmapNode, RegfileNode
+from systemrdl.rdltypes import UserStruct, PropertyReference
+from systemrdl.rdltypes.user_enum import UserEnum
+
+#: Bump if the hashed content changes, so that fingerprints from different
+#: versions are never considered equal
+FINGERPRINT_VERSION = 1
+
+
+def _encode_value(value: Any, node: Node) -> Any:
+    """
+    Convert a property value to a JSON-serializable representation.
+    References to other nodes are encoded relative to the node, so that
+    identical subtrees hash identically regardless of where they are placed.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Node):
+        return {"ref": node.get_rel_path(value)}
+    if isinstance(value, PropertyReference):
+        ref_node = getattr(value, "node", None)
+        return {
+            "ref": node.get_rel_path(ref_node) if isinstance(ref_node, Node) else None,
+            "prop": value.name,
+        }
+    if isinstance(value, UserEnum):
+        return {"enum": type(value).type_name, "name": value.name, "value": value.value}
+    if isinstance(value, enum.Enum):
+        return {"enum": type(value).__name__, "name": value.name}
+    if isinstance(value, UserStruct):
+        return {
+            "struct": type(value).type_name,
+            "members": {k: _encode_value(v, node) for k, v in sorted(value.members.items())},
+        }
+    if isinstance(value, list):
+        return [_encode_value(v, node) for v in value]
+    if isinstance(value, type) and issubclass(value, UserEnum):
+        return {"enum_type": value.type_name}
+    return repr(value)
+
+
+def _hash(content: Any) -> str:
+    s = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+class Fingerprinter:
+    """
+    Computes structural hashes of an elaborated design.
+
+    A node's hash covers its component type, properties and children,
+    including each child's name, relative address, array dimensions and
+    hash. It does not include the node's own name or address, so identical
+    subtrees that are placed at different locations share the same hash.
+
+    Hashes are memoized by component type, so identical instances of the same
+    (parameterized) type are only hashed once.
+    """
+    def __init__(self) -> None:
+        self._memo: Dict[Tuple[int, str], str] = {}
+
+    def _get_memo_key(self, node: Node) -> Optional[Tuple[int, str]]:
+        # Type names of parameterized types, or types that are modified by
+        # dynamic property assignments, are unique to that variant
+        if node.type_name is None or node.inst.original_def is None:
+            return None
+        return (id(node.inst.original_def), node.type_name)
+
+    def get_hash(self, node: Node) -> str:
+        key = self._get_memo_key(node)
+        if key is not None:
+            cached = self._memo.get(key)
+            if cached is not None:
+                return cached
+
+        content: Dict[str, Any] = {
+            "kind": type(node).__name__,
+            "type": node.type_name,
+            "properties": {
+                prop: _encode_value(node.get_property(prop), node)
+                for prop in sorted(node.list_properties(list_all=True))
+            },
+        }
+        if isinstance(node, FieldNode):
+            content["bits"] = [node.lsb, node.width]
+        if isinstance(node, AddressableNode):
+            content["size"] = node.size
+
+        children: List[Any] = []
+        for child in node.children(unroll=False):
+            entry: Dict[str, Any] = {
+                "name": child.inst_name,
+                "hash": self.get_hash(child),
+            }
+            if isinstance(child, AddressableNode):
+                entry["offset"] = child.raw_address_offset
+                entry["dims"] = child.array_dimensions
+                entry["stride"] = child.array_stride
+            children.append(entry)
+        content["children"] = children
+
+        h = _hash(content)
+        if key is not None:
+            self._memo[key] = h
+        return h
+
+
+def get_fingerprint(top_node: AddrmapNode) -> Dict[str, Any]:
+    """
+    Compute the fingerprint of an elaborated design.
+
+    Returns a JSON-serializable dictionary containing the hash of the whole
+    design, and the hash and address of every addrmap and regfile subtree.
+    """
+    fp = Fingerprinter()
+
+    subtrees: Dict[str, Dict[str, Any]] = {}
+    def visit(node: AddressableNode) -> None:
+        subtrees[node.get_path(empty_array_suffix="[]")] = {
+            "type": node.type_name,
+            "address": node.raw_absolute_address,
+            "hash": fp.get_hash(node),
+        }
+        for child in node.children(unroll=False):
+            if isinstance(child, (AddrmapNode, RegfileNode)):
+                visit(child)
+    visit(top_node)
+
+    # The design's hash also covers the top-level's name and address
+    top_hash = _hash([
+        FINGERPRINT_VERSION,
+        top_node.inst_name,
+        top_node.raw_absolute_address,
+        subtrees[top_node.get_path()]["hash"],
+    ])
+    return {
+        "version": FINGERPRINT_VERSION,
+        "hash": top_hash,
+        "subtrees": subtrees,
+    }
@@ -0,0 +1,186 @@
+"""
+Cache of the component definitions that foreign importers register.
+
+Importers that set ``supports_import_cache`` have the results of
+``do_import()`` pickled into the PeakRDL cache, keyed by the contents of the
+input file, the importer's identity and configuration, and its options. On a
+hit, the definitions are registered in the compiler directly, without running
+the importer.
+"""
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+import os
+import io
+import sys
+import inspect
+import hashlib
+import pickle
+
+import systemrdl
+
+from .__about__ import __version__
+from . import cache
+
+if TYPE_CHECKING:
+    import argparse
+    from systemrdl import RDLCompiler
+    from systemrdl.component import Component
+    from .importer import Importer
+
+#: Bump if the format of cache entries changes
+IMPORT_CACHE_VERSION = 1
+
+_NAMESPACE = "imports"
+
+
+def get_importer_version(importer: 'Importer') -> Optional[str]:
+    """
+    Version of the importer's distribution. If it is not part of one, a hash of
+    the importer's source file is used instead.
+    """
+    dist_version = getattr(importer, "dist_version", None)
+    if dist_version:
+        return dist_version
+    try:
+        with open(inspect.getabsfile(type(importer)), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (TypeError, OSError):
+        return None
+
+
+def get_key(importer: 'Importer', options: 'argparse.Namespace', path: str) -> str:
+    with open(path, "rb") as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    cls = type(importer)
+    return cache.hash_key(
+        IMPORT_CACHE_VERSION,
+        __version__,
+        systemrdl.__version__,
+        f"{cls.__module__}.{cls.__qualname__}",
+        importer.name,
+        get_importer_version(importer),
+        repr(sorted(importer.cfg.items())),
+        repr(sorted(importer.get_import_cache_options(options).items())),
+        content_hash,
+    )
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickles imported definitions without the compiler state they refer to.
+
+    References to the compiler, the root component, definitions and user
+    properties that existed before the import, and the input file's path, are
+    stored symbolically, and resolved against the compiler that the entry is
+    replayed into.
+    """
+    def __init__(self, f: io.BytesIO, rdlc: 'RDLCompiler', path: str, existing_defs: Dict[int, str], existing_udps: Dict[int, str]) -> None:
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.objects = {
+            id(rdlc): ("compiler",),
+            id(rdlc.env): ("env",),
+            id(rdlc.msg): ("msg",),
+            id(rdlc.root): ("root",),
+        }
+        self.paths = {path: 0, os.path.abspath(path): 1}
+        self.existing_defs = existing_defs
+        self.existing_udps = existing_udps
+
+    def persistent_id(self, obj: Any) -> Optional[Tuple]: # pylint: disable=inconsistent-return-statements
+        if isinstance(obj, str):
+            if obj in self.paths:
+                return ("path", self.paths[obj])
+            return None
+        pid = self.objects.get(id(obj))
+        if pid is not None:
+            return pid
+        if id(obj) in self.existing_defs:
+            return ("type", self.existing_defs[id(obj)])
+        if id(obj) in self.existing_udps:
+            return ("udp", self.existing_udps[id(obj)])
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, f: io.BytesIO, rdlc: 'RDLCompiler', path: str) -> None:
+        super().__init__(f)
+        self.rdlc = rdlc
+        self.paths = [path, os.path.abspath(path)]
+
+    def persistent_load(self, pid: Tuple) -> Any:
+        kind = pid[0]
+        if kind == "compiler":
+            return self.rdlc
+        if kind == "env":
+            return self.rdlc.env
+        if kind == "msg":
+            return self.rdlc.msg
+        if kind == "root":
+            return self.rdlc.root
+        if kind == "path":
+            return self.paths[pid[1]]
+        if kind == "type":
+            # Raises KeyError if the definition no longer exists
+            return self.rdlc.root.comp_defs[pid[1]]
+        if kind == "udp":
+            return self.rdlc.env.property_rules.user_properties[pid[1]]
+        raise pickle.UnpicklingError(f"Unknown persistent id: {pid}")
+
+
+def _replay(rdlc: 'RDLCompiler', data: bytes, path: str) -> bool:
+    try:
+        entry = _Unpickler(io.BytesIO(data), rdlc, path).load()
+        comp_defs: List['Component'] = entry["comp_defs"]
+        udps: Dict[str, Any] = entry["udps"]
+    except Exception: # pylint: disable=broad-except
+        # Treat entries that cannot be loaded as a miss
+        return False
+
+    # Same as RDLImporter.register_root_component()
+    for udp_name, udp in udps.items():
+        rdlc.env.property_rules.user_properties[udp_name] = udp
+    for definition in comp_defs:
+        assert definition.type_name is not None
+        rdlc.namespace.register_type(definition.type_name, definition, definition.def_src_ref)
+        rdlc.root.comp_defs[definition.type_name] = definition
+        definition.parent_scope = rdlc.root
+    return True
+
+
+def do_import(rdlc: 'RDLCompiler', importer: 'Importer', options: 'argparse.Namespace', path: str) -> None:
+    """
+    Import a foreign file, replaying the importer's results from the cache if
+    the same file was imported before.
+    """
+    key = get_key(importer, options, path)
+    data = cache.load_bytes(_NAMESPACE, key, ".pickle")
+    if data is not None and _replay(rdlc, data, path):
+        return
+
+    prev_defs = dict(rdlc.root.comp_defs)
+    user_properties = rdlc.env.property_rules.user_properties
+    prev_udps = dict(user_properties)
+
+    importer.do_import(rdlc, options, path)
+
+    comp_defs = [
+        definition for type_name, definition in rdlc.root.comp_defs.items()
+        if prev_defs.get(type_name) is not definition
+    ]
+    udps = {
+        udp_name: udp for udp_name, udp in user_properties.items()
+        if prev_udps.get(udp_name) is not udp
+    }
+
+    f = io.BytesIO()
+    pickler = _Pickler(
+        f, rdlc, path,
+        {id(definition): type_name for type_name, definition in prev_defs.items()},
+        {id(udp): udp_name for udp_name, udp in prev_udps.items()},
+    )
+    try:
+        pickler.dump({"comp_defs": comp_defs, "udps": udps})
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        # Not all importers produce definitions that can be pickled
+        print(f"warning: Results of importer '{importer.name}' cannot be cached: {e}", file=sys.stderr)
+        return
+    cache.save_bytes(_NAMESPACE, key, f.getvalue(), ".pickle")
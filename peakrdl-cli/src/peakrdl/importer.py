@@ -1,10 +1,10 @@
 from typing import TYPE_CHECKING, List, Dict, Any
+import argparse
 
 from .config import schema
 from .config.loader import AppConfig
 
 if TYPE_CHECKING:
-    import argparse
     from systemrdl import RDLCompiler
 
 class Importer:
@@ -22,6 +22,16 @@ class Importer:
     #: For more details, see :ref:`cfg_schema`
     cfg_schema: Dict[str, Any] = {}
 
+    #: Set to True to cache the component definitions that ``do_import()``
+    #: registers. On subsequent runs, they are loaded from the PeakRDL cache
+    #: instead of importing the file again, as long as its contents, the
+    #: importer's version and ``cfg``, and ``get_import_cache_options()`` are
+    #: unchanged.
+    #:
+    #: Only enable this if the definitions can be pickled, and ``do_import()``
+    #: has no other side effects.
+    supports_import_cache = False
+
     def __init__(self) -> None:
         #: Resolved configuration data that was extracted from the PeakRDL TOML,
         #: and validated.
@@ -78,6 +88,28 @@ class Importer:
         """
 
 
+    def get_import_cache_options(self, options: 'argparse.Namespace') -> Dict[str, Any]:
+        """
+        Get the command line options that affect the result of ``do_import()``.
+        Only used if ``supports_import_cache`` is set.
+
+        By default, these are all the arguments defined by
+        ``add_importer_arguments()``. Override this if the import also depends
+        on other options.
+
+        Parameters
+        ----------
+        options: ``argparse.Namespace``
+            Argparse Namespace object containing all the command line argument values
+        """
+        parser = argparse.ArgumentParser(add_help=False)
+        self.add_importer_arguments(parser)
+        return {
+            action.dest: getattr(options, action.dest, None)
+            for action in parser._actions # pylint: disable=protected-access
+        }
+
+
     def do_import(self, rdlc: 'RDLCompiler', options: 'argparse.Namespace', path: str) -> None:
         """
         Defines the implementation of your importer.
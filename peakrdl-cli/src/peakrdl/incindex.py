@@ -0,0 +1,217 @@
+from typing import List, Dict, Set, Optional, Tuple
+import os
+import re
+
+from . import cache
+
+
+INCLUDE_REGEX = re.compile(r'^[ \t]*`include\s+(?:"([^\r\n"]+)"|<([^\r\n>]+)>)', re.MULTILINE)
+CONDITIONAL_REGEX = re.compile(r'`(?:ifdef|ifndef|elsif|else)\b')
+
+class IncludeIndex:
+    """
+    Resolves `include directives against the include search directories by
+    dictionary lookup, rather than probing each directory for each include.
+
+    Each directory is listed at most once per run. If ``persist`` is set,
+    listings are also stored in the PeakRDL cache, and are reused for as long
+    as the directory's modification time is unchanged.
+    """
+    def __init__(self, incdirs: List[str], persist: bool = False) -> None:
+        self.incdirs = incdirs
+        self.persist = persist
+
+        # directory path -> names of files it contains
+        self._listings: Dict[str, Set[str]] = {}
+
+        #: Search directories that resolved at least one include
+        self.used_incdirs: Set[str] = set()
+
+        #: Contents to scan in place of the files on disk, keyed by real path
+        self.buffers: Dict[str, str] = {}
+
+    def _read(self, path: str) -> str:
+        if self.buffers:
+            text = self.buffers.get(os.path.realpath(path))
+            if text is not None:
+                return text
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def _list_files(self, dir_path: str) -> Set[str]:
+        listing = self._listings.get(dir_path)
+        if listing is not None:
+            return listing
+
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            listing = set()
+            self._listings[dir_path] = listing
+            return listing
+
+        cache_key = cache.hash_key("incindex", cache.portable_path(dir_path))
+        if self.persist:
+            cached = cache.load_json("incindex", cache_key)
+            if cached is not None and cached["mtime"] == mtime:
+                listing = set(cached["files"])
+                self._listings[dir_path] = listing
+                return listing
+
+        listing = set()
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    listing.add(entry.name)
+        self._listings[dir_path] = listing
+
+        if self.persist:
+            cache.save_json("incindex", cache_key, {"mtime": mtime, "files": sorted(listing)})
+        return listing
+
+    def is_file(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        dir_path, name = os.path.split(path)
+        return name in self._list_files(dir_path or ".")
+
+    def resolve(self, incl_path: str, including_file: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Resolve an include path using the same precedence as the preprocessor:
+
+        1. Absolute paths are used as-is
+        2. Each include search directory, in order
+        3. Relative to the directory of the including file
+
+        Returns a tuple of the resolved path, and the search directory it was
+        found in, if any.
+        """
+        if os.path.isabs(incl_path):
+            return (incl_path if os.path.isfile(incl_path) else None), None
+
+        for incdir in self.incdirs:
+            path = os.path.join(incdir, incl_path)
+            if self.is_file(path):
+                self.used_incdirs.add(incdir)
+                return path, incdir
+
+        path = os.path.join(os.path.dirname(including_file), incl_path)
+        if self.is_file(path):
+            return path, None
+        return None, None
+
+    def _scan(self, path: str, needed: Set[str], visited: Set[str]) -> bool:
+        """
+        Recursively scan a file's includes, collecting the search directories
+        they resolve from.
+
+        Returns False if the includes cannot be predicted statically.
+        """
+        if path in visited:
+            return True
+        visited.add(path)
+
+        try:
+            text = self._read(path)
+        except OSError:
+            # Let the preprocessor report the error
+            return True
+
+        if "<%" in text:
+            # Perl preprocessor snippets can emit arbitrary includes
+            return False
+
+        for m in INCLUDE_REGEX.finditer(text):
+            incl_path = m.group(1) or m.group(2)
+            resolved, incdir = self.resolve(incl_path, path)
+            if resolved is None:
+                # Let the preprocessor report the error
+                continue
+            if incdir is not None:
+                needed.add(incdir)
+            if not self._scan(resolved, needed, visited):
+                return False
+        return True
+
+    def get_search_paths(self, path: str) -> List[str]:
+        """
+        Get the include search directories needed to compile a file.
+
+        The result is the subset of search directories that resolve at least
+        one of the file's includes, in their original order. Since every
+        include's first matching directory is kept, and no directory before
+        it contained the file, include precedence is unchanged.
+        """
+        needed: Set[str] = set()
+        if not self._scan(path, needed, set()):
+            # Includes are not predictable. Use all directories
+            self.used_incdirs.update(self.incdirs)
+            return list(self.incdirs)
+        return [incdir for incdir in self.incdirs if incdir in needed]
+
+    def get_included_files(self, path: str) -> Set[str]:
+        """
+        Get the real paths of the files that are unconditionally included by a
+        file, directly or transitively.
+
+        Includes in files that contain conditional preprocessor directives or
+        Perl snippets are not followed, since they may not be processed.
+        """
+        return self._walk_includes(path, conditional=False)
+
+    def get_include_closure(self, path: str) -> Set[str]:
+        """
+        Get the real paths of all files that a file may include, directly or
+        transitively.
+
+        Unlike get_included_files(), includes in every branch of conditional
+        preprocessor directives are followed. Includes that are emitted by Perl
+        snippets cannot be predicted, and are not found.
+        """
+        return self._walk_includes(path, conditional=True)
+
+    def _walk_includes(self, path: str, conditional: bool) -> Set[str]:
+        included: Set[str] = set()
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                text = self._read(current)
+            except OSError:
+                continue
+
+            if not conditional and (("<%" in text) or CONDITIONAL_REGEX.search(text)):
+                continue
+
+            for m in INCLUDE_REGEX.finditer(text):
+                resolved, _ = self.resolve(m.group(1) or m.group(2), current)
+                if resolved is None:
+                    continue
+                realpath = os.path.realpath(resolved)
+                if realpath not in included:
+                    included.add(realpath)
+                    stack.append(resolved)
+        return included
+
+    def may_use_macros(self, path: str, names: Set[str]) -> bool:
+        """
+        Check whether preprocessing a file may depend on the definition of any
+        of the given macros, because the file, or any file it may include,
+        refers to one of them.
+
+        Files that contain Perl snippets are assumed to depend on them, since
+        the includes they emit cannot be predicted.
+        """
+        if not names:
+            return False
+        regex = re.compile(r"\b(?:%s)\b" % "|".join(re.escape(name) for name in sorted(names)))
+        for current in [path, *self.get_include_closure(path)]:
+            try:
+                text = self._read(current)
+            except OSError:
+                return True
+            if "<%" in text or regex.search(text):
+                return True
+        return False
+
+    def get_unused_incdirs(self) -> List[str]:
+        return [incdir for incdir in self.incdirs if incdir not in self.used_incdirs]
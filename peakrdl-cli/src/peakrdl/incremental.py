@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING, Dict, List, Any
+import os
+import sys
+
+from systemrdl.node import AddressableNode
+
+from .fingerprint import Fingerprinter, FINGERPRINT_VERSION, _hash
+from . import cache
+
+if TYPE_CHECKING:
+    import argparse
+    from systemrdl.node import AddrmapNode, Node
+    from .subcommand import ExporterSubcommand
+
+# Options that do not affect the contents of exported files. Only used for
+# exporters that replace add_arguments(), so that the options that may affect
+# their outputs are unknown
+_IGNORED_OPTIONS = {
+    "subcommand", "argfile", "peakrdl_cfg", "parallel", "incremental",
+    "output_backend", "write_threads", "fsync", "profile_listeners",
+    "list_outputs", "list_inputs", "max_unrolled_nodes", "max_memory",
+}
+
+
+def get_options_hash(exporter: 'ExporterSubcommand', options: 'argparse.Namespace') -> str:
+    """
+    Hash of everything besides the design that may affect the exporter's
+    outputs. If this changes, all outputs are regenerated.
+    """
+    dests = exporter._output_option_dests # pylint: disable=protected-access
+    if dests is None:
+        opts = {k: v for k, v in vars(options).items() if k not in _IGNORED_OPTIONS}
+    else:
+        opts = {k: getattr(options, k, None) for k in dests}
+    return _hash([
+        FINGERPRINT_VERSION,
+        exporter.name,
+        getattr(exporter, "dist_version", None),
+        repr(sorted(opts.items())),
+        repr(sorted(exporter.cfg.items())),
+    ])
+
+
+def get_node_hash(fp: Fingerprinter, node: 'Node') -> str:
+    """
+    Hash of a node's subtree, and its location in the design
+    """
+    if isinstance(node, AddressableNode):
+        address = node.raw_absolute_address
+    else:
+        address = None
+    return _hash([node.get_path(empty_array_suffix="[]"), address, fp.get_hash(node)])
+
+
+def get_state_key(exporter: 'ExporterSubcommand', options: 'argparse.Namespace') -> str:
+    """
+    Key of the incremental export state of an exporter's output.
+
+    The state refers to the outputs at that exact location, so it is keyed by
+    the real path of the output, rather than by a portable path that other
+    checkouts would share.
+    """
+    return cache.hash_key(exporter.name, os.path.realpath(options.output))
+
+
+def invalidate(exporter: 'ExporterSubcommand', options: 'argparse.Namespace') -> None:
+    """
+    Forget the incremental export state of an exporter's output.
+
+    Called before exporting all outputs without --incremental, since the
+    outputs no longer match the state of the previous incremental run.
+    """
+    cache.delete("incremental", get_state_key(exporter, options))
+
+
+def remove_outputs(output_dir: str, paths: List[str]) -> List[str]:
+    """
+    Delete outputs of a previous run that are within the output directory.
+    Returns the paths that were deleted.
+    """
+    removed = []
+    for path in paths:
+        if not path.startswith(output_dir + os.sep):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"warning: Unable to remove '{path}': {e.strerror}", file=sys.stderr)
+            continue
+        removed.append(path)
+    return removed
+
+
+def export(exporter: 'ExporterSubcommand', top_node: 'AddrmapNode', options: 'argparse.Namespace') -> None:
+    """
+    Only regenerate the outputs of an exporter whose subtree changed since the
+    previous run.
+
+    Hashes of each output's subtree are persisted in the cache, keyed by the
+    exporter's name and output path.
+    """
+    key = get_state_key(exporter, options)
+    options_hash = get_options_hash(exporter, options)
+    prev_state = cache.load_json("incremental", key)
+    if not isinstance(prev_state, dict):
+        prev_state = {"outputs": {}}
+    if prev_state.get("options") != options_hash:
+        prev_outputs: Dict[str, Any] = {}
+    else:
+        prev_outputs = prev_state["outputs"]
+
+    fp = Fingerprinter()
+    hashes: Dict[str, str] = {}
+    stale: List[str] = []
+    for path, node in exporter.get_output_dependencies(top_node, options).items():
+        h = get_node_hash(fp, node)
+        hashes[os.path.abspath(path)] = h
+        if prev_outputs.get(os.path.abspath(path)) != h or not os.path.exists(path):
+            stale.append(path)
+
+    print(f"note: Incremental export: {len(stale)} of {len(hashes)} outputs are out of date", file=sys.stderr)
+    if stale:
+        exporter.do_export_outputs(top_node, options, stale)
+
+    # Outputs of the previous run that are no longer generated, for example
+    # because their block was removed from the design
+    removed = remove_outputs(
+        os.path.abspath(options.output),
+        sorted(set(prev_state["outputs"]) - set(hashes))
+    )
+    if removed:
+        print(f"note: Incremental export: removed {len(removed)} outputs that are no longer generated", file=sys.stderr)
+
+    cache.save_json("incremental", key, {
+        "options": options_hash,
+        "outputs": hashes,
+    })
@@ -0,0 +1,177 @@
+from typing import TYPE_CHECKING, Dict, Tuple, List, Any, Callable, Iterator
+import contextlib
+import re
+import time
+
+from systemrdl import walker
+from systemrdl.walker import RDLListener
+from systemrdl.node import AddrmapNode, RegfileNode, MemNode
+
+if TYPE_CHECKING:
+    from systemrdl.node import Node
+
+# Walker classes whose walk() is instrumented. RDLSimpleWalker only exists in
+# newer versions of the compiler
+_WALKER_CLASSES = [
+    cls for cls in (getattr(walker, "RDLSteerableWalker", None), getattr(walker, "RDLSimpleWalker", None), walker.RDLWalker)
+    if cls is not None
+]
+
+
+class _ListenerProxy:
+    """
+    Stands in for a listener that is passed to a walker, so that each of its
+    enter_*() and exit_*() callbacks can be timed
+    """
+    __slots__ = ("_listener", "_profile")
+
+    def __init__(self, listener: RDLListener, profile: 'WalkerProfile') -> None:
+        self._listener = listener
+        self._profile = profile
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith(("enter_", "exit_")):
+            return self._profile.get_callback(self._listener, name)
+        return getattr(self._listener, name)
+
+
+class _SubtreeTimer:
+    """
+    Times the subtree of each block in a walk. The start listener is placed
+    before all other listeners, and the end listener after them, so that the
+    time spans all callbacks of the block and its descendants.
+    """
+    def __init__(self, profile: 'WalkerProfile') -> None:
+        self.profile = profile
+        self.starts: List[float] = []
+        self.start = _SubtreeStart(self)
+        self.end = _SubtreeEnd(self)
+
+
+class _SubtreeStart(RDLListener):
+    def __init__(self, timer: _SubtreeTimer) -> None:
+        self.timer = timer
+
+    def enter_Component(self, node: 'Node') -> None:
+        if isinstance(node, (AddrmapNode, RegfileNode, MemNode)):
+            self.timer.starts.append(time.perf_counter())
+
+
+class _SubtreeEnd(RDLListener):
+    def __init__(self, timer: _SubtreeTimer) -> None:
+        self.timer = timer
+
+    def exit_Component(self, node: 'Node') -> None:
+        if isinstance(node, (AddrmapNode, RegfileNode, MemNode)) and self.timer.starts:
+            elapsed = time.perf_counter() - self.timer.starts.pop()
+            self.timer.profile.add_subtree(node, elapsed)
+
+
+class WalkerProfile:
+    """
+    Counts and times the callbacks of every RDLListener that is driven by a
+    walker, as well as the time spent walking each block's subtree.
+    """
+    def __init__(self) -> None:
+        #: Number of calls, and total time, of each listener callback.
+        #: Keyed by (listener class name, callback name, node type name)
+        self.callbacks: Dict[Tuple[str, str, str], List[Any]] = {}
+
+        #: Number of walks, and total time, spent in the subtree of each block.
+        #: Keyed by the id of the block's component instance. Times include
+        #: nested subtrees.
+        self.subtrees: Dict[int, List[Any]] = {}
+
+        # Callbacks that the listener class does not override, and are
+        # therefore not worth timing
+        self._default_callbacks: Dict[Tuple[type, str], bool] = {}
+
+    def get_callback(self, listener: RDLListener, name: str) -> Callable:
+        method = getattr(listener, name)
+        key = (type(listener), name)
+        is_default = self._default_callbacks.get(key)
+        if is_default is None:
+            is_default = getattr(type(listener), name, None) is getattr(RDLListener, name, None)
+            self._default_callbacks[key] = is_default
+        if is_default:
+            # Walkers recognize the bound base class method, and skip it
+            return method
+
+        def timed_callback(node: 'Node') -> Any:
+            t_start = time.perf_counter()
+            try:
+                return method(node)
+            finally:
+                elapsed = time.perf_counter() - t_start
+                stat_key = (type(listener).__name__, name, type(node).__name__)
+                stat = self.callbacks.get(stat_key)
+                if stat is None:
+                    stat = [0, 0.0]
+                    self.callbacks[stat_key] = stat
+                stat[0] += 1
+                stat[1] += elapsed
+        return timed_callback
+
+    def add_subtree(self, node: 'Node', elapsed: float) -> None:
+        stat = self.subtrees.get(id(node.inst))
+        if stat is None:
+            # Keep a reference to the node so that the instance's id is not
+            # reused
+            stat = [node, 0, 0.0]
+            self.subtrees[id(node.inst)] = stat
+        stat[1] += 1
+        stat[2] += elapsed
+
+    @contextlib.contextmanager
+    def instrument(self) -> Iterator['WalkerProfile']:
+        """
+        Instrument all walks while in this context.
+
+        The public walk() method of each walker class is wrapped, so that the
+        listeners it is given are replaced by timing proxies. Listeners and
+        walkers that are created by exporter plugins are instrumented without
+        changes.
+        """
+        profile = self
+        orig_walks: Dict[type, Callable] = {}
+
+        def wrap_walk(orig_walk: Callable) -> Callable:
+            def walk(self: Any, node: 'Node', *listeners: RDLListener, skip_top: bool = False) -> None:
+                timer = _SubtreeTimer(profile)
+                proxies = [_ListenerProxy(listener, profile) for listener in listeners]
+                orig_walk(self, node, timer.start, *proxies, timer.end, skip_top=skip_top)
+            return walk
+
+        for cls in _WALKER_CLASSES:
+            if cls not in orig_walks and "walk" in cls.__dict__:
+                orig_walks[cls] = cls.__dict__["walk"]
+                cls.walk = wrap_walk(orig_walks[cls]) # type: ignore
+        try:
+            yield self
+        finally:
+            for cls, orig_walk in orig_walks.items():
+                cls.walk = orig_walk # type: ignore
+
+    def format_report(self, top_n: int = 10) -> Iterator[str]:
+        """
+        Format the slowest callbacks and subtrees as human-readable lines
+        """
+        callbacks = sorted(self.callbacks.items(), key=lambda item: item[1][1], reverse=True)
+        total_calls = sum(stat[0] for stat in self.callbacks.values())
+        total_time = sum(stat[1] for stat in self.callbacks.values())
+        yield f"Listener callbacks: {total_calls} calls, {total_time * 1000:.1f} ms total"
+        yield f"{'time (ms)':>12} {'calls':>10} {'us/call':>10}  callback"
+        for (listener_name, name, node_type), (calls, elapsed) in callbacks[:top_n]:
+            yield (
+                f"{elapsed * 1000:>12.3f} {calls:>10} {elapsed * 1e6 / calls:>10.2f}  "
+                f"{listener_name}.{name}({node_type})"
+            )
+
+        subtrees = sorted(self.subtrees.values(), key=lambda stat: stat[2], reverse=True)
+        yield ""
+        yield "Subtrees (including nested subtrees)"
+        yield f"{'time (ms)':>12} {'walks':>10}  path"
+        for node, walks, elapsed in subtrees[:top_n]:
+            # Elements of unrolled arrays share the same stats
+            path = re.sub(r"\[\d+\]", "[]", node.get_path(empty_array_suffix="[]"))
+            yield f"{elapsed * 1000:>12.3f} {walks:>10}  {path}"
@@ -0,0 +1,209 @@
+"""
+Run ledger that records the phase timings and resource usage of each PeakRDL
+invocation as one line of JSON.
+"""
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+import os
+import sys
+import json
+import hashlib
+import datetime
+import statistics
+
+from .plugins.hooks import HookPlugin
+from .stats import get_design_stats
+from . import cache
+
+if TYPE_CHECKING:
+    import argparse
+    from systemrdl.node import AddrmapNode
+    from .subcommand import Subcommand
+
+
+def get_peak_rss() -> Optional[int]:
+    """
+    Peak resident memory of this process, in bytes.
+    Returns None if it cannot be determined on this platform.
+    """
+    try:
+        import resource # pylint: disable=import-outside-toplevel
+    except ImportError: # pragma: no cover
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # Already in bytes on macOS
+        return rss
+    return rss * 1024
+
+
+class RunLedger(HookPlugin):
+    """
+    Built-in hook that collects the metrics of the current invocation, and
+    appends them to the ledger file once it completes.
+
+    Only phases that run in the main process are recorded.
+    """
+    name = "ledger"
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self.timings: Dict[str, float] = {
+            "config": 0.0,
+            "compile": 0.0,
+            "elaborate": 0.0,
+            "export": 0.0,
+        }
+        self.designs: List[str] = []
+        self.nodes: Dict[str, int] = {"declared": 0, "unrolled": 0}
+        self._input_hashes: List[str] = []
+
+    def post_compile_file(self, path: str, elapsed: float) -> None:
+        self.timings["compile"] += elapsed
+        try:
+            with open(path, "rb") as f:
+                self._input_hashes.append(hashlib.sha256(f.read()).hexdigest())
+        except OSError:
+            pass
+
+    def post_elaborate(self, top_node: 'AddrmapNode', elapsed: float) -> None:
+        self.timings["elaborate"] += elapsed
+        if top_node.inst_name not in self.designs:
+            self.designs.append(top_node.inst_name)
+        stats = get_design_stats(top_node)
+        self.nodes["declared"] += sum(stats.declared.values())
+        self.nodes["unrolled"] += stats.total_unrolled
+
+    def post_export(self, subcommand: 'Subcommand', top_node: 'AddrmapNode', options: 'argparse.Namespace', elapsed: float) -> None:
+        self.timings["export"] += elapsed
+
+    def get_input_fingerprint(self) -> Optional[str]:
+        """
+        Hash of the contents of all input files. Does not depend on their paths.
+        """
+        if not self._input_hashes:
+            return None
+        return hashlib.sha256("".join(sorted(self._input_hashes)).encode("utf-8")).hexdigest()
+
+    def get_record(self, subcommand: str, exit_code: int, total_time: float, plugins: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "subcommand": subcommand,
+            "design": ",".join(self.designs) or None,
+            "input_fingerprint": self.get_input_fingerprint(),
+            "exit_code": exit_code,
+            "timings": dict(self.timings, total=total_time),
+            "peak_rss": get_peak_rss(),
+            "nodes": self.nodes,
+            "cache": cache.get_stats(),
+            "plugins": plugins,
+        }
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Append a record to the ledger.
+        Recording is best-effort. Failures to write are reported as a warning.
+        """
+        line = json.dumps(record, sort_keys=True) + "\n"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # A single write of a line in append mode is not interleaved with
+            # those of concurrent runs
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"warning: Unable to write to run ledger {self.path}: {e}", file=sys.stderr)
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """
+    Load all records from a ledger. Lines that are not valid are skipped.
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "subcommand" in record:
+                records.append(record)
+    return records
+
+
+def get_group_key(record: Dict[str, Any]) -> Tuple[str, str]:
+    return (record["subcommand"], record.get("design") or "-")
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Percentile of a sorted list, using linear interpolation
+    """
+    pos = (len(values) - 1) * p / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def summarize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Summarize the total time and peak memory of successful runs, per
+    subcommand and design
+    """
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for record in records:
+        if record.get("exit_code") == 0:
+            groups.setdefault(get_group_key(record), []).append(record)
+
+    summary = []
+    for (subcommand, design), group in sorted(groups.items()):
+        times = sorted(r["timings"]["total"] for r in group)
+        rss = [r["peak_rss"] for r in group if r.get("peak_rss") is not None]
+        summary.append({
+            "subcommand": subcommand,
+            "design": design,
+            "runs": len(group),
+            "p50": percentile(times, 50),
+            "p90": percentile(times, 90),
+            "max": times[-1],
+            "peak_rss_max": max(rss) if rss else None,
+        })
+    return summary
+
+
+def find_regressions(records: List[Dict[str, Any]], window: int, threshold: float, min_runs: int = 3) -> List[Dict[str, Any]]:
+    """
+    Find successful runs whose total time or peak memory exceeds the median of
+    the previous runs of the same subcommand and design by more than
+    ``threshold`` times.
+
+    The median is taken over up to ``window`` previous runs, and only once at
+    least ``min_runs`` are available.
+    """
+    history: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    regressions = []
+    for record in records:
+        if record.get("exit_code") != 0:
+            continue
+        previous = history.setdefault(get_group_key(record), [])
+        recent = previous[-window:]
+        if len(recent) >= min_runs:
+            for metric, value, past in (
+                ("time", record["timings"]["total"], [r["timings"]["total"] for r in recent]),
+                ("peak_rss", record.get("peak_rss"), [r["peak_rss"] for r in recent if r.get("peak_rss")]),
+            ):
+                if value is None or len(past) < min_runs:
+                    continue
+                median = statistics.median(past)
+                if median > 0 and value > median * threshold:
+                    regressions.append({
+                        "time": record.get("time"),
+                        "subcommand": record["subcommand"],
+                        "design": get_group_key(record)[1],
+                        "metric": metric,
+                        "value": value,
+                        "median": median,
+                        "ratio": value / median,
+                    })
+        previous.append(record)
+    return regressions
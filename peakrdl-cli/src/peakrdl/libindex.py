@@ -0,0 +1,211 @@
+from typing import TYPE_CHECKING, List, Dict, Set, Any, Optional, Tuple
+import os
+import re
+import fnmatch
+import hashlib
+
+from . import cache
+
+if TYPE_CHECKING:
+    from systemrdl import RDLCompiler
+
+
+# Bump if the format of index entries changes
+INDEX_VERSION = 2
+
+COMPONENT_KEYWORDS = {
+    "addrmap", "regfile", "reg", "field", "mem", "signal", "enum", "struct",
+    "property",
+}
+
+TOKEN_REGEX = re.compile(
+    r'"(?:\\.|[^"\\])*"'    # strings
+    r'|//[^\n]*'            # line comments
+    r'|/\*.*?\*/'           # block comments
+    r'|([{}])'              # braces
+    r'|\b([A-Za-z_]\w*)\b', # identifiers
+    re.DOTALL
+)
+
+def scan_rdl_text(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Perform a lightweight scan of SystemRDL source text.
+
+    Returns a tuple of:
+
+    - Names of component types defined in the root namespace
+    - All other identifiers that are referenced. This is a superset of the
+      types the file depends on.
+
+    The scan does not evaluate the preprocessor, so definitions and references
+    in all branches of conditional blocks are included.
+    """
+    definitions: List[str] = []
+    references: Set[str] = set()
+    depth = 0
+    expect_name = False
+    for m in TOKEN_REGEX.finditer(text):
+        brace, ident = m.group(1), m.group(2)
+        if brace:
+            expect_name = False
+            if brace == "{":
+                depth += 1
+            else:
+                depth = max(0, depth - 1)
+        elif ident:
+            if expect_name:
+                definitions.append(ident)
+                expect_name = False
+            elif depth == 0 and ident in COMPONENT_KEYWORDS:
+                expect_name = True
+            else:
+                references.add(ident)
+    references.difference_update(definitions)
+    return definitions, sorted(references)
+
+
+class LibraryIndex:
+    """
+    Index of the component types defined by the SystemRDL files in one or more
+    library directories.
+
+    The index of each directory is persisted in the PeakRDL cache, and is
+    updated incrementally by only rescanning files that changed.
+    """
+    def __init__(self, libdirs: List[str]) -> None:
+        self.libdirs = libdirs
+
+        #: Per-file scan results: path -> {"defines": [...], "refs": [...]}
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        #: Type name -> path of the library file that defines it.
+        #: If multiple files define the same name, the first one wins.
+        self.definers: Dict[str, str] = {}
+
+        for libdir in libdirs:
+            self._load_dir(libdir)
+
+        for path, entry in self.files.items():
+            for name in entry["defines"]:
+                self.definers.setdefault(name, path)
+
+    def _load_dir(self, libdir: str) -> None:
+        libdir = os.path.realpath(libdir)
+        cache_key = cache.hash_key(INDEX_VERSION, cache.portable_path(libdir))
+        cached = cache.load_json("libindex", cache_key) or {}
+        prev_entries = cached.get("files", {})
+
+        entries = {}
+        changed = False
+        for dirpath, dirnames, filenames in os.walk(libdir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if not filename.endswith(".rdl"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                # Entries are keyed by portable paths, so that an index can be
+                # reused from a different checkout of the same project
+                entry_path = cache.portable_path(path)
+                st = os.stat(path)
+                stamp = [st.st_mtime_ns, st.st_size]
+                prev = prev_entries.get(entry_path)
+                if prev is not None and prev["stamp"] == stamp:
+                    entries[entry_path] = prev
+                    continue
+
+                with open(path, "rb") as fb:
+                    data = fb.read()
+                digest = hashlib.sha256(data).hexdigest()
+                changed = True
+                if prev is not None and prev["sha"] == digest:
+                    # Only the timestamp changed. For example, in a fresh checkout
+                    entries[entry_path] = dict(prev, stamp=stamp)
+                    continue
+
+                definitions, references = scan_rdl_text(data.decode("utf-8", errors="replace"))
+                entries[entry_path] = {
+                    "stamp": stamp,
+                    "sha": digest,
+                    "defines": definitions,
+                    "refs": references,
+                }
+
+        if changed or (len(entries) != len(prev_entries)):
+            cache.save_json("libindex", cache_key, {"libdir": cache.portable_path(libdir), "files": entries})
+
+        for entry_path, entry in entries.items():
+            self.files.setdefault(cache.resolve_path(entry_path), entry)
+
+    def match_names(self, pattern: str) -> List[str]:
+        return [name for name in self.definers if fnmatch.fnmatchcase(name, pattern)]
+
+    def resolve(self, names: Set[str], exclude: Optional[Set[str]] = None) -> List[str]:
+        """
+        Resolve the library files needed to define the given type names.
+
+        Returns the list of files in dependency order, so that each file is
+        compiled after the files that it references.
+
+        Names in ``exclude`` are never resolved from the library.
+        """
+        exclude = exclude or set()
+        ordered: List[str] = []
+        visited: Set[str] = set()
+
+        def visit(path: str) -> None:
+            if path in visited:
+                return
+            visited.add(path)
+            # Resolve dependencies first. Cycles are broken by the visited set
+            for name in self.files[path]["refs"]:
+                if name in exclude:
+                    continue
+                dep = self.definers.get(name)
+                if dep is not None and dep != path:
+                    visit(dep)
+            ordered.append(path)
+
+        for name in sorted(names):
+            if name in exclude:
+                continue
+            path = self.definers.get(name)
+            if path is not None:
+                visit(path)
+        return ordered
+
+
+def get_library_files(rdlc: 'RDLCompiler', libdirs: List[str], input_files: List[str], top_names: List[Optional[str]]) -> List[str]:
+    """
+    Determine which library files are needed by the input files and the
+    requested top-level components.
+    """
+    for libdir in libdirs:
+        if not os.path.isdir(libdir):
+            rdlc.msg.fatal(f"Library directory does not exist: {libdir}")
+
+    index = LibraryIndex(libdirs)
+
+    needed: Set[str] = set()
+    local_defs: Set[str] = set()
+    input_realpaths = set()
+    for path in input_files:
+        input_realpaths.add(os.path.realpath(path))
+        if not path.endswith(".rdl") or not os.path.isfile(path):
+            continue
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            definitions, references = scan_rdl_text(f.read())
+        local_defs.update(definitions)
+        needed.update(references)
+
+    for top in top_names:
+        if top is None:
+            continue
+        if any(c in top for c in "*?["):
+            needed.update(index.match_names(top))
+        else:
+            needed.add(top)
+
+    return [
+        path for path in index.resolve(needed, exclude=local_defs)
+        if os.path.realpath(path) not in input_realpaths
+    ]
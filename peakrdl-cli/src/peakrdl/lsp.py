@@ -0,0 +1,600 @@
+from typing import TYPE_CHECKING, List, Dict, Set, Any, Optional, Tuple, BinaryIO, Iterable, Sequence, Type
+import os
+import sys
+import json
+import shutil
+import tempfile
+import traceback
+import urllib.parse
+import urllib.request
+
+from systemrdl import RDLCompiler, RDLCompileError
+from systemrdl.messages import MessagePrinter, Severity
+from systemrdl.component import Component
+from systemrdl.node import AddressableNode, FieldNode
+
+from . import process_input
+from . import incindex
+
+if TYPE_CHECKING:
+    import argparse
+    from systemrdl.node import Node, RootNode
+    from systemrdl.source_ref import SourceRefBase
+    from systemrdl.core.namespace import TypeNSScope, ElementNSScope
+    from systemrdl.properties.user_defined import UserProperty
+    from systemrdl.udp import UDPDefinition
+    from .importer import Importer
+
+
+#-------------------------------------------------------------------------------
+# JSON-RPC transport
+#-------------------------------------------------------------------------------
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """
+    Read one Content-Length framed JSON-RPC message.
+    Returns None at end of stream.
+    """
+    content_length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        k, _, v = line.decode("ascii").partition(":")
+        if k.strip().lower() == "content-length":
+            content_length = int(v.strip())
+    if content_length is None:
+        return None
+    return json.loads(stream.read(content_length).decode("utf-8"))
+
+
+def write_message(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    body = json.dumps(message).encode("utf-8")
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii"))
+    stream.write(body)
+    stream.flush()
+
+
+def uri_to_path(uri: str) -> str:
+    path = urllib.request.url2pathname(urllib.parse.urlparse(uri).path)
+    return os.path.realpath(path)
+
+
+def path_to_uri(path: str) -> str:
+    return urllib.parse.urljoin("file:", urllib.request.pathname2url(os.path.abspath(path)))
+
+
+#-------------------------------------------------------------------------------
+# Compilation
+#-------------------------------------------------------------------------------
+class BufferOverlay:
+    """
+    Temporary directory that mirrors the directories a design is compiled
+    from, with the in-memory buffers of open files in place of their contents
+    on disk.
+
+    The design is compiled from the mirrored paths, so that the compiler reads
+    unsaved edits without any changes to how it opens files. Each mirrored
+    directory links to all files of the original directory, so that includes
+    resolve the same way as they do on disk.
+    """
+    def __init__(self) -> None:
+        #: Root of the mirrored directories
+        self.root = tempfile.mkdtemp(prefix="peakrdl-lsp-")
+
+        # Real paths of the mirrored directories
+        self._dirs: Set[str] = set()
+
+        # Buffer contents that were written to the overlay, keyed by real path
+        self._written: Dict[str, str] = {}
+
+    def get_path(self, path: str) -> str:
+        """
+        Get the overlay path of a file or directory
+        """
+        drive, path = os.path.splitdrive(os.path.realpath(path))
+        return os.path.join(self.root, drive.strip(":\\/"), path.lstrip(os.sep))
+
+    def get_real_path(self, path: str) -> str:
+        """
+        Get the real path of a file that may be within the overlay
+        """
+        prefix = self.root + os.sep
+        if path.startswith(prefix):
+            rel_path = path[len(prefix):]
+            if os.name == "nt":
+                drive, _, rel_path = rel_path.partition(os.sep)
+                path = f"{drive}:{os.sep}{rel_path}"
+            else:
+                path = os.sep + rel_path
+        return os.path.realpath(path)
+
+    def _link(self, path: str, overlay_path: str) -> None:
+        try:
+            os.symlink(path, overlay_path)
+        except OSError:
+            # Symbolic links are not available on all platforms
+            shutil.copyfile(path, overlay_path)
+
+    def _mirror_dir(self, dir_path: str) -> None:
+        overlay_dir = self.get_path(dir_path)
+        os.makedirs(overlay_dir, exist_ok=True)
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            path = os.path.join(dir_path, entry.name)
+            overlay_path = os.path.join(overlay_dir, entry.name)
+            if path not in self._written and not os.path.lexists(overlay_path):
+                self._link(path, overlay_path)
+        self._dirs.add(dir_path)
+
+    def update(self, dirs: Iterable[str], buffers: Dict[str, str]) -> None:
+        """
+        Mirror the given directories, and write the current buffers.
+
+        Directories that were mirrored before are rescanned for new files.
+        """
+        for dir_path in set(os.path.realpath(d) for d in dirs) | self._dirs:
+            self._mirror_dir(dir_path)
+
+        # Files that are no longer open are read from disk again
+        for path in list(self._written):
+            if path not in buffers:
+                overlay_path = self.get_path(path)
+                os.remove(overlay_path)
+                del self._written[path]
+                if os.path.isfile(path):
+                    self._link(path, overlay_path)
+
+        for path, text in buffers.items():
+            if self._written.get(path) == text:
+                continue
+            self._mirror_dir(os.path.dirname(path))
+            overlay_path = self.get_path(path)
+            # Replace the link, rather than writing through it to the file on disk
+            tmp_path = overlay_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp_path, overlay_path)
+            self._written[path] = text
+
+    def close(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class CompilerCheckpoint:
+    """
+    State of a compiler's root namespace between two input files.
+
+    Loading an input file only adds to the root namespace. The component
+    definitions, types and properties that earlier files declared are never
+    modified, so a checkpoint shares them with the compiler instead of copying
+    them. Only the tables that refer to them are copied.
+    """
+    def __init__(self, rdlc: RDLCompiler) -> None:
+        self.type_ns: 'TypeNSScope' = dict(rdlc.namespace.type_ns_stack[0])
+        self.element_ns: 'ElementNSScope' = dict(rdlc.namespace.element_ns_stack[0])
+        self.comp_defs: Dict[str, Component] = dict(rdlc.root.comp_defs)
+        self.children: List[Component] = list(rdlc.root.children)
+        self.udps: Dict[str, 'UserProperty'] = dict(rdlc.env.property_rules.user_properties)
+
+    def restore(self, printer: MessagePrinter) -> RDLCompiler:
+        """
+        Create a compiler that continues from this checkpoint
+        """
+        rdlc = RDLCompiler(message_printer=printer)
+        rdlc.namespace.type_ns_stack[0].update(self.type_ns)
+        rdlc.namespace.element_ns_stack[0].update(self.element_ns)
+        rdlc.env.property_rules.user_properties.update(self.udps)
+        rdlc.root.comp_defs.update(self.comp_defs)
+        rdlc.root.children.extend(self.children)
+        for definition in self.comp_defs.values():
+            definition.parent_scope = rdlc.root
+        return rdlc
+
+
+class DiagnosticCollector(MessagePrinter):
+    """
+    Collects compiler messages rather than printing them
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: List[Tuple[Severity, str, Optional['SourceRefBase']]] = []
+
+    def print_message(self, severity: Severity, text: str, src_ref: 'Optional[SourceRefBase]') -> None:
+        self.messages.append((severity, text, src_ref))
+
+
+def _offset_to_position(text: str, offset: int) -> Tuple[int, int]:
+    line = text.count("\n", 0, offset)
+    return line, offset - (text.rfind("\n", 0, offset) + 1)
+
+
+def get_source_range(src_ref: 'Optional[SourceRefBase]', buffers: Dict[str, str], overlay: Optional[BufferOverlay] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Convert a source reference to a file path and an LSP range.
+
+    Coordinates within files that have an in-memory buffer are derived from
+    the buffer, since the file on disk may be out of date.
+    Paths within the overlay are converted back to the real path of the file.
+    """
+    if src_ref is None:
+        return None
+    path = getattr(src_ref, "path", None)
+    if path is None:
+        return None
+    if overlay is not None:
+        path = overlay.get_real_path(path)
+    else:
+        path = os.path.realpath(path)
+
+    text = buffers.get(path)
+    start_idx = getattr(src_ref, "_start_idx", None)
+    end_idx = getattr(src_ref, "_end_idx", None)
+    if text is not None and start_idx is not None and end_idx is not None:
+        start = _offset_to_position(text, start_idx)
+        end = _offset_to_position(text, end_idx + 1)
+    elif hasattr(src_ref, "line"):
+        line = src_ref.line - 1
+        sel = src_ref.line_selection # type: ignore
+        start = (line, sel[0])
+        end = (line, sel[1] + 1)
+    else:
+        start = end = (0, 0)
+
+    return path, {
+        "start": {"line": start[0], "character": start[1]},
+        "end": {"line": end[0], "character": end[1]},
+    }
+
+
+class Workspace:
+    """
+    Compiled state of the design being edited.
+
+    When a file changes, only the input file that it belongs to and the input
+    files loaded after it are recompiled. The compiler's root namespace is
+    checkpointed before each input file that is open in the editor, or includes
+    a file that is, so that later edits to the same file resume from that
+    checkpoint without parsing the files before it again.
+    """
+    def __init__(
+            self,
+            importers: 'Sequence[Importer]',
+            udp_definitions: 'Sequence[Type[UDPDefinition]]',
+            options: 'argparse.Namespace'
+        ) -> None:
+        self.importers = importers
+        self.options = options
+
+        #: In-memory contents of open files, keyed by real path
+        self.buffers: Dict[str, str] = {}
+
+        # Errors in the initial setup are printed to stderr. Once running,
+        # messages are collected as diagnostics instead
+        self.printer = DiagnosticCollector()
+        rdlc = RDLCompiler()
+        for udp in udp_definitions:
+            rdlc.register_udp(udp)
+
+        self.defines = process_input.parse_defines(rdlc, options.defines)
+        self.inc_index = incindex.IncludeIndex(options.incdirs or [])
+        self.inc_index.buffers = self.buffers
+        self.input_files = process_input.get_input_files(rdlc, options.input_files, options, self.inc_index)
+
+        #: Compiler state before loading the first input file, and each input
+        #: file that can be edited, keyed by the index of the input file
+        self.checkpoints: Dict[int, CompilerCheckpoint] = {0: CompilerCheckpoint(rdlc)}
+
+        #: Mirror of the design's directories, with unsaved edits applied
+        self.overlay = BufferOverlay()
+
+        # Real paths of each input file and the files it included
+        self.file_deps: List[Set[str]] = [set() for _ in self.input_files]
+
+        #: Elaborated design from the most recent successful compile
+        self.root: Optional['RootNode'] = None
+
+        #: Diagnostics from the most recent compile, keyed by real path
+        self.diagnostics: Dict[str, List[Dict[str, Any]]] = {}
+
+        # Instance source locations: (path, line) -> [(start, end, node), ...]
+        self.hover_index: Dict[Tuple[str, int], List[Tuple[int, int, 'Node']]] = {}
+
+    def _restore(self, idx: int) -> RDLCompiler:
+        return self.checkpoints[idx].restore(self.printer)
+
+    def get_first_affected(self, path: str) -> int:
+        """
+        Get the index of the first input file that is affected by a change to
+        the given file.
+        """
+        for idx, deps in enumerate(self.file_deps):
+            if path in deps:
+                return idx
+        # Unknown file. Conservatively recompile everything
+        return 0
+
+    def is_editable(self, idx: int) -> bool:
+        """
+        Whether an input file, or any file it included, is open in the editor
+        """
+        if os.path.realpath(self.input_files[idx]) in self.buffers:
+            return True
+        return any(path in self.buffers for path in self.file_deps[idx])
+
+    def _update_overlay(self, start_idx: int) -> None:
+        """
+        Mirror the directories of all files that the input files being
+        recompiled may include, and write the current buffers
+        """
+        dirs = set(self.options.incdirs or [])
+        for file in self.input_files[start_idx:]:
+            if file.endswith(".rdl"):
+                dirs.add(os.path.dirname(os.path.realpath(file)))
+                dirs.update(os.path.dirname(p) for p in self.inc_index.get_include_closure(file))
+        self.overlay.update(dirs, self.buffers)
+
+    def _load_file(self, rdlc: RDLCompiler, file: str) -> Set[str]:
+        """
+        Load an input file, reading SystemRDL files from the overlay.
+        Returns the real paths of the file and the files it included.
+        """
+        deps = {os.path.realpath(file)}
+        incdirs = process_input.get_file_incdirs(file, self.options, self.inc_index) or []
+        if file.endswith(".rdl"):
+            file = self.overlay.get_path(file)
+            incdirs = [self.overlay.get_path(incdir) for incdir in incdirs]
+        file_info = process_input.load_file(
+            rdlc, self.importers, file, self.defines, incdirs, self.options
+        )
+        if file_info is not None:
+            deps.update(self.overlay.get_real_path(p) for p in file_info.included_files)
+        return deps
+
+    def update(self, path: Optional[str] = None) -> None:
+        """
+        Recompile and re-elaborate after a file was changed.
+        If no path is given, everything is recompiled.
+        """
+        start_idx = 0 if path is None else self.get_first_affected(path)
+        # Resume from the latest checkpoint
+        resume_idx = max(idx for idx in self.checkpoints if idx <= start_idx)
+
+        self.printer.messages.clear()
+        rdlc = self._restore(resume_idx)
+        # Drop the checkpoints of files that were closed
+        for idx in [i for i in self.checkpoints if i > 0 and not self.is_editable(i)]:
+            del self.checkpoints[idx]
+        self.root = None
+        idx = resume_idx
+        try:
+            self._update_overlay(resume_idx)
+            for idx in range(resume_idx, len(self.input_files)):
+                if idx > resume_idx and self.is_editable(idx):
+                    # Checkpoint files that can be edited, and refresh the
+                    # checkpoints of files that were checkpointed before
+                    self.checkpoints[idx] = CompilerCheckpoint(rdlc)
+                self.file_deps[idx] = self._load_file(rdlc, self.input_files[idx])
+
+            self.root = rdlc.elaborate(
+                top_def_name=self.options.top_def_name,
+                inst_name=self.options.inst_name,
+                parameters=process_input.parse_parameters(rdlc, self.options.parameters)
+            )
+        except Exception as e: # pylint: disable=broad-except
+            # Checkpoints after the file that failed are now out of date
+            for later_idx in [i for i in self.checkpoints if i > idx]:
+                del self.checkpoints[later_idx]
+            if not isinstance(e, (RDLCompileError, ValueError)):
+                raise
+
+        self._update_diagnostics()
+        self._update_hover_index()
+
+    def _update_diagnostics(self) -> None:
+        severities = {
+            Severity.DEBUG: 4,
+            Severity.INFO: 3,
+            Severity.WARNING: 2,
+            Severity.ERROR: 1,
+            Severity.FATAL: 1,
+        }
+        self.diagnostics = {}
+        for severity, text, src_ref in self.printer.messages:
+            location = get_source_range(src_ref, self.buffers, self.overlay)
+            if location is None:
+                # Messages without a location are attributed to the top-level file
+                location = (os.path.realpath(self.input_files[-1]), {
+                    "start": {"line": 0, "character": 0},
+                    "end": {"line": 0, "character": 0},
+                })
+            path, rng = location
+            self.diagnostics.setdefault(path, []).append({
+                "range": rng,
+                "severity": severities[severity],
+                "source": "peakrdl",
+                "message": text,
+            })
+
+    def _update_hover_index(self) -> None:
+        self.hover_index = {}
+        if self.root is None:
+            return
+        for node in self.root.descendants(unroll=False):
+            location = get_source_range(node.inst.inst_src_ref, self.buffers, self.overlay)
+            if location is None:
+                continue
+            path, rng = location
+            key = (path, rng["start"]["line"])
+            self.hover_index.setdefault(key, []).append(
+                (rng["start"]["character"], rng["end"]["character"], node)
+            )
+
+    def close(self) -> None:
+        self.overlay.close()
+
+    def get_hover(self, path: str, line: int, character: int) -> Optional[str]:
+        nodes = [
+            node for start, end, node in self.hover_index.get((path, line), [])
+            if start <= character <= end
+        ]
+        if not nodes:
+            return None
+
+        max_shown = 8
+        lines = []
+        for node in nodes[:max_shown]:
+            lines.append(f"**{node.get_path()}**")
+            if isinstance(node, AddressableNode):
+                # Address of the first element of any arrays
+                lines.append(f"- address: `0x{node.raw_absolute_address:x}`")
+                lines.append(f"- size: `0x{node.size:x}`")
+                if node.is_array:
+                    assert node.array_dimensions is not None
+                    dims = "".join(f"[{dim}]" for dim in node.array_dimensions)
+                    lines.append(f"- array: `{dims}`, stride `0x{node.array_stride:x}`")
+            elif isinstance(node, FieldNode):
+                lines.append(f"- bits: `[{node.msb}:{node.lsb}]`")
+            lines.append("")
+        if len(nodes) > max_shown:
+            lines.append(f"... and {len(nodes) - max_shown} more instances")
+        return "\n".join(lines)
+
+
+#-------------------------------------------------------------------------------
+# Server
+#-------------------------------------------------------------------------------
+class LanguageServer:
+    """
+    Minimal language server that publishes diagnostics and address hovers
+    """
+    def __init__(self, workspace: Workspace, stdin: BinaryIO, stdout: BinaryIO) -> None:
+        self.workspace = workspace
+        self.stdin = stdin
+        self.stdout = stdout
+        self.published: Set[str] = set()
+        self.shutdown_requested = False
+
+    def send(self, message: Dict[str, Any]) -> None:
+        message["jsonrpc"] = "2.0"
+        write_message(self.stdout, message)
+
+    def notify(self, method: str, params: Dict[str, Any]) -> None:
+        self.send({"method": method, "params": params})
+
+    def publish_diagnostics(self) -> None:
+        diagnostics = self.workspace.diagnostics
+        # Clear diagnostics of files that no longer have any
+        for path in sorted(self.published | set(diagnostics)):
+            self.notify("textDocument/publishDiagnostics", {
+                "uri": path_to_uri(path),
+                "diagnostics": diagnostics.get(path, []),
+            })
+        self.published = set(diagnostics)
+
+    def recompile(self, path: Optional[str] = None) -> None:
+        self.workspace.update(path)
+        self.publish_diagnostics()
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        method = message.get("method")
+        params = message.get("params") or {}
+        msg_id = message.get("id")
+        result: Any = None
+
+        if method == "initialize":
+            result = {
+                "capabilities": {
+                    # Full document sync
+                    "textDocumentSync": {"openClose": True, "change": 1, "save": True},
+                    "hoverProvider": True,
+                },
+                "serverInfo": {"name": "peakrdl"},
+            }
+        elif method == "initialized":
+            self.recompile()
+        elif method == "textDocument/didOpen":
+            doc = params["textDocument"]
+            path = uri_to_path(doc["uri"])
+            self.workspace.buffers[path] = doc["text"]
+            self.recompile(path)
+        elif method == "textDocument/didChange":
+            path = uri_to_path(params["textDocument"]["uri"])
+            changes = params["contentChanges"]
+            if changes:
+                self.workspace.buffers[path] = changes[-1]["text"]
+            self.recompile(path)
+        elif method == "textDocument/didSave":
+            path = uri_to_path(params["textDocument"]["uri"])
+            if "text" in params:
+                self.workspace.buffers[path] = params["text"]
+            self.recompile(path)
+        elif method == "textDocument/didClose":
+            path = uri_to_path(params["textDocument"]["uri"])
+            if self.workspace.buffers.pop(path, None) is not None:
+                self.recompile(path)
+        elif method == "textDocument/hover":
+            path = uri_to_path(params["textDocument"]["uri"])
+            pos = params["position"]
+            text = self.workspace.get_hover(path, pos["line"], pos["character"])
+            if text is not None:
+                result = {"contents": {"kind": "markdown", "value": text}}
+        elif method == "shutdown":
+            self.shutdown_requested = True
+        elif msg_id is not None:
+            self.send({
+                "id": msg_id,
+                "error": {"code": -32601, "message": f"Method not found: {method}"},
+            })
+            return
+
+        if msg_id is not None:
+            self.send({"id": msg_id, "result": result})
+
+    def serve(self) -> int:
+        """
+        Process messages until the client exits.
+        Returns the process exit code.
+        """
+        while True:
+            message = read_message(self.stdin)
+            if message is None:
+                return 1
+            if message.get("method") == "exit":
+                return 0 if self.shutdown_requested else 1
+            try:
+                self.handle(message)
+            except Exception as e: # pylint: disable=broad-except
+                # Keep serving. The error is returned to the client instead
+                self.report_error(message, e)
+
+    def report_error(self, message: Dict[str, Any], error: Exception) -> None:
+        """
+        Report an unexpected error while handling a message. Requests get an
+        error response. Errors in notifications are logged by the client.
+        """
+        traceback.print_exc(file=sys.stderr)
+        text = f"Internal error while handling '{message.get('method')}': {type(error).__name__}: {error}"
+        msg_id = message.get("id")
+        if msg_id is not None:
+            self.send({
+                "id": msg_id,
+                "error": {"code": -32603, "message": text},
+            })
+        else:
+            self.notify("window/logMessage", {"type": 1, "message": text})
+
+
+def run_server(workspace: Workspace) -> int:
+    server = LanguageServer(workspace, sys.stdin.buffer, sys.stdout.buffer)
+    try:
+        return server.serve()
+    finally:
+        workspace.close()
@@ -1,20 +1,26 @@
 import argparse
 import sys
 import inspect
-from typing import List, Dict, Optional, NoReturn
+import importlib
+import time
+from typing import TYPE_CHECKING, List, Dict, Optional, NoReturn, Tuple
 
 from systemrdl import RDLCompileError
 
 from .__about__ import __version__
-from .config.loader import load_cfg, AppConfig
+from .config.loader import load_cfg, AppConfig, ConfigError
 from .plugins.exporter import get_exporter_plugins
 from .plugins.importer import get_importer_plugins
+from .plugins import hooks
 from .cmd.dump import Dump
 from .cmd.list_globals import ListGlobals
 from .cmd.preprocess import Preprocess
 from .subcommand import Subcommand
 from . import argfile
 
+if TYPE_CHECKING:
+    from .plugins.importer import ImporterPlugin
+
 
 DESCRIPTION = """
 PeakRDL is a control & status register model automation toolchain.
@@ -26,6 +32,45 @@ For more documentation, visit https://peakrdl.readthedocs.io
 
 """
 
+#: Built-in subcommands that are only imported if they are run, so that they do
+#: not slow down the startup of all other subcommands.
+#: Maps the name of each to its module, class and short description.
+#: An exporter plugin that is installed with the same name takes priority.
+LAZY_SUBCOMMANDS = {
+    "bundle": ("cmd.bundle", "Bundle", "freeze PeakRDL and its plugins into a single precompiled zipapp"),
+    "batch": ("cmd.batch", "Batch", "run many export jobs described by a manifest file"),
+    "worker": ("cmd.worker", "Worker", "process batch jobs from a shared-directory work queue"),
+    "lsp": ("cmd.lsp", "LanguageServer", "run a language server over stdin/stdout"),
+    "snapshot": ("cmd.snapshot", "Snapshot", "write a compact binary table of registers and fields"),
+    "fingerprint": ("cmd.fingerprint", "Fingerprint", "print structural hashes of the register model as JSON"),
+    "diff": ("cmd.diff", "Diff", "compare the registers and fields of two designs"),
+    "stats": ("cmd.stats", "Stats", "print the size of the register model"),
+    "query": ("cmd.query", "Query", "look up nodes of the register model by path, address or type"),
+    "history": ("cmd.history", "History", "summarize the run ledger and flag regressions"),
+    "cache": ("cmd.cache", "Cache", "export or import the PeakRDL cache as a single archive"),
+}
+
+
+class LazySubcommand(Subcommand):
+    """
+    Placeholder for a built-in subcommand that is not run.
+    Only lists it in the help, without importing it.
+    """
+    def __init__(self, name: str) -> None:
+        super().__init__()
+        self.name = name
+        self.short_desc = LAZY_SUBCOMMANDS[name][2]
+
+    def _init_subparser(self, subgroup: 'argparse._SubParsersAction', importers: 'List[ImporterPlugin]') -> None:
+        subgroup.add_parser(self.name, help=self.short_desc)
+
+
+def load_lazy_subcommand(name: str) -> Subcommand:
+    module_name, cls_name, _ = LAZY_SUBCOMMANDS[name]
+    module = importlib.import_module(f".{module_name}", __package__)
+    return getattr(module, cls_name)()
+
+
 class SubcommandHelpFormatter(argparse.RawDescriptionHelpFormatter):
     def _format_action(self, action) -> str: # type: ignore
         parts = super(argparse.RawDescriptionHelpFormatter, self)._format_action(action)
@@ -47,6 +92,10 @@ class ReportPluginsImpl(argparse.Action):
         print("exporters:")
         for exporter in exporters:
             print(f"\t{exporter.plugin_info}")
+        if hooks.get_hooks():
+            print("hooks:")
+            for hook in hooks.get_hooks():
+                print(f"\t{hook.plugin_info}")
         sys.exit(0)
 
 
@@ -65,18 +114,28 @@ def get_peakrdl_cfg_arg(argv: List[str]) -> Optional[str]:
     return path
 
 
-def main() -> None:
-    # manually expand any -f argfiles first
-    argv = argfile.expand_argfile(sys.argv[1:])
+def get_subcommand_arg(argv: List[str]) -> Optional[str]:
+    # lazy-parse argv to find the name of the subcommand that is run
+    argv_iter = iter(argv)
+    for arg in argv_iter:
+        if arg in ("-f", "--peakrdl-cfg"):
+            next(argv_iter, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
 
-    peakrdl_cfg_path = get_peakrdl_cfg_arg(argv)
-    try:
-        cfg = load_cfg(peakrdl_cfg_path)
-    except ValueError as e:
-        print(e.args[0], file=sys.stderr)
-        sys.exit(1)
 
-    # Collect all importers and initialize them with the config
+def load_plugins(cfg: AppConfig, argv: Optional[List[str]] = None) -> 'Tuple[List[ImporterPlugin], List[Subcommand]]':
+    """
+    Collect all importers and subcommands, and initialize them with the config
+
+    If the command line is given, built-in subcommands that it does not run
+    are not imported.
+    Built-in subcommands that are shadowed by an exporter plugin with the same
+    name are left out.
+    """
+    hooks.load_hooks(cfg)
+
     importers = get_importer_plugins(cfg)
     for importer in importers:
         importer._load_cfg(cfg)
@@ -87,7 +146,17 @@ def main() -> None:
         ListGlobals(),
         Preprocess(),
     ]
-    subcommands += get_exporter_plugins(cfg)
+    exporters = get_exporter_plugins(cfg)
+    exporter_names = {exporter.name for exporter in exporters}
+    selected = get_subcommand_arg(argv) if argv is not None else None
+    for name in LAZY_SUBCOMMANDS:
+        if name in exporter_names:
+            continue
+        if argv is None or name == selected:
+            subcommands.append(load_lazy_subcommand(name))
+        else:
+            subcommands.append(LazySubcommand(name))
+    subcommands += exporters
     for subcommand in subcommands:
         subcommand._load_cfg(cfg)
 
@@ -101,10 +170,15 @@ def main() -> None:
             raise RuntimeError(f"More than one exporter plugin was registered with the same name '{sc.name}': \n\t{other_sc_loc}\n\t{sc_loc}")
         sc_dict[sc.name] = sc
 
+    return importers, subcommands
+
+
+def get_arg_parser(cfg: AppConfig, importers: 'List[ImporterPlugin]', subcommands: List[Subcommand]) -> argparse.ArgumentParser:
     # Initialize top-level arg parser
     class ReportPlugins(ReportPluginsImpl):
         CFG = cfg
     parser = argparse.ArgumentParser(
+        prog="peakrdl",
         description=DESCRIPTION,
         formatter_class=SubcommandHelpFormatter,
     )
@@ -138,11 +212,66 @@ def main() -> None:
     for subcommand in subcommands:
         subcommand._init_subparser(subgroup, importers)
 
+    return parser
+
+
+def main() -> None:
+    # manually expand any -f argfiles first
+    argv = argfile.expand_argfile(sys.argv[1:])
+
+    peakrdl_cfg_path = get_peakrdl_cfg_arg(argv)
+    hooks.load_hooks(None)
+    hooks.dispatch("pre_config_load", peakrdl_cfg_path)
+    t_start = time.perf_counter()
+    try:
+        cfg = load_cfg(peakrdl_cfg_path)
+        importers, subcommands = load_plugins(cfg, argv)
+    except ConfigError as e:
+        print(e.args[0], file=sys.stderr)
+        sys.exit(1)
+    t_config = time.perf_counter() - t_start
+    hooks.dispatch("post_config_load", cfg, t_config)
+    parser = get_arg_parser(cfg, importers, subcommands)
+
     # Process command-line args
     options = parser.parse_args(argv)
 
+    run_ledger = None
+    if cfg.peakrdl_cfg['ledger'] is not None and options.subcommand.name != "history":
+        from .ledger import RunLedger # pylint: disable=import-outside-toplevel
+        from . import cache # pylint: disable=import-outside-toplevel
+        run_ledger = RunLedger(cfg.peakrdl_cfg['ledger'])
+        run_ledger.timings["config"] = t_config
+        cache.reset_stats()
+        hooks.add_hook(run_ledger)
+
     # Run subcommand!
+    exit_code = 0
     try:
         options.subcommand.main(importers, options)
     except RDLCompileError:
-        sys.exit(1)
+        exit_code = 1
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            exit_code = e.code or 0
+        else:
+            exit_code = 1
+        raise
+    except BaseException:
+        exit_code = 1
+        raise
+    finally:
+        if run_ledger is not None:
+            hooks.remove_hook(run_ledger)
+            plugins = {"peakrdl": __version__}
+            for plugin in [*importers, *subcommands, *hooks.get_hooks()]:
+                dist_name = getattr(plugin, "dist_name", None)
+                dist_version = getattr(plugin, "dist_version", None)
+                if dist_name and dist_version:
+                    plugins[dist_name] = dist_version
+            run_ledger.write(run_ledger.get_record(
+                options.subcommand.name, exit_code, time.perf_counter() - t_start, plugins
+            ))
+
+    if exit_code:
+        sys.exit(exit_code)
@@ -0,0 +1,353 @@
+"""
+Index over an elaborated design, shared by all exporters that export it.
+
+Lookups by path, address and type name are answered from maps that are built
+once, rather than by scanning the children of each node along the way. Arrays
+are never unrolled. Each declared node is indexed once, and array elements are
+resolved arithmetically.
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import re
+import copy
+import bisect
+from collections import OrderedDict
+
+from systemrdl.node import AddressableNode
+
+if TYPE_CHECKING:
+    from systemrdl.node import Node
+    from systemrdl.component import Component
+
+_PATH_SEGMENT_REGEX = re.compile(r"(\w+)((?:\[[^\]]*\])*)")
+_INDEX_REGEX = re.compile(r"\[([^\]]*)\]")
+
+
+class _ChildIntervals:
+    """
+    Address intervals of the addressable children of a node, relative to the
+    start of the node, sorted by their start address.
+    """
+    def __init__(self, children: 'List[AddressableNode]') -> None:
+        self.children = sorted(children, key=lambda child: child.raw_address_offset)
+        self.starts = [child.raw_address_offset for child in self.children]
+        self.ends = [child.raw_address_offset + child.total_size for child in self.children]
+
+        # Largest end address of all preceding intervals, so that lookups can
+        # stop scanning backwards once no earlier child can overlap
+        self.max_ends = []
+        max_end = 0
+        for end in self.ends:
+            max_end = max(max_end, end)
+            self.max_ends.append(max_end)
+
+    def find(self, offset: int) -> 'Optional[AddressableNode]':
+        i = bisect.bisect_right(self.starts, offset) - 1
+        while i >= 0 and self.max_ends[i] > offset:
+            if offset < self.ends[i]:
+                return self.children[i]
+            i -= 1
+        return None
+
+
+class NodeIndex:
+    """
+    Index over the nodes of an elaborated design.
+
+    Each map is built lazily, the first time it is needed. Nodes returned by
+    the index have their array indexes unknown, unless stated otherwise.
+
+    Use :meth:`ExporterSubcommand.get_node_index() <peakrdl.plugins.exporter.ExporterSubcommandPlugin.get_node_index>`
+    to get the index that is shared by all exporters that export the same
+    design, rather than creating one directly.
+    """
+    def __init__(self, top_node: 'Node') -> None:
+        #: Node at the top of the indexed design
+        self.top_node = top_node
+
+        self._nodes: Optional[List['Node']] = None
+        self._by_path: Dict[str, 'Node'] = {}
+        self._parents: Dict[int, Optional['Node']] = {}
+        self._children: Dict[int, List['Node']] = {}
+        self._spans: Dict[int, Tuple[int, int]] = {}
+        self._by_type: Optional[Dict[str, List['Node']]] = None
+        self._intervals: Dict[int, _ChildIntervals] = {}
+
+    def _build(self) -> List['Node']:
+        if self._nodes is None:
+            self._nodes = []
+            # Paths are absolute, even if the top node is not at the top of
+            # the design
+            top_path = self._normalize_path(self.top_node.get_path())[0]
+            path_prefix = top_path[:-len(self.top_node.inst_name)]
+            self._visit(self.top_node, None, path_prefix, 0)
+        return self._nodes
+
+    def _visit(self, node: 'Node', parent: 'Optional[Node]', path_prefix: str, repeat_extent: int) -> None:
+        assert self._nodes is not None
+        path = path_prefix + node.inst_name
+        self._nodes.append(node)
+        self._by_path[path] = node
+        self._parents[id(node.inst)] = parent
+
+        if isinstance(node, AddressableNode):
+            # Span of all elements of this node, and of its parent arrays
+            if node is self.top_node:
+                start = self._get_top_address(node)
+            else:
+                start = node.raw_absolute_address
+            if node.is_array and node.current_idx is None:
+                assert node.array_stride is not None
+                repeat_extent += node.array_stride * (node.n_elements - 1)
+            self._spans[id(node.inst)] = (start, start + node.size - 1 + repeat_extent)
+
+        children = list(node.children(unroll=False))
+        self._children[id(node.inst)] = children
+        for child in children:
+            self._visit(child, node, path + ".", repeat_extent)
+
+    def _get_top_address(self, node: AddressableNode) -> int:
+        """
+        Address of the top node. If it is an element of an array, this is the
+        address of that element.
+        """
+        address = node.raw_absolute_address
+        if node.is_array and node.current_idx is not None:
+            assert node.array_stride is not None
+            assert node.array_dimensions is not None
+            element = 0
+            for idx, dim in zip(node.current_idx, node.array_dimensions):
+                element = element * dim + idx
+            address += node.array_stride * element
+        return address
+
+    def _normalize_path(self, path: str) -> Tuple[str, List[Optional[List[int]]]]:
+        """
+        Split a path's array indexes from it.
+        Returns the path without any array suffixes, and the indexes of each
+        segment.
+        """
+        segments = []
+        indexes: List[Optional[List[int]]] = []
+        for segment in path.split("."):
+            m = _PATH_SEGMENT_REGEX.fullmatch(segment)
+            if not m:
+                raise ValueError(f"Invalid path: '{path}'")
+            inst_name, suffix = m.group(1, 2)
+            idx_strs = _INDEX_REGEX.findall(suffix)
+            if any(idx_strs):
+                try:
+                    indexes.append([int(s, 0) for s in idx_strs])
+                except ValueError:
+                    raise ValueError(f"Invalid path: '{path}'") from None
+            else:
+                indexes.append(None)
+            segments.append(inst_name)
+        return ".".join(segments), indexes
+
+    @property
+    def nodes(self) -> List['Node']:
+        """
+        All nodes of the design, including fields, in pre-order
+        """
+        return self._build()
+
+    def find_by_path(self, path: str) -> 'Optional[Node]':
+        """
+        Find a node by its absolute path, as returned by ``Node.get_path()``.
+
+        Array suffixes in the path are optional. If indexes are given, the node that is
+        returned references those array elements.
+        Returns ``None`` if no node has that path.
+
+        Raises ``ValueError`` if the path is malformed, and ``IndexError`` if
+        an array index is out of range.
+        """
+        self._build()
+        decl_path, indexes = self._normalize_path(path)
+        node = self._by_path.get(decl_path)
+        if node is None or not any(idx is not None for idx in indexes):
+            return node
+
+        # Resolve the indexes of each segment along the path
+        chain = [node]
+        while len(chain) < len(indexes):
+            parent = self._parents.get(id(chain[-1].inst))
+            if parent is None:
+                break
+            chain.append(parent)
+        chain.reverse()
+        resolved = []
+        for ancestor, idx in zip(chain, indexes[-len(chain):]):
+            if idx is not None:
+                if not isinstance(ancestor, AddressableNode) or ancestor.array_dimensions is None:
+                    raise IndexError(f"Index attempted on non-array component in path: '{path}'")
+                if len(idx) != len(ancestor.array_dimensions) or any(not 0 <= i < dim for i, dim in zip(idx, ancestor.array_dimensions)):
+                    raise IndexError(f"Array index out of range in path: '{path}'")
+            resolved.append((ancestor, idx))
+        return self._materialize(resolved)
+
+    def _materialize(self, chain: 'List[Tuple[Node, Optional[List[int]]]]') -> 'Node':
+        """
+        Copy the nodes along a chain from the top downwards, so that each one
+        references the given elements of its parent arrays.
+        """
+        parent = chain[0][0].parent
+        node = None
+        for decl_node, idx in chain:
+            node = copy.copy(decl_node)
+            node.parent = parent
+            if idx is not None:
+                assert isinstance(node, AddressableNode)
+                node.current_idx = idx
+            parent = node
+        assert node is not None
+        return node
+
+    def get_parent(self, node: 'Node') -> 'Optional[Node]':
+        """
+        Get the parent of a node, or ``None`` for the top node
+        """
+        self._build()
+        return self._parents.get(id(node.inst))
+
+    def get_children(self, node: 'Node') -> List['Node']:
+        """
+        Get the immediate children of a node
+        """
+        self._build()
+        return self._children.get(id(node.inst), [])
+
+    def get_span(self, node: AddressableNode) -> Tuple[int, int]:
+        """
+        Get the inclusive absolute address range covered by all elements of
+        a node, including those of its parent arrays.
+        """
+        self._build()
+        span = self._spans.get(id(node.inst))
+        if span is None:
+            # Not part of the indexed design, such as a node that is not present
+            span = self._compute_span(node)
+        return span
+
+    def _compute_span(self, node: AddressableNode) -> Tuple[int, int]:
+        if node.inst is self.top_node.inst:
+            start = self._get_top_address(node)
+        else:
+            start = node.raw_absolute_address
+        repeat_extent = 0
+        current: 'Optional[Node]' = node
+        while isinstance(current, AddressableNode):
+            if current.is_array and current.current_idx is None:
+                assert current.array_stride is not None
+                repeat_extent += current.array_stride * (current.n_elements - 1)
+            if current.inst is self.top_node.inst:
+                break
+            current = current.parent
+        return (start, start + node.size - 1 + repeat_extent)
+
+    def get_instances(self, type_name: str) -> List['Node']:
+        """
+        Get all instances of a type.
+
+        Instances of a parameterized type are found by their original type
+        name, as well as by the type name of their parameterization.
+        """
+        return self._get_types().get(type_name, [])
+
+    @property
+    def type_names(self) -> List[str]:
+        """
+        Names of all types that are instantiated in the design
+        """
+        return sorted(self._get_types())
+
+    def _get_types(self) -> Dict[str, List['Node']]:
+        if self._by_type is None:
+            self._by_type = {}
+            for node in self._build():
+                if node.type_name is not None:
+                    self._by_type.setdefault(node.type_name, []).append(node)
+                if node.orig_type_name is not None and node.orig_type_name != node.type_name:
+                    self._by_type.setdefault(node.orig_type_name, []).append(node)
+        return self._by_type
+
+    def _get_intervals(self, node: AddressableNode) -> _ChildIntervals:
+        intervals = self._intervals.get(id(node.inst))
+        if intervals is None:
+            children = [
+                child for child in self.get_children(node)
+                if isinstance(child, AddressableNode)
+            ]
+            intervals = _ChildIntervals(children)
+            self._intervals[id(node.inst)] = intervals
+        return intervals
+
+    def find_by_address(self, address: int) -> 'Optional[AddressableNode]':
+        """
+        Find the deepest node that contains an absolute address.
+
+        The node that is returned references the array elements that contain
+        the address. Returns ``None`` if the address is outside of the design.
+        """
+        top_node = self.top_node
+        if not isinstance(top_node, AddressableNode):
+            return None
+        self._build()
+        offset = address - self._get_top_address(top_node)
+        if top_node.current_idx is None:
+            size = top_node.total_size
+        else:
+            size = top_node.size
+        if offset < 0 or offset >= size:
+            return None
+
+        chain: 'List[Tuple[Node, Optional[List[int]]]]' = []
+        current: Optional[AddressableNode] = top_node
+        while current is not None:
+            idx = current.current_idx
+            if current.is_array and idx is None:
+                assert current.array_stride is not None
+                assert current.array_dimensions is not None
+                element, offset = divmod(offset, current.array_stride)
+                idx = []
+                for dim in reversed(current.array_dimensions):
+                    element, i = divmod(element, dim)
+                    idx.insert(0, i)
+            chain.append((current, idx))
+            if offset >= current.size:
+                # Gap between array elements
+                break
+            current = self._get_intervals(current).find(offset)
+            if current is not None:
+                offset -= current.raw_address_offset
+
+        node = self._materialize(chain)
+        assert isinstance(node, AddressableNode)
+        return node
+
+
+# Most recently built indexes, keyed by the top-level component of their design.
+# Designs that are pruned by --exclude have their own copies of the components
+# along the pruned paths, so they never share an index with the full design
+_index_cache: 'OrderedDict[Tuple[int, str], Tuple[Component, NodeIndex]]' = OrderedDict()
+_INDEX_CACHE_SIZE = 8
+
+def get_node_index(top_node: 'Node') -> NodeIndex:
+    """
+    Get the index of an elaborated design.
+
+    Indexes of the most recently used designs are kept, so that the index is
+    only built once per elaboration, regardless of how many exporters use it.
+    """
+    key = (id(top_node.inst), top_node.get_path())
+    entry = _index_cache.get(key)
+    if entry is not None and entry[0] is top_node.inst:
+        _index_cache.move_to_end(key)
+        return entry[1]
+
+    index = NodeIndex(top_node)
+    # Keep a reference to the component, so that its id is not reused
+    _index_cache[key] = (top_node.inst, index)
+    while len(_index_cache) > _INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,353 @@
+"""
+Output backends that exporters write their output files through.
+"""
+from typing import Dict, IO, Any, Callable, Union, List, Tuple, Optional, Iterable
+import os
+import io
+import time
+import posixpath
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OutputBackend:
+    """
+    Destination of an exporter's output files.
+
+    Paths are relative to the output location given by ``-o``, and use ``/`` as
+    their separator.
+    """
+
+    #: Description of the output location, used in messages
+    name: str = ""
+
+    #: Whether files can be written from several threads concurrently
+    thread_safe = False
+
+    def open(self, path: str, mode: str = "w", encoding: str = "utf-8") -> IO[Any]:
+        """
+        Open an output file for writing.
+
+        Parameters
+        ----------
+        path: str
+            Path of the file, relative to the output location
+        mode: str
+            ``"w"`` to write text, or ``"wb"`` to write bytes
+        encoding: str
+            Encoding of text files
+        """
+        raise NotImplementedError
+
+    def write(self, path: str, data: Union[str, bytes], encoding: str = "utf-8") -> None:
+        """
+        Write the entire contents of an output file
+        """
+        if isinstance(data, str):
+            with self.open(path, "w", encoding=encoding) as f:
+                f.write(data)
+        else:
+            with self.open(path, "wb") as fb:
+                fb.write(data)
+
+    def close(self) -> None:
+        """
+        Complete the output once all files are written
+        """
+
+    def abort(self) -> None:
+        """
+        Called instead of ``close()`` if the export failed
+        """
+        self.close()
+
+
+class OutputWriteError(Exception):
+    """
+    Raised if an output file could not be written by a :class:`BackgroundWriter`
+    """
+    def __init__(self, path: str, error: BaseException) -> None:
+        super().__init__(f"Unable to write output file '{path}': {error}")
+        #: Path of the output file that failed
+        self.path = path
+
+
+def _fsync_paths(paths: Iterable[str]) -> None:
+    """
+    Flush files or directories to stable storage
+    """
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            # Directories cannot be opened on some platforms
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def normalize_path(path: str) -> str:
+    """
+    Normalize a path within the output location.
+    Raises ValueError if it would be outside of it.
+    """
+    norm_path = posixpath.normpath(path.replace(os.sep, "/"))
+    if posixpath.isabs(norm_path) or norm_path == "." or norm_path.split("/")[0] == "..":
+        raise ValueError(f"Output path '{path}' is not within the output location")
+    return norm_path
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in ("w", "wb"):
+        raise ValueError(f"Unsupported mode '{mode}'. Output files can only be opened using 'w' or 'wb'")
+
+
+class _BufferedFile(io.BytesIO):
+    """
+    In-memory file whose contents are passed to a callback once it is closed
+    """
+    def __init__(self, on_close: Callable[[bytes], None]) -> None:
+        super().__init__()
+        self._on_close = on_close
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._on_close(self.getvalue())
+        finally:
+            super().close()
+
+
+def _open_buffered(mode: str, encoding: str, on_close: Callable[[bytes], None]) -> IO[Any]:
+    _check_mode(mode)
+    f = _BufferedFile(on_close)
+    if mode == "wb":
+        return f
+    return io.TextIOWrapper(f, encoding=encoding)
+
+
+class DirectoryOutput(OutputBackend):
+    """
+    Writes output files into a directory. This is the default backend.
+
+    If ``fsync`` is set, all files that were written, and their directories,
+    are flushed to stable storage once the output is closed.
+    """
+    thread_safe = True
+
+    def __init__(self, path: str, fsync: bool = False) -> None:
+        #: Path of the output directory
+        self.path = path
+        self.name = path
+        self.fsync = fsync
+        self._written: List[str] = []
+
+    def get_path(self, path: str) -> str:
+        """
+        Get the filesystem path of an output file
+        """
+        return os.path.join(self.path, *normalize_path(path).split("/"))
+
+    def open(self, path: str, mode: str = "w", encoding: str = "utf-8") -> IO[Any]:
+        _check_mode(mode)
+        full_path = self.get_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.fsync:
+            # list.append() is atomic
+            self._written.append(full_path)
+        if mode == "wb":
+            return open(full_path, "wb") # pylint: disable=consider-using-with
+        return open(full_path, "w", encoding=encoding) # pylint: disable=consider-using-with
+
+    def close(self) -> None:
+        if self.fsync:
+            _fsync_paths(self._written)
+            _fsync_paths(sorted({os.path.dirname(path) for path in self._written}))
+            self._written = []
+
+
+class _ArchiveOutput(OutputBackend):
+    def __init__(self, path: str, fsync: bool = False) -> None:
+        #: Path of the archive
+        self.path = path
+        self.name = path
+        self.fsync = fsync
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def add(self, path: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def close_archive(self) -> None:
+        raise NotImplementedError
+
+    def open(self, path: str, mode: str = "w", encoding: str = "utf-8") -> IO[Any]:
+        path = normalize_path(path)
+        return _open_buffered(mode, encoding, lambda data: self.add(path, data))
+
+    def close(self) -> None:
+        self.close_archive()
+        if self.fsync:
+            _fsync_paths([self.path, os.path.dirname(os.path.abspath(self.path))])
+
+    def abort(self) -> None:
+        # Do not leave a partial archive behind
+        self.close_archive()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class TarOutput(_ArchiveOutput):
+    """
+    Writes output files into a tar archive, optionally compressed if the path
+    ends with ``.gz``, ``.tgz``, ``.bz2`` or ``.xz``.
+
+    The archive is written as a stream. Each file is added to it as soon as it
+    is closed.
+    """
+    def __init__(self, path: str, fsync: bool = False) -> None:
+        super().__init__(path, fsync)
+        # pylint: disable=consider-using-with
+        if path.endswith((".gz", ".tgz")):
+            self._tar = tarfile.open(path, "w|gz")
+        elif path.endswith(".bz2"):
+            self._tar = tarfile.open(path, "w|bz2")
+        elif path.endswith(".xz"):
+            self._tar = tarfile.open(path, "w|xz")
+        else:
+            self._tar = tarfile.open(path, "w|")
+
+    def add(self, path: str, data: bytes) -> None:
+        info = tarfile.TarInfo(path)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close_archive(self) -> None:
+        self._tar.close()
+
+
+class ZipOutput(_ArchiveOutput):
+    """
+    Writes output files into a zip archive. Each file is added to it as soon as
+    it is closed.
+    """
+    def __init__(self, path: str, fsync: bool = False) -> None:
+        super().__init__(path, fsync)
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) # pylint: disable=consider-using-with
+
+    def add(self, path: str, data: bytes) -> None:
+        self._zip.writestr(path, data)
+
+    def close_archive(self) -> None:
+        self._zip.close()
+
+
+class MemoryOutput(OutputBackend):
+    """
+    Keeps output files in memory. Useful when exporting via the Python API.
+    """
+    name = "<memory>"
+    thread_safe = True
+
+    def __init__(self) -> None:
+        #: Contents of each output file, keyed by its path
+        self.files: Dict[str, bytes] = {}
+
+    def open(self, path: str, mode: str = "w", encoding: str = "utf-8") -> IO[Any]:
+        path = normalize_path(path)
+        return _open_buffered(mode, encoding, lambda data: self.files.__setitem__(path, data))
+
+
+class BackgroundWriter(OutputBackend):
+    """
+    Writes the files of another backend from a pool of threads, so that the
+    exporter does not block on writes.
+
+    Each file is buffered in memory until it is closed, then queued to be
+    written. If more than ``max_pending`` files are queued, closing another one
+    blocks until one of them has been written.
+
+    Errors are reported once the output is closed, by raising an
+    :class:`OutputWriteError` for the first file that failed, in the order
+    the files were closed. This does not depend on the order the threads
+    happened to write them in.
+
+    Backends that are not thread-safe are written from a single thread, in the
+    order the files were closed.
+    """
+    def __init__(self, backend: OutputBackend, threads: int, max_pending: Optional[int] = None) -> None:
+        #: Backend that files are written to
+        self.backend = backend
+        self.name = backend.name
+        if not backend.thread_safe:
+            threads = 1
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="peakrdl-writer")
+        self._slots = threading.BoundedSemaphore(max_pending or threads * 4)
+        self._lock = threading.Lock()
+        self._n_queued = 0
+        self._errors: List[Tuple[int, str, BaseException]] = []
+        self._aborted = False
+
+    def open(self, path: str, mode: str = "w", encoding: str = "utf-8") -> IO[Any]:
+        # Invalid paths are reported right away
+        path = normalize_path(path)
+        return _open_buffered(mode, encoding, lambda data: self._queue(path, data))
+
+    def _queue(self, path: str, data: bytes) -> None:
+        self._slots.acquire() # pylint: disable=consider-using-with
+        seq = self._n_queued
+        self._n_queued += 1
+        try:
+            self._executor.submit(self._write, seq, path, data)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _write(self, seq: int, path: str, data: bytes) -> None:
+        try:
+            if not self._aborted:
+                self.backend.write(path, data)
+        except Exception as e: # pylint: disable=broad-except
+            with self._lock:
+                self._errors.append((seq, path, e))
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._errors:
+            _, path, error = min(self._errors, key=lambda item: item[0])
+            self.backend.abort()
+            raise OutputWriteError(path, error) from error
+        self.backend.close()
+
+    def abort(self) -> None:
+        # Discard files that are still queued
+        self._aborted = True
+        self._executor.shutdown(wait=True)
+        self.backend.abort()
+
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+def get_output_backend(path: str, fsync: bool = False) -> OutputBackend:
+    """
+    Get the output backend for an output path given by ``-o``, based on its
+    extension.
+
+    If ``fsync`` is set, the output is flushed to stable storage once it is
+    closed.
+    """
+    if path.endswith(".zip"):
+        return ZipOutput(path, fsync)
+    if path.endswith(ARCHIVE_EXTENSIONS):
+        return TarOutput(path, fsync)
+    return DirectoryOutput(path, fsync)
@@ -1,9 +1,12 @@
 import sys
-from typing import List, Tuple, TYPE_CHECKING, Optional
+from typing import List, Tuple, TYPE_CHECKING, Optional, Dict, cast
 
 if TYPE_CHECKING:
     from importlib.metadata import EntryPoint, Distribution
 
+#: Entry point groups that PeakRDL scans for plugins
+ENTRY_POINT_GROUPS = ["peakrdl.importers", "peakrdl.exporters", "peakrdl.hooks"]
+
 if sys.version_info >= (3,10,0):
     from importlib import metadata
 
@@ -52,8 +55,63 @@ else: # pragma: no cover
         return dist.project_name # type: ignore
 
 
+class BundledEntryPoint:
+    """
+    Stand-in for an entry point that was pre-resolved when building a bundle
+    """
+    def __init__(self, name: str, value: str, group: str) -> None:
+        self.name = name
+        self.value = value
+        self.group = group
+
+    def load(self) -> object:
+        import importlib # pylint: disable=import-outside-toplevel
+        module_name, _, attr = self.value.partition(":")
+        obj = importlib.import_module(module_name.strip())
+        for part in attr.strip().split("."):
+            if part:
+                obj = getattr(obj, part)
+        return obj
+
+
+class BundledDistribution:
+    """
+    Stand-in for the distribution that provided a pre-resolved entry point
+    """
+    def __init__(self, name: str, version: str) -> None:
+        self.name = name
+        self.version = version
+
+
+# Pre-resolved entry point table. If set, the environment is not scanned.
+_bundled_entry_points: Optional[Dict[str, List[Tuple[str, str, Optional[str], Optional[str]]]]] = None
+
+def use_bundled_entry_points(table: Dict[str, List[Tuple[str, str, Optional[str], Optional[str]]]]) -> None:
+    """
+    Use a pre-resolved entry point table instead of scanning installed
+    distributions. Called by a bundle's startup script.
+
+    The table maps each group name to a list of
+    ``(name, "module:object", dist_name, dist_version)`` tuples.
+    """
+    global _bundled_entry_points # pylint: disable=global-statement
+    _bundled_entry_points = table
+
+
 def get_entry_points(group_name: str) -> List[Tuple['EntryPoint', Optional['Distribution']]]:
+    if _bundled_entry_points is not None:
+        eps: List[Tuple['EntryPoint', Optional['Distribution']]] = []
+        for name, value, dist_name, dist_version in _bundled_entry_points.get(group_name, []):
+            ep = BundledEntryPoint(name, value, group_name)
+            if dist_name is not None and dist_version is not None:
+                dist = BundledDistribution(dist_name, dist_version)
+                eps.append((cast('EntryPoint', ep), cast('Distribution', dist)))
+            else:
+                eps.append((cast('EntryPoint', ep), None))
+        return eps
     return _get_entry_points(group_name)
 
 def get_name_from_dist(dist: 'Distribution') -> str:
+    if isinstance(dist, BundledDistribution):
+        return dist.name
     return _get_name_from_dist(dist)
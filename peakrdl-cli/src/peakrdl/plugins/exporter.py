@@ -1,10 +1,11 @@
-from typing import List, TYPE_CHECKING, Optional
+from typing import List, TYPE_CHECKING, Optional, Dict, Type
 import inspect
 
 from .entry_points import get_entry_points, get_name_from_dist
 from ..subcommand import ExporterSubcommand
 
 if TYPE_CHECKING:
+    from systemrdl.udp import UDPDefinition
     from ..config.loader import AppConfig
 
 class ExporterSubcommandPlugin(ExporterSubcommand):
@@ -68,3 +69,15 @@ def get_exporter_plugins(cfg: 'AppConfig') -> List[ExporterSubcommandPlugin]:
         exporters.append(exporter)
 
     return exporters
+
+
+def get_all_udp_definitions(cfg: 'AppConfig') -> 'List[Type[UDPDefinition]]':
+    """
+    Get the UDP definitions provided by all exporter plugins.
+    If multiple exporters provide a UDP with the same name, the first one is used.
+    """
+    udps: Dict[str, Type['UDPDefinition']] = {}
+    for exporter in get_exporter_plugins(cfg):
+        for udp in exporter.udp_definitions:
+            udps.setdefault(udp.name, udp)
+    return list(udps.values())
@@ -0,0 +1,205 @@
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
+import sys
+import inspect
+
+from .entry_points import get_entry_points, get_name_from_dist
+from ..config import schema
+
+if TYPE_CHECKING:
+    import argparse
+    from systemrdl.node import AddrmapNode
+    from ..config.loader import AppConfig
+    from ..subcommand import Subcommand
+
+
+class HookPlugin:
+    """
+    Base class for lifecycle hook plugins.
+
+    Hooks are notified as PeakRDL loads its configuration, compiles each input
+    file, elaborates the design, and runs exporters. Override any of the
+    callbacks below. All durations are in seconds.
+    """
+
+    #: Name of the hook plugin. This is set to the name of its entry point, or
+    #: its key in the PeakRDL configuration.
+    name: str
+
+    #: Schema for additional configuration options specified by a
+    #: 'peakrdl.toml' file, in the table named after this hook.
+    #:
+    #: For more details, see :ref:`cfg_schema`
+    cfg_schema: Dict[str, Any] = {}
+
+    def __init__(self, dist_name: Optional[str]=None, dist_version: Optional[str]=None) -> None:
+        self.dist_name = dist_name
+        self.dist_version = dist_version
+
+        #: Resolved configuration data that was extracted from the PeakRDL TOML,
+        #: and validated.
+        self.cfg: Dict[str, Any] = {}
+
+    def _load_cfg(self, cfg: 'AppConfig') -> None:
+        self.cfg = cfg.get_namespace(self.name, schema.normalize(self.cfg_schema))
+
+    @property
+    def plugin_info(self) -> str:
+        if self.dist_name and self.dist_version:
+            return f"{self.name} --> {self.dist_name} {self.dist_version}"
+        else:
+            return f"{self.name} --> {inspect.getabsfile(type(self))}:{type(self).__name__}"
+
+    def pre_config_load(self, path: Optional[str]) -> None:
+        """
+        Called before the PeakRDL configuration is loaded.
+        Only hooks that are discovered via entry points receive this.
+
+        Parameters
+        ----------
+        path:
+            Path to the configuration file given on the command line, if any.
+        """
+
+    def post_config_load(self, cfg: 'AppConfig', elapsed: float) -> None:
+        """
+        Called once the PeakRDL configuration and all plugins are loaded.
+        """
+
+    def pre_compile_file(self, path: str) -> None:
+        """
+        Called before an input file is compiled or imported.
+        """
+
+    def post_compile_file(self, path: str, elapsed: float) -> None:
+        """
+        Called after an input file was compiled or imported.
+        """
+
+    def pre_elaborate(self, top_def_name: Optional[str]) -> None:
+        """
+        Called before the design is elaborated.
+
+        Parameters
+        ----------
+        top_def_name:
+            Name of the top-level addrmap to elaborate, or None if the last one
+            defined is used.
+        """
+
+    def post_elaborate(self, top_node: 'AddrmapNode', elapsed: float) -> None:
+        """
+        Called after the design was elaborated.
+        """
+
+    def pre_export(self, subcommand: 'Subcommand', top_node: 'AddrmapNode', options: 'argparse.Namespace') -> None:
+        """
+        Called before an exporter runs.
+        """
+
+    def post_export(self, subcommand: 'Subcommand', top_node: 'AddrmapNode', options: 'argparse.Namespace', elapsed: float) -> None:
+        """
+        Called after an exporter completed successfully.
+        """
+
+
+def get_entry_point_hook_plugins() -> List[HookPlugin]:
+    """
+    Load any hook plugins that advertise themselves via the "peakrdl.hooks"
+    entry point group.
+    """
+    hooks = []
+    for ep, dist in get_entry_points("peakrdl.hooks"):
+        cls = ep.load()
+        if dist:
+            dist_name = get_name_from_dist(dist)
+            dist_version = dist.version
+        else:
+            dist_name = None
+            dist_version = None
+
+        if issubclass(cls, HookPlugin):
+            # Override name - always use entry point's name
+            cls.name = ep.name
+            hook = cls(dist_name=dist_name, dist_version=dist_version)
+        else:
+            raise RuntimeError(f"Hook class {cls} is expected to be extended from peakrdl.plugins.hooks.HookPlugin")
+        hooks.append(hook)
+    return hooks
+
+
+def get_cfg_hook_plugins(cfg: 'AppConfig') -> List[HookPlugin]:
+    """
+    Load any hook plugins listed in the PeakRDL configuration
+    """
+    hooks = []
+    for name, cls in cfg.peakrdl_cfg['plugins']['hooks'].items():
+        if issubclass(cls, HookPlugin):
+            cls.name = name
+            hook = cls()
+        else:
+            raise RuntimeError(f"Hook class {cls} is expected to be extended from peakrdl.plugins.hooks.HookPlugin")
+        hooks.append(hook)
+    return hooks
+
+
+# Hooks from entry points are only loaded once per process, so that they can
+# observe the config being loaded
+_entry_point_hooks: Optional[List[HookPlugin]] = None
+
+# Hooks installed using add_hook(). These are kept when hooks are reloaded
+_added_hooks: List[HookPlugin] = []
+
+# All installed hooks
+_hooks: List[HookPlugin] = []
+
+def load_hooks(cfg: Optional['AppConfig']) -> None:
+    """
+    Install the hooks from entry points, as well as those listed in the
+    configuration, if provided.
+    Replaces any hooks from a previously loaded configuration. Hooks that were
+    installed using :func:`add_hook` are kept.
+    """
+    global _entry_point_hooks, _hooks # pylint: disable=global-statement
+    if _entry_point_hooks is None:
+        _entry_point_hooks = get_entry_point_hook_plugins()
+
+    hooks = list(_entry_point_hooks)
+    if cfg is not None:
+        hooks.extend(get_cfg_hook_plugins(cfg))
+        for hook in hooks:
+            hook._load_cfg(cfg)
+    _hooks = hooks + _added_hooks
+
+
+def add_hook(hook: HookPlugin) -> None:
+    """
+    Install an additional hook, until it is removed using :func:`remove_hook`
+    """
+    _added_hooks.append(hook)
+    _hooks.append(hook)
+
+
+def remove_hook(hook: HookPlugin) -> None:
+    """
+    Uninstall a hook that was installed using :func:`add_hook`
+    """
+    _added_hooks.remove(hook)
+    _hooks.remove(hook)
+
+
+def get_hooks() -> List[HookPlugin]:
+    return _hooks
+
+
+def dispatch(callback: str, *args: Any) -> None:
+    """
+    Call a callback of all installed hooks.
+
+    Hooks are only observers. If one raises an exception, a warning is printed
+    rather than failing the run.
+    """
+    for hook in _hooks:
+        try:
+            getattr(hook, callback)(*args)
+        except Exception as e: # pylint: disable=broad-except
+            print(f"warning: hook '{hook.name}' failed in {callback}(): {type(e).__name__}: {e}", file=sys.stderr)
@@ -1,12 +1,29 @@
-from typing import TYPE_CHECKING, List, Dict, Any, Sequence
+from typing import TYPE_CHECKING, List, Dict, Any, Sequence, Optional, Tuple, Set, Callable, Iterator
 import re
 import os
+import argparse
+import fnmatch
+import itertools
+import sys
+import hashlib
+import copy
+import time
+import pickle
 
 from systemrdl.messages import FileSourceRef
+from systemrdl.component import Addrmap
+from systemrdl.node import AddrmapNode, RootNode
+
+from . import libindex
+from . import incindex
+from . import import_cache
+from .plugins import hooks
 
 if TYPE_CHECKING:
-    import argparse
     from systemrdl import RDLCompiler
+    from systemrdl.component import Component
+    from systemrdl.compiler import FileInfo
+    from systemrdl.messages import MessageHandler
     from .importer import Importer
 
 
@@ -14,9 +31,18 @@ def add_rdl_compile_arguments(parser: 'argparse._ActionsContainer') -> None:
     parser.add_argument(
         "input_files",
         metavar="FILE",
-        nargs="+",
+        nargs="*",
         help="One or more input files"
     )
+    parser.add_argument(
+        "-L",
+        dest="libdirs",
+        metavar="LIBDIR",
+        action="append",
+        default=[],
+        help="Library directory of SystemRDL files. Only the library files that "
+                "define types used by the input files or the chosen top are compiled",
+    )
     parser.add_argument(
         "-I",
         dest="incdirs",
@@ -24,6 +50,22 @@ def add_rdl_compile_arguments(parser: 'argparse._ActionsContainer') -> None:
         action="append",
         help='Search directory for files included with `include "filename"',
     )
+    parser.add_argument(
+        "--cache-incdirs",
+        dest="cache_incdirs",
+        default=False,
+        action="store_true",
+        help="Persist the listings of include search directories in the PeakRDL "
+                "cache. Speeds up include resolution on slow network filesystems",
+    )
+    parser.add_argument(
+        "--report-unused-incdirs",
+        dest="report_unused_incdirs",
+        default=False,
+        action="store_true",
+        help="Print a warning for each include search directory that did not "
+                "resolve any `include directive",
+    )
     parser.add_argument(
         "-D",
         dest="defines",
@@ -34,27 +76,63 @@ def add_rdl_compile_arguments(parser: 'argparse._ActionsContainer') -> None:
     )
 
 
+def add_list_inputs_argument(parser: 'argparse._ActionsContainer') -> None:
+    parser.add_argument(
+        "--list-inputs",
+        dest="list_inputs",
+        default=False,
+        action="store_true",
+        help="Print the resolved and deduplicated list of input files in the "
+                "order they would be loaded, then exit without compiling",
+    )
+
+
 def add_importer_arguments(parser: 'argparse._ActionsContainer', importers: 'Sequence[Importer]') -> None:
     for importer in importers:
         importer_arg_group = parser.add_argument_group(f"{importer.name} importer args")
         importer.add_importer_arguments(importer_arg_group)
 
 
+class _AppendFirstAction(argparse.Action):
+    """
+    Appends each value to a list, and also stores the first value in a separate
+    destination for compatibility with single-value consumers.
+    """
+    def __init__(self, option_strings: List[str], dest: str, first_dest: str, **kwargs: Any) -> None:
+        super().__init__(option_strings, dest, **kwargs)
+        self.first_dest = first_dest
+
+    def __call__(self, parser: argparse.ArgumentParser, namespace: argparse.Namespace, values: Any, option_string: Optional[str] = None) -> None:
+        items = list(getattr(namespace, self.dest) or [])
+        items.append(values)
+        setattr(namespace, self.dest, items)
+        setattr(namespace, self.first_dest, items[0])
+
+
 def add_elaborate_arguments(parser: 'argparse._ActionsContainer') -> None:
     parser.add_argument(
         "-t", "--top",
-        dest="top_def_name",
+        dest="top_def_names",
         metavar="TOP",
-        default=None,
+        action=_AppendFirstAction,
+        first_dest="top_def_name",
+        default=[],
         help="Explicitly choose which addrmap  in the root namespace will be the "
-                "top-level component. If unset, The last addrmap defined will be chosen"
+                "top-level component. If unset, The last addrmap defined will be chosen. "
+                "Can be repeated, or use a wildcard pattern, to export several "
+                "top-level components from a single compilation. If so, the output "
+                "path shall contain a '{top}' placeholder"
     )
     parser.add_argument(
         "--rename",
-        dest="inst_name",
-        default=None,
+        dest="inst_names",
+        metavar="INST_NAME",
+        action=_AppendFirstAction,
+        first_dest="inst_name",
+        default=[],
         help="Overrides the top-component's instantiated name. By default, the "
-                "instantiated name is the same as the component's type name"
+                "instantiated name is the same as the component's type name. "
+                "If multiple tops are used, repeat once per top, in the same order"
     )
     parser.add_argument(
         "-P",
@@ -62,8 +140,51 @@ def add_elaborate_arguments(parser: 'argparse._ActionsContainer') -> None:
         metavar="PARAMETER=VALUE",
         action="append",
         default=[],
-        help='Specify value for a top-level SystemRDL parameter',
+        help='Specify value for a top-level SystemRDL parameter. '
+                'A comma-separated list of values sweeps over each of them. '
+                'Use the \'{variant}\' or \'{PARAMETER}\' placeholder in the output path',
+    )
+    parser.add_argument(
+        "--variant",
+        dest="variants",
+        metavar="NAME",
+        action="append",
+        default=[],
+        help="Export a variant defined in the PeakRDL configuration's "
+                "[peakrdl.variants] table. Can be repeated, or use a wildcard "
+                "pattern. Use the '{variant}' placeholder in the output path"
+    )
+    parser.add_argument(
+        "--parallel",
+        dest="parallel",
+        metavar="N",
+        type=int,
+        default=1,
+        help="If exporting several tops or variants, elaborate and export "
+                "up to N of them in parallel"
     )
+    parser.set_defaults(top_def_name=None, inst_name=None)
+
+
+def _is_top_pattern(top: Optional[str]) -> bool:
+    return top is not None and any(c in top for c in "*?[")
+
+
+def check_elaborate_arguments(parser: argparse.ArgumentParser, options: argparse.Namespace) -> None:
+    """
+    Report an error if the number of --rename arguments does not match the
+    number of tops. Tops that are wildcard patterns are only checked once they
+    are matched against the design.
+    """
+    inst_names = getattr(options, "inst_names", None) or []
+    tops = getattr(options, "top_def_names", None) or []
+    if not inst_names or any(_is_top_pattern(top) for top in tops):
+        return
+    if len(inst_names) != max(len(tops), 1):
+        parser.error(
+            f"Number of --rename arguments ({len(inst_names)}) does not "
+            f"match the number of --top arguments ({len(tops)})"
+        )
 
 
 def parse_parameters(rdlc: 'RDLCompiler', parameter_options: List[str]) -> Dict[str, Any]:
@@ -83,6 +204,295 @@ def parse_parameters(rdlc: 'RDLCompiler', parameter_options: List[str]) -> Dict[
 
     return parameters
 
+def add_scope_arguments(parser: 'argparse._ActionsContainer') -> None:
+    parser.add_argument(
+        "--scope",
+        dest="scope",
+        metavar="PATH",
+        default=None,
+        help="Only export the addrmap at this hierarchical path, instead of the "
+                "entire design. For example: 'soc.periph.uart[0]'"
+    )
+    parser.add_argument(
+        "--exclude",
+        dest="excludes",
+        metavar="GLOB",
+        action="append",
+        default=[],
+        help="Exclude nodes whose hierarchical path matches this wildcard "
+                "pattern. Array indexes are not part of the path. Can be repeated"
+    )
+
+
+def scope_design(msg: 'MessageHandler', root: 'RootNode', options: 'argparse.Namespace') -> AddrmapNode:
+    """
+    Prune any nodes excluded by --exclude from the elaborated design, and
+    return the node selected by --scope.
+
+    Excluded nodes are made not present, so that exporters skip them without
+    changing the addresses or sizes of other nodes. The elaborated design is
+    not modified. Only the components along the paths to excluded nodes are
+    copied, so the same design can be exported several times.
+    """
+    if options.excludes:
+        n_matches = [0] * len(options.excludes)
+        pruned_inst = _prune_component(root.inst, "", options.excludes, n_matches)
+        for pattern, n in zip(options.excludes, n_matches):
+            if n == 0:
+                print(f"warning: --exclude pattern '{pattern}' did not match any nodes", file=sys.stderr)
+        if pruned_inst is not None:
+            root = RootNode(pruned_inst, root.env, None)
+
+    if options.scope is None:
+        return root.top
+
+    try:
+        scope_node = root.find_by_path(options.scope)
+    except (ValueError, IndexError):
+        scope_node = None
+    if scope_node is None:
+        msg.fatal(f"Scope '{options.scope}' was not found in the design")
+    if not isinstance(scope_node, AddrmapNode):
+        msg.fatal(f"Scope '{options.scope}' is not an addrmap")
+    return scope_node
+
+
+def _prune_component(comp: 'Component', path: str, patterns: List[str], n_matches: List[int]) -> 'Optional[Component]':
+    """
+    Copy a component, with any descendants whose path matches one of the
+    patterns made not present.
+
+    Returns None if nothing below the component matched, so that unaffected
+    subtrees remain shared with the original design.
+    """
+    new_children: Optional[List['Component']] = None
+    for i, child in enumerate(comp.children):
+        if child.properties.get("ispresent", True) is False:
+            continue
+        assert child.inst_name is not None
+        child_path = f"{path}.{child.inst_name}" if path else child.inst_name
+
+        matched = False
+        for j, pattern in enumerate(patterns):
+            if fnmatch.fnmatchcase(child_path, pattern):
+                n_matches[j] += 1
+                matched = True
+
+        new_child: Optional['Component']
+        if matched:
+            new_child = copy.copy(child)
+            new_child.properties = child.properties.copy()
+            new_child.properties["ispresent"] = False
+        else:
+            new_child = _prune_component(child, child_path, patterns, n_matches)
+
+        if new_child is not None:
+            if new_children is None:
+                new_children = list(comp.children)
+            new_children[i] = new_child
+
+    if new_children is None:
+        return None
+    result = copy.copy(comp)
+    result.children = new_children
+    return result
+
+
+class Variant:
+    """
+    One combination of defines and top-level parameter values to export
+    """
+    def __init__(self, label: str, defines: List[str], parameters: List[str], format_vars: Dict[str, str]) -> None:
+        #: Name of this variant used to expand the '{variant}' output path placeholder
+        self.label = label
+        self.defines = defines
+        self.parameters = parameters
+
+        #: Additional output path placeholders, such as the value of each swept parameter
+        self.format_vars = format_vars
+
+
+class ElaborateTarget:
+    """
+    One top-level component to elaborate and export from a compiled design
+    """
+    def __init__(self, top_def_name: Optional[str], inst_name: Optional[str], label: str, variant: Variant) -> None:
+        self.top_def_name = top_def_name
+        self.inst_name = inst_name
+        self.variant = variant
+
+        #: Name of this target used to expand output path templates
+        self.label = label
+
+    def get_options(self, options: 'argparse.Namespace') -> 'argparse.Namespace':
+        """
+        Get a copy of the command line options, specialized for this target
+        """
+        target_options = argparse.Namespace(**vars(options))
+        target_options.top_def_name = self.top_def_name
+        target_options.inst_name = self.inst_name
+        target_options.defines = self.variant.defines
+        target_options.parameters = self.variant.parameters
+        output = getattr(options, "output", None)
+        if output is not None:
+            output = output.replace("{top}", self.label)
+            output = output.replace("{variant}", self.variant.label)
+            for k, v in self.variant.format_vars.items():
+                output = output.replace("{" + k + "}", v)
+            target_options.output = output
+        return target_options
+
+
+def split_sweep_values(text: str) -> List[str]:
+    """
+    Split a parameter value into its sweep values.
+    Only commas that are not nested in brackets or strings separate values,
+    since these are never valid within a single SystemRDL expression.
+    """
+    values = []
+    depth = 0
+    in_string = False
+    start = 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if in_string:
+            if c == "\\":
+                i += 1
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "({[":
+            depth += 1
+        elif c in ")}]":
+            depth -= 1
+        elif c == "," and depth == 0:
+            values.append(text[start:i])
+            start = i + 1
+        i += 1
+    values.append(text[start:])
+    return values
+
+
+def _sanitize_label(s: str) -> str:
+    return re.sub(r"[^\w.-]+", "", s)
+
+
+def get_variants(msg: 'MessageHandler', options: 'argparse.Namespace', cfg_variants: Dict[str, Dict[str, List[str]]]) -> List[Variant]:
+    """
+    Expand the parameter sweeps and named variants requested on the command
+    line into the list of variants to export.
+    """
+    # Expand named variants from the PeakRDL config
+    named: List[Tuple[str, List[str], List[str]]] = []
+    for pattern in getattr(options, "variants", None) or []:
+        matches = [name for name in cfg_variants if fnmatch.fnmatchcase(name, pattern)]
+        if not matches:
+            msg.fatal(f"Variant '{pattern}' is not defined in the PeakRDL configuration")
+        for name in matches:
+            named.append((name, cfg_variants[name]["defines"], cfg_variants[name]["parameters"]))
+    if not named:
+        named.append(("", [], []))
+
+    # Expand parameter sweeps
+    sweep_axes: List[List[Tuple[str, str]]] = []
+    for raw_param in options.parameters:
+        m = re.fullmatch(r"(\w+)=(.+)", raw_param)
+        if not m:
+            # Let parse_parameters() report the error
+            sweep_axes.append([(raw_param, "")])
+            continue
+        values = split_sweep_values(m.group(2))
+        sweep_axes.append([(f"{m.group(1)}={v}", v) for v in values])
+
+    variants = []
+    for name, defines, cfg_params in named:
+        for combo in itertools.product(*sweep_axes):
+            parameters = [raw_param for raw_param, _ in combo]
+            format_vars = {}
+            label_parts = [name] if name else []
+            for axis, (raw_param, value) in zip(sweep_axes, combo):
+                if len(axis) > 1:
+                    p_name = raw_param.split("=", 1)[0]
+                    format_vars[p_name] = _sanitize_label(value)
+                    label_parts.append(p_name + _sanitize_label(value))
+            variants.append(Variant(
+                "_".join(label_parts),
+                list(options.defines) + defines,
+                cfg_params + parameters,
+                format_vars,
+            ))
+    return variants
+
+
+def get_default_top_name(rdlc: 'RDLCompiler') -> Optional[str]:
+    """
+    Name of the addrmap that is elaborated if no top is specified
+    """
+    for name, comp_def in reversed(rdlc.root.comp_defs.items()):
+        if isinstance(comp_def, Addrmap):
+            return name
+    return None
+
+
+def get_elaborate_targets(rdlc: 'RDLCompiler', options: 'argparse.Namespace', variants: Optional[List[Variant]] = None) -> List[ElaborateTarget]:
+    """
+    Resolve the list of top-level components and variants to elaborate from
+    the command line options. Wildcard patterns are matched against all
+    addrmaps in the root namespace.
+    """
+    if variants is None:
+        variants = [Variant("", options.defines, options.parameters, {})]
+
+    top_def_names: List[Optional[str]] = []
+    for top in getattr(options, "top_def_names", None) or [options.top_def_name]:
+        if _is_top_pattern(top):
+            matches = [
+                name for name, comp_def in rdlc.root.comp_defs.items()
+                if isinstance(comp_def, Addrmap) and fnmatch.fnmatchcase(name, top)
+            ]
+            if not matches:
+                rdlc.msg.fatal(f"Top pattern '{top}' did not match any addrmap components")
+            top_def_names.extend(matches)
+        else:
+            top_def_names.append(top)
+
+    inst_names: List[Optional[str]] = getattr(options, "inst_names", None) or [options.inst_name]
+    if inst_names == [None]:
+        inst_names = [None] * len(top_def_names)
+    elif len(inst_names) != len(top_def_names):
+        rdlc.msg.fatal(
+            f"Number of --rename arguments ({len(inst_names)}) does not "
+            f"match the number of tops ({len(top_def_names)})"
+        )
+
+    targets = []
+    for top_def_name, inst_name in zip(top_def_names, inst_names):
+        label = inst_name or top_def_name or get_default_top_name(rdlc) or ""
+        for variant in variants:
+            targets.append(ElaborateTarget(top_def_name, inst_name, label, variant))
+    return targets
+
+
+def check_unique_outputs(msg: 'MessageHandler', target_options: 'List[argparse.Namespace]') -> None:
+    """
+    Ensure that exporting multiple targets does not write the same output path
+    more than once.
+    """
+    outputs = set()
+    for options in target_options:
+        output = getattr(options, "output", None)
+        if output is None:
+            continue
+        if output in outputs:
+            msg.fatal(
+                f"Multiple tops or variants are exported to the same output path '{output}'. "
+                "The output path shall contain a '{top}' and/or '{variant}' placeholder"
+            )
+        outputs.add(output)
+
+
 def parse_defines(rdlc: 'RDLCompiler', define_options: List[str]) -> Dict[str, str]:
     defines = {}
     for raw_def in define_options:
@@ -97,10 +507,173 @@ def parse_defines(rdlc: 'RDLCompiler', define_options: List[str]) -> Dict[str, s
     return defines
 
 
+def normalize_input_files(input_files: List[str], inc_index: incindex.IncludeIndex) -> List[str]:
+    """
+    Remove input files that would be loaded more than once.
+
+    A file is skipped if it resolves to the same real path, or has identical
+    content as a file that was listed before it, or if it is already
+    unconditionally included by an earlier SystemRDL input.
+    """
+    # real path/content hash -> the first input file that provided it
+    seen_paths: Dict[str, str] = {}
+    seen_hashes: Dict[str, str] = {}
+    included_by: Dict[str, str] = {}
+
+    normalized = []
+    for file in input_files:
+        if not os.path.isfile(file):
+            # Let load_file() report the error
+            normalized.append(file)
+            continue
+
+        realpath = os.path.realpath(file)
+        with open(file, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+
+        if realpath in seen_paths:
+            print(f"note: Skipping duplicate input file '{file}'. Same file as '{seen_paths[realpath]}'", file=sys.stderr)
+            continue
+        if content_hash in seen_hashes:
+            print(f"note: Skipping duplicate input file '{file}'. Same contents as '{seen_hashes[content_hash]}'", file=sys.stderr)
+            continue
+        if realpath in included_by:
+            print(f"note: Skipping input file '{file}'. Already included by '{included_by[realpath]}'", file=sys.stderr)
+            continue
+
+        seen_paths[realpath] = file
+        seen_hashes[content_hash] = file
+        if file.endswith(".rdl"):
+            for incl_path in inc_index.get_included_files(file):
+                included_by.setdefault(incl_path, file)
+        normalized.append(file)
+    return normalized
+
+
+def get_input_files(rdlc: 'RDLCompiler', input_files: List[str], options: 'argparse.Namespace', inc_index: incindex.IncludeIndex) -> List[str]:
+    """
+    Get the final list of files to load, in order.
+
+    This includes any files needed from library directories, and excludes
+    duplicate inputs.
+    """
+    libdirs = getattr(options, "libdirs", None)
+    if libdirs:
+        top_names = getattr(options, "top_def_names", None) or [getattr(options, "top_def_name", None)]
+        input_files = libindex.get_library_files(rdlc, libdirs, input_files, top_names) + input_files
+
+    if not input_files:
+        rdlc.msg.fatal("No input files")
+
+    return normalize_input_files(input_files, inc_index)
+
+
+def get_file_incdirs(path: str, options: 'argparse.Namespace', inc_index: incindex.IncludeIndex) -> List[str]:
+    """
+    Get the include search directories to use when loading a file.
+    """
+    if options.incdirs and path.endswith(".rdl"):
+        # Only pass the search directories the file's includes resolve from
+        return inc_index.get_search_paths(path)
+    return options.incdirs
+
+
+def list_inputs(rdlc: 'RDLCompiler', input_files: List[str], options: 'argparse.Namespace') -> List[str]:
+    """
+    Get the files that process_input() would load, in order, without
+    compiling them.
+    """
+    inc_index = incindex.IncludeIndex(options.incdirs or [], getattr(options, "cache_incdirs", False))
+    return get_input_files(rdlc, input_files, options, inc_index)
+
+
 def process_input(rdlc: 'RDLCompiler', importers: 'Sequence[Importer]', input_files: List[str], options: 'argparse.Namespace') -> None:
     defines = parse_defines(rdlc, options.defines)
+
+    inc_index = incindex.IncludeIndex(options.incdirs or [], getattr(options, "cache_incdirs", False))
+    input_files = get_input_files(rdlc, input_files, options, inc_index)
+    _load_files(rdlc, importers, input_files, defines, options, inc_index)
+    _report_unused_incdirs(options, inc_index)
+
+
+def process_input_groups(
+        new_compiler: 'Callable[[], RDLCompiler]',
+        importers: 'Sequence[Importer]',
+        input_files: List[str],
+        options: 'argparse.Namespace',
+        define_groups: List[List[str]],
+    ) -> Iterator['RDLCompiler']:
+    """
+    Compile the input files once for each set of defines, and yield the
+    compiler of each in turn.
+
+    Leading SystemRDL files that do not refer to any macro whose definition
+    differs between the sets are preprocessed and parsed only once. The
+    compilers of all sets start from a snapshot of the compiler that loaded
+    them.
+    """
+    base = new_compiler()
+    group_defines = [parse_defines(base, defines) for defines in define_groups]
+
+    inc_index = incindex.IncludeIndex(options.incdirs or [], getattr(options, "cache_incdirs", False))
+    input_files = get_input_files(base, input_files, options, inc_index)
+
+    # Macros whose definition is not the same in all sets
+    varying: Set[str] = set()
+    for defines in group_defines:
+        for name in defines:
+            if any(other.get(name) != defines[name] for other in group_defines):
+                varying.add(name)
+
+    n_shared = 0
+    if len(group_defines) > 1:
+        for file in input_files:
+            if not file.endswith(".rdl") or inc_index.may_use_macros(file, varying):
+                break
+            n_shared += 1
+
+    snapshot = None
+    if n_shared:
+        _load_files(base, importers, input_files[:n_shared], group_defines[0], options, inc_index)
+        try:
+            snapshot = pickle.dumps(base, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            # Not all UDP definitions can be pickled. Compile each set separately
+            base = new_compiler()
+            n_shared = 0
+
+    for i, defines in enumerate(group_defines):
+        if i == len(group_defines) - 1:
+            rdlc = base
+        elif snapshot is not None:
+            rdlc = pickle.loads(snapshot)
+        else:
+            rdlc = new_compiler()
+        _load_files(rdlc, importers, input_files[n_shared:], defines, options, inc_index)
+        yield rdlc
+
+    _report_unused_incdirs(options, inc_index)
+
+
+def _load_files(
+        rdlc: 'RDLCompiler',
+        importers: 'Sequence[Importer]',
+        input_files: List[str],
+        defines: Dict[str, str],
+        options: 'argparse.Namespace',
+        inc_index: incindex.IncludeIndex,
+    ) -> None:
     for file in input_files:
-        load_file(rdlc, importers, file, defines, options.incdirs, options)
+        hooks.dispatch("pre_compile_file", file)
+        t_start = time.perf_counter()
+        load_file(rdlc, importers, file, defines, get_file_incdirs(file, options, inc_index), options)
+        hooks.dispatch("post_compile_file", file, time.perf_counter() - t_start)
+
+
+def _report_unused_incdirs(options: 'argparse.Namespace', inc_index: incindex.IncludeIndex) -> None:
+    if getattr(options, "report_unused_incdirs", False):
+        for incdir in inc_index.get_unused_incdirs():
+            print(f"warning: Include directory was never used: {incdir}", file=sys.stderr)
 
 
 def load_file(
@@ -110,10 +683,12 @@ def load_file(
         defines: Dict[str, str],
         incdirs: List[str],
         options: 'argparse.Namespace'
-    ) -> None:
+    ) -> Optional['FileInfo']:
     """
     Careful! This is a secret API!
     sphinx-peakrdl calls this.
+
+    Returns the compiler's file info if the file was SystemRDL.
     """
 
     if not os.path.exists(path):
@@ -122,7 +697,7 @@ def load_file(
     ext = os.path.splitext(path)[1].strip(".")
     if ext == "rdl":
         # Is SystemRDL file
-        rdlc.compile_file(
+        return rdlc.compile_file(
             path,
             incl_search_paths=incdirs,
             defines=defines,
@@ -158,4 +733,8 @@ def load_file(
             )
             raise ValueError
 
-        importer.do_import(rdlc, options, path)
+        if importer.supports_import_cache:
+            import_cache.do_import(rdlc, importer, options, path)
+        else:
+            importer.do_import(rdlc, options, path)
+        return None
@@ -0,0 +1,240 @@
+"""
+Reader for PeakRDL register map snapshot files.
+
+This module only depends on the Python standard library, so that tools that
+consume snapshots do not need to depend on the SystemRDL compiler.
+
+File layout (all values little-endian)::
+
+    header
+    string offsets  u32[n_strings + 1]
+    string data     utf-8 bytes
+    array dims      u32[n_dims]
+    nodes           NODE_STRUCT[n_nodes]
+    fields          FIELD_STRUCT[n_fields]
+
+Nodes are stored in depth-first order. Arrays are not unrolled. Each node's
+``subtree_end`` is the index after its last descendant.
+
+Reset values that do not fit in a field record's 64-bit ``reset`` are stored
+as hexadecimal strings, and ``reset`` holds the string's index instead.
+"""
+from typing import List, Iterator, NamedTuple, Optional, Tuple, Union
+import mmap
+import struct
+import itertools
+
+MAGIC = b"PRDLSNAP"
+
+#: Bump if the file format changes
+VERSION = 2
+
+HEADER_STRUCT = struct.Struct("<8sHHIIIIIIIII")
+NODE_STRUCT = struct.Struct("<IIIBBHHHIIIQQQ")
+FIELD_STRUCT = struct.Struct("<IHHBBBBB3xQ")
+
+# Sentinel for nodes that have no parent
+NO_PARENT = 0xFFFFFFFF
+
+NODE_KINDS = ("addrmap", "regfile", "mem", "reg")
+KIND_REG = NODE_KINDS.index("reg")
+ACCESS_TYPES = ("na", "rw", "r", "w", "rw1", "w1")
+ONREAD_TYPES = (None, "rclr", "rset", "ruser")
+ONWRITE_TYPES = (None, "woset", "woclr", "wot", "wzs", "wzc", "wzt", "wclr", "wset", "wuser")
+
+# Field flags
+FIELD_HAS_RESET = 0x01
+FIELD_VOLATILE = 0x02
+FIELD_WIDE_RESET = 0x04
+
+
+def is_snapshot_file(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class Node(NamedTuple):
+    name: int
+    parent: int
+    subtree_end: int
+    kind: int
+    n_dims: int
+    regwidth: int
+    accesswidth: int
+    reserved: int
+    dims_idx: int
+    first_field: int
+    n_fields: int
+    #: Absolute address of the node, with all array indexes set to 0
+    raw_address: int
+    #: Size of a single array element
+    size: int
+    array_stride: int
+
+
+class Field(NamedTuple):
+    name: int
+    lsb: int
+    width: int
+    sw: int
+    hw: int
+    onread: int
+    onwrite: int
+    flags: int
+    #: Use SnapshotReader.get_reset() to decode resets wider than 64 bits
+    reset: int
+
+
+class SnapshotReader:
+    """
+    Memory-mapped reader of a snapshot file.
+
+    Opening a snapshot only reads its header. Records are decoded on access.
+
+    Raises a ``ValueError`` if the file is not a compatible snapshot.
+    """
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._buf: Union[mmap.mmap, bytes] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(path)
+        except ValueError:
+            self.close()
+            raise
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SnapshotReader':
+        """
+        Read a snapshot from an in-memory buffer
+        """
+        self = cls.__new__(cls)
+        self._buf = data
+        self._read_header("<memory>")
+        return self
+
+    def _read_header(self, path: str) -> None:
+        if len(self._buf) < HEADER_STRUCT.size:
+            raise ValueError(f"Not a PeakRDL snapshot file: {path}")
+
+        (
+            magic, version, _,
+            self.n_strings, self.n_dims, self.n_nodes, self.n_fields,
+            self._str_offsets_pos, self._str_data_pos, self._dims_pos,
+            self._nodes_pos, self._fields_pos,
+        ) = HEADER_STRUCT.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a PeakRDL snapshot file: {path}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} in {path}. Expected {VERSION}")
+
+    def close(self) -> None:
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def get_string(self, idx: int) -> str:
+        start, end = struct.unpack_from("<II", self._buf, self._str_offsets_pos + idx * 4)
+        return self._buf[self._str_data_pos + start:self._str_data_pos + end].decode("utf-8")
+
+    def get_node(self, idx: int) -> Node:
+        return Node._make(NODE_STRUCT.unpack_from(self._buf, self._nodes_pos + idx * NODE_STRUCT.size))
+
+    def get_field(self, idx: int) -> Field:
+        return Field._make(FIELD_STRUCT.unpack_from(self._buf, self._fields_pos + idx * FIELD_STRUCT.size))
+
+    def get_reset(self, field: Field) -> Optional[int]:
+        """
+        Reset value of a field, or None if it has no constant reset
+        """
+        if not field.flags & FIELD_HAS_RESET:
+            return None
+        if field.flags & FIELD_WIDE_RESET:
+            return int(self.get_string(field.reset), 16)
+        return field.reset
+
+    def get_name(self, idx: int) -> str:
+        return self.get_string(self.get_node(idx).name)
+
+    def get_kind(self, idx: int) -> str:
+        return NODE_KINDS[self.get_node(idx).kind]
+
+    def get_dims(self, idx: int) -> Tuple[int, ...]:
+        """
+        Array dimensions of a node. Empty if the node is not an array.
+        """
+        node = self.get_node(idx)
+        return struct.unpack_from(f"<{node.n_dims}I", self._buf, self._dims_pos + node.dims_idx * 4)
+
+    def get_path(self, idx: int) -> str:
+        parts = []
+        while idx != NO_PARENT:
+            node = self.get_node(idx)
+            dims = self.get_dims(idx)
+            parts.append(self.get_string(node.name) + "[]" * len(dims))
+            idx = node.parent
+        return ".".join(reversed(parts))
+
+    def children(self, idx: int) -> Iterator[int]:
+        """
+        Indexes of a node's immediate children
+        """
+        end = self.get_node(idx).subtree_end
+        child = idx + 1
+        while child < end:
+            yield child
+            child = self.get_node(child).subtree_end
+
+    def find(self, path: str) -> Optional[int]:
+        """
+        Find a node by its path. Array suffixes are ignored.
+        """
+        names = [part.split("[", 1)[0] for part in path.split(".")]
+        if self.n_nodes == 0 or self.get_name(0) != names[0]:
+            return None
+        idx = 0
+        for name in names[1:]:
+            for child in self.children(idx):
+                if self.get_name(child) == name:
+                    idx = child
+                    break
+            else:
+                return None
+        return idx
+
+    def iter_registers(self) -> Iterator[int]:
+        for idx in range(self.n_nodes):
+            if self.get_node(idx).kind == KIND_REG:
+                yield idx
+
+    def iter_fields(self, idx: int) -> Iterator[Field]:
+        node = self.get_node(idx)
+        for field_idx in range(node.first_field, node.first_field + node.n_fields):
+            yield self.get_field(field_idx)
+
+    def iter_addresses(self, idx: int) -> Iterator[int]:
+        """
+        Absolute addresses of every element of a node, expanding its own arrays
+        and those of all its parents.
+        """
+        offset_sets: List[List[int]] = []
+        node_idx = idx
+        while node_idx != NO_PARENT:
+            node = self.get_node(node_idx)
+            if node.n_dims:
+                n_elements = 1
+                for dim in self.get_dims(node_idx):
+                    n_elements *= dim
+                offset_sets.append([i * node.array_stride for i in range(n_elements)])
+            node_idx = node.parent
+
+        raw_address = self.get_node(idx).raw_address
+        for offsets in itertools.product(*reversed(offset_sets)):
+            yield raw_address + sum(offsets)
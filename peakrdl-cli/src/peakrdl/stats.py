@@ -0,0 +1,168 @@
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+import re
+import argparse
+import weakref
+
+from systemrdl.node import Node, AddressableNode, AddrmapNode, RegfileNode, MemNode, RegNode, FieldNode
+
+if TYPE_CHECKING:
+    from systemrdl.messages import MessageHandler
+    from systemrdl.component import Component
+
+#: Rough estimate of the memory used per unrolled node while exporting.
+#: An unrolled systemrdl Node object alone is ~120 bytes. The rest accounts
+#: for the state that a typical exporter keeps, or generates, per node.
+BYTES_PER_UNROLLED_NODE = 1024
+
+NODE_KINDS = {
+    AddrmapNode: "addrmaps",
+    RegfileNode: "regfiles",
+    MemNode: "mems",
+    RegNode: "registers",
+    FieldNode: "fields",
+}
+
+
+class DesignStats:
+    """
+    Size of an elaborated design, computed without unrolling arrays.
+
+    Traversal only visits each declared node once, so it is cheap even for
+    designs that would be very large once unrolled.
+    """
+    def __init__(self, top_node: AddressableNode) -> None:
+        #: Number of nodes of each kind, with arrays counted once
+        self.declared: Dict[str, int] = dict.fromkeys(NODE_KINDS.values(), 0)
+
+        #: Number of nodes of each kind, if all arrays were unrolled
+        self.unrolled: Dict[str, int] = dict.fromkeys(NODE_KINDS.values(), 0)
+
+        #: Largest number of unrolled instances of a single declared node,
+        #: including the arrays of all its parents
+        self.max_expansion = 1
+
+        #: Maximum hierarchy depth. The top-level node has a depth of 1
+        self.depth = 0
+
+        #: Start address and size of the address space covered by the design
+        self.base_address = top_node.raw_absolute_address
+        self.address_span = top_node.total_size
+
+        #: Total size of all unrolled registers, in bytes
+        self.register_bytes = 0
+
+        self._visit(top_node, 1, 1)
+
+    def _visit(self, node: Node, multiplier: int, depth: int) -> None:
+        if isinstance(node, AddressableNode) and node.is_array and node.current_idx is None:
+            multiplier *= node.n_elements
+        self.max_expansion = max(self.max_expansion, multiplier)
+        self.depth = max(self.depth, depth)
+
+        kind = NODE_KINDS.get(type(node))
+        if kind is not None:
+            self.declared[kind] += 1
+            self.unrolled[kind] += multiplier
+        if isinstance(node, RegNode):
+            self.register_bytes += node.size * multiplier
+
+        for child in node.children(unroll=False):
+            self._visit(child, multiplier, depth + 1)
+
+    @property
+    def total_unrolled(self) -> int:
+        """
+        Number of nodes if all arrays were unrolled
+        """
+        return sum(self.unrolled.values())
+
+    @property
+    def density(self) -> float:
+        """
+        Fraction of the address span that is occupied by registers
+        """
+        if self.address_span == 0:
+            return 0.0
+        return self.register_bytes / self.address_span
+
+    @property
+    def estimated_memory(self) -> int:
+        """
+        Rough estimate of the memory required to export the design unrolled,
+        in bytes
+        """
+        return self.total_unrolled * BYTES_PER_UNROLLED_NODE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "declared": self.declared,
+            "unrolled": self.unrolled,
+            "max_expansion": self.max_expansion,
+            "depth": self.depth,
+            "base_address": self.base_address,
+            "address_span": self.address_span,
+            "density": self.density,
+            "estimated_memory": self.estimated_memory,
+        }
+
+
+# Stats of each elaborated design, so that the resource limit check and the
+# ledger do not both traverse it. Keyed by the design's component instance,
+# since node objects are created on every access
+_stats_cache: 'weakref.WeakKeyDictionary[Component, Tuple[Optional[List[int]], DesignStats]]' = weakref.WeakKeyDictionary()
+
+def get_design_stats(top_node: AddressableNode) -> DesignStats:
+    """
+    Get the stats of a design. Each design is only traversed once, no matter
+    how many times its stats are requested.
+    """
+    cached = _stats_cache.get(top_node.inst)
+    if cached is not None and cached[0] == top_node.current_idx:
+        return cached[1]
+    stats = DesignStats(top_node)
+    _stats_cache[top_node.inst] = (top_node.current_idx, stats)
+    return stats
+
+
+def parse_size(s: str) -> int:
+    """
+    Parse a size in bytes, with an optional K, M, G or T suffix
+    """
+    m = re.fullmatch(r"(\d+)\s*(?:([KMGT])i?)?B?", s.strip(), re.IGNORECASE)
+    if not m:
+        raise argparse.ArgumentTypeError(f"invalid size: '{s}'")
+    return int(m.group(1)) * 1024 ** " KMGT".index((m.group(2) or " ").upper())
+
+
+def format_size(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    size = float(n)
+    for unit in ("KiB", "MiB", "GiB", "TiB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f} {unit}"
+
+
+def check_limits(msg: 'MessageHandler', top_node: AddressableNode, options: 'argparse.Namespace') -> None:
+    """
+    Abort if the design exceeds the --max-unrolled-nodes or --max-memory
+    resource limits
+    """
+    if options.max_unrolled_nodes is None and options.max_memory is None:
+        return
+
+    stats = get_design_stats(top_node)
+    if options.max_unrolled_nodes is not None and stats.total_unrolled > options.max_unrolled_nodes:
+        msg.fatal(
+            f"Design has {stats.total_unrolled} nodes when unrolled, which exceeds "
+            f"--max-unrolled-nodes {options.max_unrolled_nodes}. "
+            "Use 'peakrdl stats' to see where they come from"
+        )
+    if options.max_memory is not None and stats.estimated_memory > options.max_memory:
+        msg.fatal(
+            f"Exporting the design is estimated to use {format_size(stats.estimated_memory)} "
+            f"of memory, which exceeds --max-memory {format_size(options.max_memory)}. "
+            "Use 'peakrdl stats' to see where it comes from"
+        )
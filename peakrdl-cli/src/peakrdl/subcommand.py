@@ -1,15 +1,25 @@
-from typing import TYPE_CHECKING, Optional, List, Type, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Type, Dict, Any, Tuple, Iterator
+import sys
+import json
+import argparse
+import multiprocessing
+import time
 
-from systemrdl import RDLCompiler
+from systemrdl import RDLCompiler, RDLCompileError
+from systemrdl.messages import MessageHandler, MessagePrinter
 
 from .config import schema
 from .config.loader import AppConfig
 from . import process_input
+from . import incremental
+from . import stats
+from . import instrument
+from . import output
+from . import node_index
+from .plugins import hooks
 
 if TYPE_CHECKING:
-    import argparse
-
-    from systemrdl.node import AddrmapNode
+    from systemrdl.node import AddrmapNode, Node, RootNode
     from systemrdl.udp import UDPDefinition
     from .plugins.importer import ImporterPlugin
 
@@ -39,8 +49,15 @@ class Subcommand:
         #: and validated.
         self.cfg: Dict[str, Any] = {}
 
+        #: The complete PeakRDL configuration that was loaded at startup
+        self.app_cfg: Optional[AppConfig] = None
+
+        # Parser of the subcommand's command line, once it is initialized
+        self._parser: Optional[argparse.ArgumentParser] = None
+
     def _load_cfg(self, cfg: AppConfig) -> None:
         self.cfg = cfg.get_namespace(self.name, schema.normalize(self.cfg_schema))
+        self.app_cfg = cfg
 
     def _init_subparser(self, subgroup: 'argparse._SubParsersAction', importers: 'List[ImporterPlugin]') -> None:
         assert isinstance(self.name, str)
@@ -50,6 +67,7 @@ class Subcommand:
             help=self.short_desc,
             description=(self.long_desc or self.short_desc)
         )
+        self._parser = subparser
         self.add_arguments(subparser, importers)
         subparser.set_defaults(subcommand=self)
 
@@ -101,12 +119,37 @@ class ExporterSubcommand(Subcommand):
     #: compiler as soft UDPs via ``RDLCompiler.register_udp()``
     udp_definitions: List[Type["UDPDefinition"]] = []
 
+    #: Set this to ``True`` if the exporter implements
+    #: ``get_output_dependencies()`` and ``do_export_outputs()``.
+    #: Adds an ``--incremental`` command-line argument that only regenerates
+    #: outputs whose subtree changed since the previous run.
+    supports_incremental_export = False
+
+    #: Set this to ``True`` if the exporter writes its output files through
+    #: ``options.output_backend``, rather than opening them directly.
+    #: Allows ``-o`` to name a ``.zip`` or ``.tar`` archive in addition to a
+    #: directory, and the Python API to export into memory.
+    supports_output_backend = False
+
+    #: Destinations of the command line options that may affect the exported
+    #: outputs. Set by ``add_arguments()``
+    _output_option_dests: Optional[List[str]] = None
+
     def add_arguments(self, parser: 'argparse._ActionsContainer', importers: 'List[ImporterPlugin]') -> None:
+        # Only the compilation, importer and exporter-specific options may
+        # affect the outputs. Other options only control how the export runs
+        output_actions: List[argparse.Action] = []
+        actions = parser._actions # pylint: disable=protected-access
+
+        n_actions = len(actions)
         compiler_arg_group = parser.add_argument_group("compilation args")
         process_input.add_rdl_compile_arguments(compiler_arg_group)
+        process_input.add_list_inputs_argument(compiler_arg_group)
         process_input.add_elaborate_arguments(compiler_arg_group)
+        process_input.add_scope_arguments(compiler_arg_group)
 
         process_input.add_importer_arguments(parser, importers)
+        output_actions.extend(actions[n_actions:])
 
         exporter_arg_group = parser.add_argument_group("exporter args")
         if self.generates_output_file:
@@ -116,7 +159,79 @@ class ExporterSubcommand(Subcommand):
                 required=True,
                 help="Output path",
             )
+        if self.supports_output_backend:
+            exporter_arg_group.add_argument(
+                "--write-threads",
+                dest="write_threads",
+                metavar="N",
+                type=int,
+                default=0,
+                help="Write output files from a pool of N background threads, "
+                        "while the exporter continues generating. By default, "
+                        "files are written synchronously",
+            )
+            exporter_arg_group.add_argument(
+                "--fsync",
+                dest="fsync",
+                default=False,
+                action="store_true",
+                help="Flush all output files to stable storage once the export completes",
+            )
+        if self.generates_output_file and self._supports_list_outputs():
+            exporter_arg_group.add_argument(
+                "--list-outputs",
+                dest="list_outputs",
+                default=False,
+                action="store_true",
+                help="Print the paths of the files that the export would write, "
+                        "as a JSON list, then exit without exporting",
+            )
+        if self.supports_incremental_export:
+            exporter_arg_group.add_argument(
+                "--incremental",
+                dest="incremental",
+                default=False,
+                action="store_true",
+                help="Only regenerate outputs whose part of the design changed since the previous run",
+            )
+        n_actions = len(actions)
         self.add_exporter_arguments(exporter_arg_group)
+        output_actions.extend(actions[n_actions:])
+
+        self._output_option_dests = []
+        for action in output_actions:
+            self._output_option_dests.append(action.dest)
+            if isinstance(action, process_input._AppendFirstAction): # pylint: disable=protected-access
+                self._output_option_dests.append(action.first_dest)
+
+        exporter_arg_group.add_argument(
+            "--profile-listeners",
+            dest="profile_listeners",
+            default=False,
+            action="store_true",
+            help="Count and time the exporter's RDLListener callbacks, and print "
+                    "the slowest callbacks and subtrees after exporting",
+        )
+
+        limits_arg_group = parser.add_argument_group("resource limits")
+        limits_arg_group.add_argument(
+            "--max-unrolled-nodes",
+            dest="max_unrolled_nodes",
+            metavar="N",
+            type=int,
+            default=None,
+            help="Abort before exporting if the design has more than N nodes "
+                    "once all arrays are unrolled",
+        )
+        limits_arg_group.add_argument(
+            "--max-memory",
+            dest="max_memory",
+            metavar="SIZE",
+            type=stats.parse_size,
+            default=None,
+            help="Abort before exporting if the export is estimated to use more "
+                    "than SIZE of memory. For example: 512M, 4G",
+        )
 
     def add_exporter_arguments(self, arg_group: 'argparse._ActionsContainer') -> None:
         """
@@ -139,23 +254,205 @@ class ExporterSubcommand(Subcommand):
         """
 
     def main(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace') -> None:
+        if self._parser is not None:
+            process_input.check_elaborate_arguments(self._parser, options)
+
+        cfg_variants = {}
+        if self.app_cfg is not None:
+            cfg_variants = self.app_cfg.peakrdl_cfg['variants']
+        variants = process_input.get_variants(MessageHandler(MessagePrinter()), options, cfg_variants)
+
+        # Variants that only differ by parameters share the same compiled
+        # design. Only compile once per unique set of defines
+        variant_groups: Dict[Tuple[str, ...], List[process_input.Variant]] = {}
+        for variant in variants:
+            variant_groups.setdefault(tuple(variant.defines), []).append(variant)
+
+        if getattr(options, "list_inputs", False):
+            for path in process_input.list_inputs(RDLCompiler(), options.input_files, options):
+                print(path)
+            return
+
+        if getattr(options, "list_outputs", False):
+            self._list_outputs(importers, options, variants, variant_groups)
+            return
+
+        outputs: List['argparse.Namespace'] = []
+        for rdlc, group in zip(self._compile_variant_groups(importers, options, variant_groups), variant_groups.values()):
+            targets = process_input.get_elaborate_targets(rdlc, options, group)
+            outputs.extend(target.get_options(options) for target in targets)
+            process_input.check_unique_outputs(rdlc.msg, outputs)
+
+            self._export_targets(rdlc, targets, options)
+
+    def _new_compiler(self) -> RDLCompiler:
         rdlc = RDLCompiler()
-
         for udp in self.udp_definitions:
             rdlc.register_udp(udp)
+        return rdlc
+
+    def _compile_variant_groups(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace', variant_groups: 'Dict[Tuple[str, ...], List[process_input.Variant]]') -> Iterator[RDLCompiler]:
+        """
+        Compile the design once per unique set of defines of the variants.
+        Input files that do not depend on these defines are only parsed once.
+        """
+        return process_input.process_input_groups(
+            self._new_compiler, importers, options.input_files, options,
+            [list(defines) for defines in variant_groups],
+        )
 
-        parameters = process_input.parse_parameters(rdlc, options.parameters)
+    def _supports_list_outputs(self) -> bool:
+        cls = type(self)
+        return (
+            self.supports_incremental_export
+            or cls.get_output_files is not ExporterSubcommand.get_output_files
+            or cls.get_output_files_from_options is not ExporterSubcommand.get_output_files_from_options
+        )
 
-        process_input.process_input(rdlc, importers, options.input_files, options)
+    def _get_target_outputs_from_options(self, options: 'argparse.Namespace') -> Optional[List[str]]:
+        if self.supports_output_backend and options.output.endswith(output.ARCHIVE_EXTENSIONS):
+            return [options.output]
+        return self.get_output_files_from_options(options)
 
+    def _get_static_targets(self, options: 'argparse.Namespace', variants: 'List[process_input.Variant]') -> 'Optional[List[process_input.ElaborateTarget]]':
+        """
+        Get the targets to export without compiling the design, if they are
+        known up front
+        """
+        tops = getattr(options, "top_def_names", None) or [options.top_def_name]
+        inst_names = getattr(options, "inst_names", None) or [options.inst_name] * len(tops)
+        targets = []
+        for top, inst_name in zip(tops, inst_names):
+            if top is not None and any(c in top for c in "*?["):
+                return None
+            label = inst_name or top
+            if label is None and "{top}" in options.output:
+                # Default top is only known once compiled
+                return None
+            for variant in variants:
+                targets.append(process_input.ElaborateTarget(top, inst_name, label or "", variant))
+        return targets
+
+    def _list_outputs(self, importers: 'List[ImporterPlugin]', options: 'argparse.Namespace', variants: 'List[process_input.Variant]', variant_groups: 'Dict[Tuple[str, ...], List[process_input.Variant]]') -> None:
+        # Avoid compiling and elaborating the design if the outputs only depend
+        # on the command line options
+        static_targets = self._get_static_targets(options, variants)
+        if static_targets is not None:
+            outputs = []
+            for target in static_targets:
+                target_outputs = self._get_target_outputs_from_options(target.get_options(options))
+                if target_outputs is None:
+                    break
+                outputs.extend(target_outputs)
+            else:
+                print(json.dumps(outputs, indent=2))
+                return
+
+        all_outputs: List[str] = []
+        for rdlc, group in zip(self._compile_variant_groups(importers, options, variant_groups), variant_groups.values()):
+            for target in process_input.get_elaborate_targets(rdlc, options, group):
+                target_options = target.get_options(options)
+                target_outputs = self._get_target_outputs_from_options(target_options)
+                if target_outputs is None:
+                    root = self._elaborate_target(rdlc, target_options)
+                    top_node = process_input.scope_design(rdlc.msg, root, target_options)
+                    try:
+                        target_outputs = self.get_output_files(top_node, target_options)
+                    except NotImplementedError:
+                        rdlc.msg.fatal(
+                            f"Exporter '{self.name}' cannot list its outputs for these options. "
+                            "Its outputs depend on the design, but it does not implement get_output_files()"
+                        )
+                all_outputs.extend(target_outputs)
+        print(json.dumps(all_outputs, indent=2))
+
+    def _export_targets(self, rdlc: RDLCompiler, targets: 'List[process_input.ElaborateTarget]', options: 'argparse.Namespace') -> None:
+        parallel = min(getattr(options, "parallel", 1), len(targets))
+        if parallel > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # Each forked worker inherits the compiled design, so only
+            # elaboration and export is done per target
+            global _fork_state # pylint: disable=global-statement
+            _fork_state = (self, rdlc, targets, options)
+            try:
+                ctx = multiprocessing.get_context("fork")
+                with ctx.Pool(parallel) as pool:
+                    ok = pool.map(_export_target_in_fork, range(len(targets)))
+            finally:
+                _fork_state = None
+            if not all(ok):
+                sys.exit(1)
+        else:
+            for target in targets:
+                self._export_target(rdlc, target, options)
+
+    def _elaborate_target(self, rdlc: RDLCompiler, target_options: 'argparse.Namespace') -> 'RootNode':
+        parameters = process_input.parse_parameters(rdlc, target_options.parameters)
+
+        hooks.dispatch("pre_elaborate", target_options.top_def_name)
+        t_start = time.perf_counter()
         root = rdlc.elaborate(
-            top_def_name=options.top_def_name,
-            inst_name=options.inst_name,
+            top_def_name=target_options.top_def_name,
+            inst_name=target_options.inst_name,
             parameters=parameters
         )
+        hooks.dispatch("post_elaborate", root.top, time.perf_counter() - t_start)
+        return root
+
+    def _export_target(self, rdlc: RDLCompiler, target: 'process_input.ElaborateTarget', options: 'argparse.Namespace') -> None:
+        target_options = target.get_options(options)
+        root = self._elaborate_target(rdlc, target_options)
 
         # Run exporter
-        self.do_export(root.top, options)
+        top_node = process_input.scope_design(rdlc.msg, root, target_options)
+        stats.check_limits(rdlc.msg, top_node, target_options)
+        try:
+            if target_options.profile_listeners:
+                profile = instrument.WalkerProfile()
+                with profile.instrument():
+                    self._run_export(top_node, target_options)
+                for line in profile.format_report():
+                    print(line, file=sys.stderr)
+            else:
+                self._run_export(top_node, target_options)
+        except output.OutputWriteError as e:
+            rdlc.msg.fatal(str(e))
+
+    def _run_export(self, top_node: 'AddrmapNode', options: 'argparse.Namespace') -> None:
+        hooks.dispatch("pre_export", self, top_node, options)
+        t_start = time.perf_counter()
+
+        use_incremental = self.supports_incremental_export and options.incremental
+        backend = None
+        if self.supports_output_backend:
+            # Backends that are provided by the caller are not closed here
+            provided_backend = getattr(options, "output_backend", None)
+            if provided_backend is None:
+                backend = output.get_output_backend(options.output, options.fsync)
+            if use_incremental and not isinstance(provided_backend or backend, output.DirectoryOutput):
+                print("warning: --incremental only applies to directory outputs. Exporting all outputs", file=sys.stderr)
+                use_incremental = False
+            if backend is not None:
+                if options.write_threads > 0:
+                    backend = output.BackgroundWriter(backend, options.write_threads)
+                options = argparse.Namespace(**vars(options))
+                options.output_backend = backend
+
+        try:
+            if use_incremental:
+                incremental.export(self, top_node, options)
+            else:
+                if self.supports_incremental_export:
+                    # Outputs are about to be overwritten, so they no longer
+                    # match any previous incremental export
+                    incremental.invalidate(self, options)
+                self.do_export(top_node, options)
+        except BaseException:
+            if backend is not None:
+                backend.abort()
+            raise
+        if backend is not None:
+            backend.close()
+        hooks.dispatch("post_export", self, top_node, options, time.perf_counter() - t_start)
 
 
     def do_export(self, top_node: 'AddrmapNode', options: 'argparse.Namespace') -> None:
@@ -170,3 +467,109 @@ class ExporterSubcommand(Subcommand):
             Argparse namespace object containing all the command line argument values.
         """
         raise NotImplementedError
+
+
+    def get_output_dependencies(self, top_node: 'AddrmapNode', options: 'argparse.Namespace') -> Dict[str, 'Node']:
+        """
+        Override this function to support incremental export.
+
+        Returns a dictionary that maps the path of each output file to the node
+        it is generated from. An output's contents shall only depend on that
+        node's subtree, its location in the design, and the command line options.
+
+        Parameters
+        ----------
+        top_node: ``systemrdl.node.AddrmapNode``
+            Node representing the top of the design to be exported
+        options: ``argparse.Namespace``
+            Argparse namespace object containing all the command line argument values.
+        """
+        raise NotImplementedError
+
+
+    def do_export_outputs(self, top_node: 'AddrmapNode', options: 'argparse.Namespace', outputs: List[str]) -> None:
+        """
+        Override this function to support incremental export.
+
+        Same as ``do_export()``, except only the given outputs are generated.
+        All other outputs shall be left untouched.
+
+        Parameters
+        ----------
+        top_node: ``systemrdl.node.AddrmapNode``
+            Node representing the top of the design to be exported
+        options: ``argparse.Namespace``
+            Argparse namespace object containing all the command line argument values.
+        outputs: List[str]
+            Paths of the outputs to generate, as returned by ``get_output_dependencies()``
+        """
+        raise NotImplementedError
+
+
+    def get_output_files(self, top_node: 'AddrmapNode', options: 'argparse.Namespace') -> List[str]:
+        """
+        Override this function to support ``--list-outputs``.
+
+        Returns the paths of all files that ``do_export()`` would write,
+        without writing them.
+
+        By default, these are the outputs returned by
+        ``get_output_dependencies()`` if the exporter supports incremental
+        export.
+
+        Parameters
+        ----------
+        top_node: ``systemrdl.node.AddrmapNode``
+            Node representing the top of the design to be exported
+        options: ``argparse.Namespace``
+            Argparse namespace object containing all the command line argument values.
+        """
+        if self.supports_incremental_export:
+            return list(self.get_output_dependencies(top_node, options))
+        raise NotImplementedError
+
+
+    def get_output_files_from_options(self, options: 'argparse.Namespace') -> Optional[List[str]]: # pylint: disable=unused-argument
+        """
+        Override this function if the paths of the files that ``do_export()``
+        writes only depend on the command line options. This allows
+        ``--list-outputs`` to skip compiling and elaborating the design.
+
+        Returns the paths of all files that would be written, or ``None`` if
+        they depend on the design.
+
+        Parameters
+        ----------
+        options: ``argparse.Namespace``
+            Argparse namespace object containing all the command line argument values.
+        """
+        return None
+
+
+    def get_node_index(self, top_node: 'AddrmapNode') -> node_index.NodeIndex:
+        """
+        Get an index over the nodes of the design, to look them up by path,
+        address or type name without scanning the design.
+
+        The index is built on first use, and shared by all exporters that
+        export the same elaborated design.
+
+        Parameters
+        ----------
+        top_node: ``systemrdl.node.AddrmapNode``
+            Node representing the top of the design to be exported
+        """
+        return node_index.get_node_index(top_node)
+
+
+# Compiled state inherited by forked workers when exporting multiple targets
+_fork_state: Optional[tuple] = None
+
+def _export_target_in_fork(idx: int) -> bool:
+    assert _fork_state is not None
+    subcommand, rdlc, targets, options = _fork_state
+    try:
+        subcommand._export_target(rdlc, targets[idx], options)
+    except RDLCompileError:
+        return False
+    return True
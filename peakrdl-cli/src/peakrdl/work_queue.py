@@ -0,0 +1,269 @@
+from typing import List, Any, Optional
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import threading
+
+
+class Lease:
+    """
+    Exclusive claim on a work unit.
+
+    While held, the lease file's modification time is periodically refreshed
+    by a background heartbeat thread. A lease whose heartbeat stops is
+    considered abandoned once it is older than the queue's lease timeout.
+    """
+    def __init__(self, queue: 'WorkQueue', unit_id: str, path: str, attempt: int, token: str) -> None:
+        self.queue = queue
+        self.unit_id = unit_id
+        self.path = path
+        self.attempt = attempt
+
+        #: Unique token of this claim, stored in the lease file
+        self.token = token
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_heartbeat(self, interval: float) -> None:
+        self._thread = threading.Thread(target=self._heartbeat, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def is_held(self) -> bool:
+        """
+        Whether the lease file still belongs to this claim
+        """
+        return _read_lease_token(self.path) == self.token
+
+    def _heartbeat(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            token = _read_lease_token(self.path)
+            if token is None:
+                # Lease may be briefly moved aside by a worker that checks
+                # whether it is stale
+                continue
+            if token != self.token:
+                # Lease was broken. Never refresh another worker's lease
+                return
+            try:
+                os.utime(self.path)
+            except OSError:
+                return
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if not self.is_held():
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'Lease':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+
+class WorkQueue:
+    """
+    Work queue stored in a shared directory.
+
+    Only requires a filesystem with atomic exclusive-create and rename, so it
+    can be shared by processes on several hosts via a network filesystem.
+
+    Layout::
+
+        DIR/units/<id>.json     Payload of each work unit
+        DIR/leases/<id>.lease   Present while a worker processes the unit
+        DIR/attempts/<id>.<n>   One marker per attempt to process the unit
+        DIR/results/<id>.json   Result of each completed unit
+    """
+    def __init__(self, path: str, lease_timeout: float = 60.0) -> None:
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.units_dir = os.path.join(path, "units")
+        self.leases_dir = os.path.join(path, "leases")
+        self.attempts_dir = os.path.join(path, "attempts")
+        self.results_dir = os.path.join(path, "results")
+
+    def init_dirs(self) -> None:
+        for d in (self.units_dir, self.leases_dir, self.attempts_dir, self.results_dir):
+            os.makedirs(d, exist_ok=True)
+
+    def _unit_path(self, unit_id: str) -> str:
+        return os.path.join(self.units_dir, unit_id + ".json")
+
+    def _lease_path(self, unit_id: str) -> str:
+        return os.path.join(self.leases_dir, unit_id + ".lease")
+
+    def _result_path(self, unit_id: str) -> str:
+        return os.path.join(self.results_dir, unit_id + ".json")
+
+    #---------------------------------------------------------------------------
+    def enqueue(self, unit_id: str, payload: Any) -> None:
+        """
+        Add a work unit to the queue.
+        Any previous result or attempt history of the same unit is discarded.
+        """
+        self.init_dirs()
+        for path in [self._result_path(unit_id)] + self._attempt_paths(unit_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        _write_json_atomic(self._unit_path(unit_id), payload)
+
+    def list_units(self) -> List[str]:
+        if not os.path.isdir(self.units_dir):
+            return []
+        return sorted(
+            filename[:-5] for filename in os.listdir(self.units_dir)
+            if filename.endswith(".json")
+        )
+
+    def get_payload(self, unit_id: str) -> Any:
+        with open(self._unit_path(unit_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_result(self, unit_id: str) -> Optional[Any]:
+        try:
+            with open(self._result_path(unit_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def has_result(self, unit_id: str) -> bool:
+        return os.path.exists(self._result_path(unit_id))
+
+    def pending_units(self) -> List[str]:
+        """
+        Units that do not have a result yet
+        """
+        return [unit_id for unit_id in self.list_units() if not self.has_result(unit_id)]
+
+    #---------------------------------------------------------------------------
+    def _attempt_paths(self, unit_id: str) -> List[str]:
+        if not os.path.isdir(self.attempts_dir):
+            return []
+        prefix = unit_id + "."
+        return [
+            os.path.join(self.attempts_dir, filename)
+            for filename in os.listdir(self.attempts_dir)
+            if filename.startswith(prefix)
+        ]
+
+    def get_attempts(self, unit_id: str) -> int:
+        return len(self._attempt_paths(unit_id))
+
+    def _is_stale(self, lease_path: str) -> bool:
+        try:
+            mtime = os.stat(lease_path).st_mtime
+        except FileNotFoundError:
+            return False
+        return (time.time() - mtime) > self.lease_timeout
+
+    def try_claim(self, unit_id: str, worker_id: str) -> Optional[Lease]:
+        """
+        Attempt to claim a unit.
+        Returns a Lease if successful, or None if the unit is unavailable.
+        """
+        if self.has_result(unit_id):
+            return None
+
+        lease_path = self._lease_path(unit_id)
+        if os.path.exists(lease_path):
+            token = _read_lease_token(lease_path)
+            if not self._is_stale(lease_path):
+                # Held by a live worker
+                return None
+
+            # Holder stopped sending heartbeats. Break the lease.
+            # Rename is atomic, so only one worker can succeed at this.
+            stale_path = f"{lease_path}.stale.{worker_id}"
+            try:
+                os.rename(lease_path, stale_path)
+            except OSError:
+                return None
+
+            # Another worker may have broken the same lease, and claimed the
+            # unit, between the check above and the rename. If so, the lease
+            # that was moved is live. Put it back, and give up.
+            if _read_lease_token(stale_path) != token or not self._is_stale(stale_path):
+                _restore_lease(stale_path, lease_path)
+                return None
+            os.remove(stale_path)
+
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"worker": worker_id, "token": token, "claimed_at": time.time()}, f)
+
+        # Result may have been written between the check above and the claim
+        if self.has_result(unit_id):
+            os.remove(lease_path)
+            return None
+
+        # Record the attempt
+        attempt = self.get_attempts(unit_id) + 1
+        attempt_path = os.path.join(self.attempts_dir, f"{unit_id}.{attempt}")
+        with open(attempt_path, "w", encoding="utf-8") as f:
+            f.write(worker_id)
+
+        return Lease(self, unit_id, lease_path, attempt, token)
+
+    def complete(self, lease: Lease, result: Any) -> None:
+        """
+        Publish the unit's result and release its lease
+        """
+        if not lease.is_held():
+            # Lease was broken, and the unit is now processed by another
+            # worker. Results are deterministic, so publishing it is harmless,
+            # but the other worker's lease is left alone.
+            print(f"warning: Lease of work unit '{lease.unit_id}' was lost while processing it", file=sys.stderr)
+        _write_json_atomic(self._result_path(lease.unit_id), result)
+        lease.release()
+
+
+def _read_lease_token(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("token")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _restore_lease(moved_path: str, lease_path: str) -> None:
+    """
+    Move a lease back into place, unless a new one was created meanwhile
+    """
+    try:
+        # Unlike rename, link does not replace an existing lease
+        os.link(moved_path, lease_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        # Filesystem does not support hard links
+        if not os.path.exists(lease_path):
+            os.rename(moved_path, lease_path)
+            return
+    os.remove(moved_path)
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp.{get_worker_id()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,112 @@
+import os
+import shutil
+from unittest import mock
+
+from systemrdl import RDLCompileError
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.api import Session
+from peakrdl.config.loader import ConfigError
+
+class TestAPI(PeakRDLTestcase):
+    def test_reuse(self):
+        session = Session()
+        path = os.path.join(self.testdata_dir, "variants.rdl")
+        rdlc = session.compile(path)
+        self.assertIs(session.compile([path]), rdlc)
+
+        root1 = session.elaborate(path, parameters={"N": 1})
+        root2 = session.elaborate(path, parameters={"N": 2})
+        self.assertIs(session.elaborate(path, parameters={"N": 1}), root1)
+        self.assertIsNot(root1, root2)
+        self.assertIs(session.compile(path), rdlc)
+
+        session.export("dump", root2.top)
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out, "0x0-0x7: variants.regs[2]\n")
+
+    def test_invalidate(self):
+        path = os.path.join(self.get_output_dir(), "design.rdl")
+        shutil.copyfile(os.path.join(self.testdata_dir, "variants.rdl"), path)
+        session = Session(cache_size=1)
+        rdlc = session.compile(path)
+
+        self.touch(path)
+        self.assertIsNot(session.compile(path), rdlc)
+
+    def test_invalidate_dependencies(self):
+        out_dir = self.get_output_dir()
+        shutil.rmtree(out_dir)
+        shutil.copytree(os.path.join(self.testdata_dir, "lib"), os.path.join(out_dir, "lib"))
+        shutil.copyfile(os.path.join(self.testdata_dir, "lib_top.rdl"), os.path.join(out_dir, "lib_top.rdl"))
+        with open(os.path.join(out_dir, "regs.rdl"), "w", encoding="utf-8") as f:
+            f.write("reg my_reg_t { field {} f; };")
+        path = os.path.join(out_dir, "design.rdl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('`ifndef REGS_RDL\n`define REGS_RDL\n`include "regs.rdl"\n`endif\naddrmap top { my_reg_t x; };')
+
+        session = Session(cache_size=1)
+        with self.subTest("guarded include"):
+            rdlc = session.compile(path)
+            self.touch(os.path.join(out_dir, "regs.rdl"))
+            self.assertIsNot(session.compile(path), rdlc)
+
+        with self.subTest("library file"):
+            lib_top = os.path.join(out_dir, "lib_top.rdl")
+            libdirs = [os.path.join(out_dir, "lib")]
+            rdlc = session.compile(lib_top, libdirs=libdirs)
+            self.assertIs(session.compile(lib_top, libdirs=libdirs), rdlc)
+            self.touch(os.path.join(out_dir, "lib", "base.rdl"))
+            self.assertIsNot(session.compile(lib_top, libdirs=libdirs), rdlc)
+
+    def test_unchanged_files_not_read(self):
+        out_dir = self.get_output_dir()
+        shutil.rmtree(out_dir)
+        shutil.copytree(os.path.join(self.testdata_dir, "lib"), os.path.join(out_dir, "lib"))
+        lib_top = os.path.join(out_dir, "lib_top.rdl")
+        shutil.copyfile(os.path.join(self.testdata_dir, "lib_top.rdl"), lib_top)
+        libdirs = [os.path.join(out_dir, "lib")]
+
+        session = Session()
+        rdlc = session.compile(lib_top, libdirs=libdirs)
+        # Checking whether the design is up to date only stats files
+        with mock.patch("builtins.open", side_effect=AssertionError("file was read")):
+            self.assertIs(session.compile(lib_top, libdirs=libdirs), rdlc)
+
+        with self.subTest("new library file"):
+            with open(os.path.join(out_dir, "lib", "new.rdl"), "w", encoding="utf-8") as f:
+                f.write("reg new_t { field {} f; };")
+            self.assertIsNot(session.compile(lib_top, libdirs=libdirs), rdlc)
+
+    def touch(self, path):
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+    def test_export_output(self):
+        session = Session()
+        root = session.elaborate(os.path.join(self.testdata_dir, "parameters.rdl"), top="elab_params")
+        output = os.path.join(self.get_output_dir(), "out.xml")
+        session.export("ip-xact", root.top, output=output)
+        self.assertTrue(os.path.isfile(output))
+
+        with self.assertRaises(ValueError):
+            session.export("ip-xact", root.top)
+        with self.assertRaises(TypeError):
+            session.export("ip-xact", root.top, output=output, not_an_option=1)
+        with self.assertRaises(ValueError):
+            session.export("not-an-exporter", root.top)
+
+    def test_errors(self):
+        session = Session()
+        path = os.path.join(self.get_output_dir(), "broken.rdl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("this is not valid")
+        with self.assertRaises(RDLCompileError):
+            session.compile(path)
+
+        # Configuration errors are raised, rather than exiting
+        with self.assertRaises(ConfigError):
+            Session(os.path.join(self.testdata_dir, "bad_plugin.toml"))
+        with self.assertRaises(ConfigError):
+            Session(os.path.join(self.testdata_dir, "bad_pythonpath.toml"))
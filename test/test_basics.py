@@ -1,6 +1,8 @@
 import os
 from unittest_utils import PeakRDLTestcase
 
+from peakrdl.main import LAZY_SUBCOMMANDS, load_lazy_subcommand, get_subcommand_arg
+
 class TestBasics(PeakRDLTestcase):
     def test_help(self):
         self.run_commandline(['-h'])
@@ -17,6 +19,32 @@ class TestBasics(PeakRDLTestcase):
         self.assertIn("regblock", captured.out)
         self.assertIn("html", captured.out)
 
+    def test_lazy_subcommands(self):
+        # Placeholders list the same description as the subcommand they stand for
+        for name, (_, _, short_desc) in LAZY_SUBCOMMANDS.items():
+            subcommand = load_lazy_subcommand(name)
+            self.assertEqual(subcommand.name, name)
+            self.assertEqual(subcommand.short_desc, short_desc)
+
+        self.assertIsNone(get_subcommand_arg(["--peakrdl-cfg", "dump"]))
+        self.assertEqual(get_subcommand_arg(["--peakrdl-cfg", "x.toml", "stats", "a.rdl"]), "stats")
+
+    def test_plugin_shadows_builtin(self):
+        # An exporter plugin named like a built-in subcommand replaces it
+        out = os.path.join(self.get_output_dir(), "stats.h")
+        self.run_commandline([
+            "--peakrdl-cfg", os.path.join(self.testdata_dir, "shadow.toml"),
+            "stats", os.path.join(self.testdata_dir, "structural.rdl"),
+            "-o", out,
+        ])
+        with open(out, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "// regblock\n")
+
+        self.run_commandline([
+            "--peakrdl-cfg", os.path.join(self.testdata_dir, "shadow.toml"), "-h",
+        ])
+        self.assertIn("exporter plugin that uses the name", self.capsys.readouterr().out)
+
     def test_parameter_override(self):
         with self.subTest("good"):
             self.run_commandline([
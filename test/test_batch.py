@@ -0,0 +1,165 @@
+import os
+import json
+
+from unittest_utils import PeakRDLTestcase
+
+class TestBatch(PeakRDLTestcase):
+    def load_report(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return {job["name"]: job for job in json.load(f)["jobs"]}
+
+    def test_batch(self):
+        report_path = os.path.join(self.get_output_dir(), "report.json")
+        self.run_commandline([
+            'batch',
+            os.path.join(self.testdata_dir, "batch.toml"),
+            "--report", report_path,
+            "-j", "1",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertIn("[ok] structural ", captured.out)
+        self.assertIn("0x2080-0x2083: regblock.r3", captured.out)
+        self.assertIn("0x0024-0x0027: regblock.r1[0][1][1]", captured.out)
+        self.assertIn("2 unique designs compiled", captured.out)
+
+        report = self.load_report(report_path)
+        self.assertEqual(set(report.keys()), {"structural", "structural_unrolled", "params"})
+        for job in report.values():
+            self.assertEqual(job["status"], "ok")
+        self.assertEqual(len(report["structural"]["exports"]), 2)
+
+        # Resuming skips everything
+        self.run_commandline([
+            'batch',
+            os.path.join(self.testdata_dir, "batch.toml"),
+            "--report", report_path,
+            "--resume",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertNotIn("regblock.r0", captured.out)
+        self.assertIn("3 ok (3 resumed)", captured.out)
+
+    def test_batch_failures(self):
+        out_dir = self.get_output_dir()
+        manifest_path = os.path.join(out_dir, "manifest.toml")
+        report_path = os.path.join(out_dir, "report.json")
+        rdl_path = os.path.join(self.testdata_dir, "structural.rdl").replace("\\", "/")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            f.write(f"""
+[[jobs]]
+name = "good"
+inputs = ["{rdl_path}"]
+exports = [{{exporter = "dump"}}]
+
+[[jobs]]
+name = "bad_exporter"
+inputs = ["{rdl_path}"]
+exports = [{{exporter = "does-not-exist"}}]
+
+[[jobs]]
+name = "bad_top"
+inputs = ["{rdl_path}"]
+top = "nope"
+exports = [{{exporter = "dump"}}]
+""")
+        self.run_commandline([
+            'batch', manifest_path,
+            "--report", report_path,
+            "-j", "2",
+        ], expects_error=True)
+
+        report = self.load_report(report_path)
+        self.assertEqual(report["good"]["status"], "ok")
+        self.assertEqual(report["bad_exporter"]["status"], "failed")
+        self.assertEqual(report["bad_top"]["status"], "failed")
+
+    def test_batch_sweeps(self):
+        out_dir = self.get_output_dir()
+        manifest_path = os.path.join(out_dir, "manifest.toml")
+        report_path = os.path.join(out_dir, "report.json")
+        rdl_path = os.path.join(self.testdata_dir, "variants.rdl").replace("\\", "/")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            f.write(f"""
+[[jobs]]
+name = "sweep"
+inputs = ["{rdl_path}"]
+args = ["-P", "N=1,2"]
+exports = [
+    {{exporter = "dump"}},
+    {{exporter = "dump", args = ["-D", "EXTRA"]}},
+]
+
+[[jobs]]
+name = "bad_incdir"
+inputs = ["{rdl_path}"]
+args = ["-P", "N=1,2"]
+exports = [
+    {{exporter = "dump", args = ["-I", "{out_dir.replace(os.sep, "/")}"]}},
+]
+
+[[jobs]]
+name = "bad_importer_args"
+inputs = ["{rdl_path}"]
+args = ["-P", "N=1"]
+exports = [
+    {{exporter = "dump"}},
+    {{exporter = "dump", args = ["--remap-state", "alt"]}},
+]
+""")
+        self.run_commandline([
+            'batch', manifest_path,
+            "--report", report_path,
+            "-j", "1",
+        ], expects_error=True)
+        captured = self.capsys.readouterr()
+        # Each value of the sweep is exported, with and without the define
+        self.assertEqual(captured.out.count("0x0-0x3: variants.regs[1]"), 2)
+        self.assertEqual(captured.out.count("0x0-0x7: variants.regs[2]"), 2)
+        self.assertEqual(captured.out.count("variants.extra"), 2)
+
+        # Exports that change the compiled inputs are rejected
+        report = self.load_report(report_path)
+        self.assertEqual(report["sweep"]["status"], "ok")
+        self.assertEqual(report["bad_incdir"]["status"], "failed")
+        self.assertIn("Describe it in a separate job", report["bad_incdir"]["error"])
+        self.assertEqual(report["bad_importer_args"]["status"], "failed")
+        self.assertIn("Describe it in a separate job", report["bad_importer_args"]["error"])
+
+    def test_resume_after_edit(self):
+        out_dir = self.get_output_dir()
+        manifest_path = os.path.join(out_dir, "manifest.toml")
+        report_path = os.path.join(out_dir, "report.json")
+        top_path = os.path.join(out_dir, "top.rdl")
+        incl_path = os.path.join(out_dir, "regs.rdl")
+        with open(incl_path, "w", encoding="utf-8") as f:
+            f.write("reg r_t { field {} f; };\n")
+        with open(top_path, "w", encoding="utf-8") as f:
+            f.write('`include "regs.rdl"\naddrmap top { r_t r0; };\n')
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            f.write(f"""
+[[jobs]]
+name = "top"
+inputs = ["{top_path.replace(os.sep, "/")}"]
+exports = [{{exporter = "dump"}}]
+""")
+        argv = ['batch', manifest_path, "--report", report_path, "-j", "1"]
+        self.run_commandline(argv)
+        self.capsys.readouterr()
+
+        self.run_commandline(argv + ["--resume"])
+        captured = self.capsys.readouterr()
+        self.assertIn("1 ok (1 resumed)", captured.out)
+
+        # Editing an included file re-runs the job, even though the manifest
+        # is unchanged
+        with open(incl_path, "w", encoding="utf-8") as f:
+            f.write("reg r_t { regwidth = 64; field {} f; };\n")
+        self.run_commandline(argv + ["--resume"])
+        captured = self.capsys.readouterr()
+        self.assertIn("1 ok (0 resumed)", captured.out)
+        self.assertIn("0x0-0x7: top.r0", captured.out)
+
+    def test_bad_manifest(self):
+        self.run_commandline([
+            'batch', os.path.join(self.testdata_dir, "circular.f"),
+        ], expects_error=True)
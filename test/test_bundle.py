@@ -0,0 +1,41 @@
+import os
+import sys
+import subprocess
+import unittest
+
+from unittest_utils import PeakRDLTestcase
+
+class TestBundle(PeakRDLTestcase):
+    def test_bundle(self):
+        bundle_path = os.path.join(self.get_output_dir(), "peakrdl.pyz")
+        self.run_commandline([
+            'bundle',
+            '-o', bundle_path,
+        ])
+        self.assertTrue(os.path.isfile(bundle_path))
+
+        result = subprocess.run(
+            [sys.executable, "-IS", bundle_path, "dump", os.path.join(self.testdata_dir, "structural.rdl")],
+            capture_output=True, text=True, check=True,
+        )
+        self.assertIn("0x0000-0x0003: regblock.r0", result.stdout)
+
+        result = subprocess.run(
+            [sys.executable, "-IS", bundle_path, "--plugins"],
+            capture_output=True, text=True, check=True,
+        )
+        self.assertIn("ip-xact", result.stdout)
+
+    @unittest.skipIf(os.name == "nt", "Requires a shell script interpreter")
+    def test_python_version_mismatch(self):
+        fake_python = os.path.join(self.get_output_dir(), "python2")
+        with open(fake_python, "w", encoding="utf-8") as f:
+            f.write("#!/bin/sh\necho 2.7\n")
+        os.chmod(fake_python, 0o755)
+
+        bundle_path = os.path.join(self.get_output_dir(), "peakrdl.pyz")
+        self.run_commandline(['bundle', '-o', bundle_path, '--python', fake_python], expects_error=True)
+        self.assertIn("is Python 2.7", self.capsys.readouterr().err)
+
+        self.run_commandline(['bundle', '-o', bundle_path, '--python', os.path.join(self.get_output_dir(), "missing")], expects_error=True)
+        self.assertIn("Unable to determine the version", self.capsys.readouterr().err)
@@ -0,0 +1,226 @@
+import os
+import shutil
+import zipfile
+from unittest.mock import patch
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl import cache
+from peakrdl import libindex
+from peakrdl import argfile
+
+class TestCacheArchive(PeakRDLTestcase):
+    def setUp(self):
+        self.out_dir = self.get_output_dir()
+        shutil.rmtree(self.out_dir)
+        os.makedirs(self.out_dir)
+
+    def tearDown(self):
+        cache.set_project_roots([])
+        cache._argfiles.clear()
+
+    def make_checkout(self, name):
+        path = os.path.join(self.out_dir, name)
+        os.makedirs(path)
+        shutil.copy(os.path.join(self.testdata_dir, "lib_top.rdl"), path)
+        shutil.copytree(os.path.join(self.testdata_dir, "lib"), os.path.join(path, "lib"))
+        with open(os.path.join(path, "peakrdl.toml"), "w", encoding="utf-8") as f:
+            f.write('[peakrdl]\nproject_roots = ["."]\n')
+        return path
+
+    def run_in_checkout(self, checkout, cache_dir, argv):
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": cache_dir}):
+            self.run_commandline(["--peakrdl-cfg", os.path.join(checkout, "peakrdl.toml")] + argv)
+
+    def test_portable_path(self):
+        root = os.path.join(self.out_dir, "project")
+        cache.set_project_roots([root])
+        self.assertEqual(cache.portable_path(os.path.join(root, "rdl", "a.rdl")), "${{project_root0}}/rdl/a.rdl")
+        self.assertEqual(cache.resolve_path("${{project_root0}}/rdl/a.rdl"), os.path.join(root, "rdl", "a.rdl"))
+        # Paths outside of the project are kept absolute
+        other = os.path.join(self.out_dir, "project2", "a.rdl")
+        self.assertEqual(cache.portable_path(other), other)
+        self.assertEqual(
+            cache.make_portable({"files": [os.path.join(root, "a.rdl"), "relative.rdl"], "n": 1}),
+            {"files": ["${{project_root0}}/a.rdl", "relative.rdl"], "n": 1}
+        )
+
+    def test_argfile_anchor(self):
+        # Identical argfiles outside of the project root, in two checkouts
+        argfiles = []
+        for checkout in ("checkout1", "checkout2"):
+            for ip in ("ip_a", "ip_b"):
+                path = os.path.join(self.out_dir, checkout, ip, "files.f")
+                os.makedirs(os.path.dirname(path))
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write("${{this_dir}}/regs.rdl\n")
+                argfiles.append(path)
+
+        def get_portable_paths(checkout):
+            cache._argfiles.clear()
+            cache.set_project_roots([os.path.join(self.out_dir, checkout, "build")])
+            paths = []
+            for path in argfiles:
+                if os.path.join(self.out_dir, checkout) in path:
+                    paths.extend(argfile.parse_argfile(path))
+            return [cache.portable_path(path) for path in paths]
+
+        paths1 = get_portable_paths("checkout1")
+        paths2 = get_portable_paths("checkout2")
+        # Argfiles in different directories do not share an anchor
+        self.assertTrue(all(path.startswith("${{this_dir:") for path in paths1))
+        self.assertNotEqual(paths1[0], paths1[1])
+        # The same argfile in another checkout does
+        self.assertEqual(paths1, paths2)
+
+    def test_export_import(self):
+        checkout1 = self.make_checkout("checkout1")
+        checkout2 = self.make_checkout("checkout2")
+        cache1 = os.path.join(self.out_dir, "cache1")
+        cache2 = os.path.join(self.out_dir, "cache2")
+        archive = os.path.join(self.out_dir, "cache.zip")
+
+        dump_args = ["dump", os.path.join("$DIR", "lib_top.rdl"), "-L", os.path.join("$DIR", "lib")]
+        def dump_argv(checkout):
+            return [arg.replace("$DIR", checkout) for arg in dump_args]
+
+        self.run_in_checkout(checkout1, cache1, dump_argv(checkout1))
+        expected = self.capsys.readouterr().out.replace(checkout1, checkout2)
+
+        self.run_in_checkout(checkout1, cache1, ["cache", "export", archive])
+        self.assertIn("Exported 1 cache entries", self.capsys.readouterr().out)
+        with zipfile.ZipFile(archive) as zf:
+            self.assertTrue(all(name.startswith("libindex/") for name in zf.namelist()))
+
+        self.run_in_checkout(checkout2, cache2, ["cache", "import", archive])
+        self.assertIn("Imported 1 cache entries", self.capsys.readouterr().out)
+
+        # Files in a fresh checkout have different modification times
+        for dirpath, _, filenames in os.walk(checkout2):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                st = os.stat(path)
+                os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        # The index from the other checkout is reused, without rescanning
+        # library files. Only the input file is scanned
+        cache.reset_stats()
+        with patch.object(libindex, "scan_rdl_text", wraps=libindex.scan_rdl_text) as scan:
+            self.run_in_checkout(checkout2, cache2, dump_argv(checkout2))
+        self.assertEqual(scan.call_count, 1)
+        self.assertEqual(cache.get_stats()["libindex"], {"hits": 1, "misses": 0})
+        self.assertEqual(self.capsys.readouterr().out, expected)
+
+    def test_export_namespace(self):
+        cache_dir = os.path.join(self.out_dir, "cache")
+        for ns in ("libindex", "incindex", "incremental"):
+            os.makedirs(os.path.join(cache_dir, ns))
+            with open(os.path.join(cache_dir, ns, "0" * 64 + ".json"), "w", encoding="utf-8") as f:
+                f.write("{}")
+        # Not a cache entry
+        with open(os.path.join(cache_dir, "libindex", "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("")
+
+        archive = os.path.join(self.out_dir, "cache.zip")
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": cache_dir}):
+            self.run_commandline(["cache", "export", archive, "--namespace", "libindex"])
+        with zipfile.ZipFile(archive) as zf:
+            self.assertEqual(zf.namelist(), ["libindex/" + "0" * 64 + ".json"])
+
+        # Include directory listings and incremental export state are only
+        # valid in one checkout, and are never exported
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": cache_dir}):
+            self.run_commandline(["cache", "export", archive])
+        with zipfile.ZipFile(archive) as zf:
+            self.assertEqual(zf.namelist(), ["libindex/" + "0" * 64 + ".json"])
+
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": cache_dir}):
+            self.run_commandline(["cache", "export", archive, "--namespace", "incindex"], expects_error=True)
+
+    def test_import_ignores_other_files(self):
+        archive = os.path.join(self.out_dir, "cache.zip")
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("../escape/" + "0" * 64 + ".json", "{}")
+            zf.writestr("libindex/readme.txt", "")
+            # Pickled entries are only imported from signed archives
+            zf.writestr("imports/" + "2" * 64 + ".pickle", b"")
+            zf.writestr("libindex/" + "3" * 64 + ".pickle", b"")
+            zf.writestr("incindex/" + "4" * 64 + ".json", "{}")
+            zf.writestr("libindex/" + "1" * 64 + ".json", "{}")
+
+        cache_dir = os.path.join(self.out_dir, "cache")
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": cache_dir}):
+            self.run_commandline(["cache", "import", archive])
+        captured = self.capsys.readouterr()
+        self.assertIn("Imported 1 cache entries", captured.out)
+        self.assertIn("Skipped 1 cached importer results", captured.err)
+        self.assertEqual(os.listdir(cache_dir), ["libindex"])
+        self.assertEqual(os.listdir(os.path.join(cache_dir, "libindex")), ["1" * 64 + ".json"])
+        self.assertFalse(os.path.exists(os.path.join(self.out_dir, "escape")))
+
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": cache_dir}):
+            self.run_commandline(["cache", "import", os.path.join(self.out_dir, "missing.zip")], expects_error=True)
+
+    def test_signed_imports(self):
+        xml_path = os.path.join(self.out_dir, "structural.cxml")
+        shutil.copy(os.path.join(self.testdata_dir, "structural.xml"), xml_path)
+        cache1 = os.path.join(self.out_dir, "cache1")
+        cache2 = os.path.join(self.out_dir, "cache2")
+        archive = os.path.join(self.out_dir, "cache.zip")
+
+        def run(cache_dir, argv, key="secret", expects_error=False):
+            env = {"PEAKRDL_CACHE_DIR": cache_dir, "PEAKRDL_CACHE_ARCHIVE_KEY": key}
+            with patch.dict(os.environ, env):
+                self.run_commandline([
+                    "--peakrdl-cfg", os.path.join(self.testdata_dir, "import_cache.toml"),
+                ] + argv, expects_error=expects_error)
+            return self.capsys.readouterr()
+
+        def dump(cache_dir):
+            cache.reset_stats()
+            run(cache_dir, [
+                "dump", xml_path,
+                "--top", "regblock__regblock_mmap__regblock",
+                "--rename", "regblock",
+            ])
+            return cache.get_stats()["imports"]
+
+        self.assertEqual(dump(cache1), {"hits": 0, "misses": 1})
+
+        # Importer results are only exported into signed archives
+        captured = run(cache1, ["cache", "export", archive, "--namespace", "imports"], key="", expects_error=True)
+        self.assertIn("no cache archive key is configured", captured.err)
+        run(cache1, ["cache", "export", archive], key="")
+        with zipfile.ZipFile(archive) as zf:
+            self.assertEqual(zf.namelist(), [])
+        run(cache1, ["cache", "export", archive])
+        with zipfile.ZipFile(archive) as zf:
+            self.assertEqual(len(zf.namelist()), 2)
+            self.assertIn(cache.ARCHIVE_SIGNATURE_NAME, zf.namelist())
+
+        # A different key rejects the whole archive
+        captured = run(cache2, ["cache", "import", archive], key="other", expects_error=True)
+        self.assertIn("signature does not match", captured.err)
+        self.assertFalse(os.path.exists(cache2))
+
+        # Without a key, importer results are skipped
+        captured = run(cache2, ["cache", "import", archive], key="")
+        self.assertIn("Skipped 1 cached importer results", captured.err)
+        self.assertFalse(os.path.exists(cache2))
+
+        captured = run(cache2, ["cache", "import", archive])
+        self.assertIn("Imported 1 cache entries", captured.out)
+        self.assertEqual(dump(cache2), {"hits": 1, "misses": 0})
+
+        # Tampered entries are rejected
+        shutil.rmtree(cache2)
+        tampered = os.path.join(self.out_dir, "tampered.zip")
+        with zipfile.ZipFile(archive) as zf_in, zipfile.ZipFile(tampered, "w") as zf_out:
+            for name in zf_in.namelist():
+                data = zf_in.read(name)
+                if name.startswith("imports/"):
+                    data += b"."
+                zf_out.writestr(name, data)
+        captured = run(cache2, ["cache", "import", tampered], expects_error=True)
+        self.assertIn("signature does not match", captured.err)
+        self.assertFalse(os.path.exists(cache2))
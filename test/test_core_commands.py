@@ -1,6 +1,11 @@
 import os
+
+from systemrdl import RDLCompiler, RDLWalker
+
 from unittest_utils import PeakRDLTestcase
 
+from peakrdl.cmd.dump import DumpListener
+
 class TestCoreCommands(PeakRDLTestcase):
 
     def test_dump(self):
@@ -67,6 +72,74 @@ class TestCoreCommands(PeakRDLTestcase):
         ])
         self.assertEqual(captured.out, expected)
 
+    def test_dump_range(self):
+        with self.subTest("unrolled"):
+            self.run_commandline([
+                'dump',
+                os.path.join(self.testdata_dir, "structural.rdl"),
+                "--unroll", "--range", "0x2050:0x2060",
+            ])
+            captured = self.capsys.readouterr()
+            self.assertEqual(captured.out, "\n".join([
+                "0x2050-0x2053: regblock.sub2[1].sub[0].r1",
+                "0x2054-0x2057: regblock.sub2[1].sub[0].r2[0]",
+                "0x2058-0x205b: regblock.sub2[1].sub[0].r2[1]",
+                "0x205c-0x205f: regblock.sub2[1].sub[0].r3",
+                "0x2060-0x2063: regblock.sub2[1].sub[1].r1",
+                "",
+            ]))
+
+        with self.subTest("arrays"):
+            self.run_commandline([
+                'dump',
+                os.path.join(self.testdata_dir, "structural.rdl"),
+                "--range", "0x0:0x1000",
+            ])
+            captured = self.capsys.readouterr()
+            self.assertEqual(captured.out, "\n".join([
+                "0x0000-0x0003: regblock.r0",
+                "0x0010-0x006f: regblock.r1[2][3][4]",
+                "0x1000-0x1003: regblock.r2",
+                "",
+            ]))
+
+        with self.subTest("invalid"):
+            self.run_commandline([
+                'dump',
+                os.path.join(self.testdata_dir, "structural.rdl"),
+                "--range", "0x10:0x0",
+            ], expects_error=True)
+
+        with self.subTest("listener without index"):
+            rdlc = RDLCompiler()
+            rdlc.compile_file(os.path.join(self.testdata_dir, "structural.rdl"))
+            top_node = rdlc.elaborate().top
+            self.capsys.readouterr()
+            RDLWalker(unroll=False).walk(top_node, DumpListener(4, False, False, (0x1000, 0x2010)))
+            captured = self.capsys.readouterr()
+            self.assertEqual(captured.out, "\n".join([
+                "0x1000-0x1003: regblock.r2",
+                "0x2000-0x200f: regblock.sub2[2].r1[4]",
+                "0x2010-0x2013: regblock.sub2[2].sub[2].r1",
+                "",
+            ]))
+
+    def test_dump_exclude(self):
+        self.run_commandline([
+            'dump',
+            os.path.join(self.testdata_dir, "structural.rdl"),
+            "--exclude", "*.sub",
+            "--exclude", "regblock.r?",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out, "\n".join([
+            "0x2000-0x200f: regblock.sub2[2].r1[4]",
+            "0x2030-0x203f: regblock.sub2[2].r2[4]",
+            "0x3000-0x3003: regblock.rw_reg",
+            "0x3004-0x3007: regblock.rw_reg_lsb0",
+            "",
+        ]))
+
     def test_dump_unroll(self):
         self.run_commandline([
             'dump',
@@ -0,0 +1,57 @@
+import os
+import json
+
+from unittest_utils import PeakRDLTestcase
+
+class TestDiff(PeakRDLTestcase):
+    def setUp(self):
+        self.old = self.write("old.rdl", """
+            reg r_t { field {} f[8] = 0; };
+            addrmap top {
+                r_t a; r_t b; r_t c; r_t d;
+                r_t e @ 0x100;
+                r_t g @ 0x200;
+            };
+        """)
+        self.new = self.write("new.rdl", """
+            reg r_t { field {} f[8] = 0; };
+            addrmap top {
+                r_t a; r_t x; r_t b; r_t c; r_t d;
+                c.f->reset = 1;
+                r_t e2 @ 0x100;
+            };
+        """)
+
+    def write(self, name, text):
+        path = os.path.join(self.get_output_dir(), name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_text(self):
+        self.run_commandline(['diff', self.old, self.new])
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out, "\n".join([
+            "- top.g @ 0x200",
+            "+ top.x @ 0x4",
+            "= top.e renamed to top.e2 @ 0x100",
+            "> 3 registers moved by +0x4: top.b ... top.d",
+            "~ top.c.f: reset 0x0 -> 0x1",
+            "",
+        ]))
+
+    def test_json_snapshot(self):
+        snapshot = os.path.join(self.get_output_dir(), "old.bin")
+        self.run_commandline(['snapshot', self.old, "-o", snapshot])
+        output = os.path.join(self.get_output_dir(), "diff.json")
+        self.run_commandline(['diff', snapshot, self.new, "--format", "json", "-o", output])
+        with open(output, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        self.assertEqual(result["added"], [{"path": "top.x", "address": 4}])
+        self.assertEqual([m["path"] for m in result["moved"]], ["top.b", "top.c", "top.d"])
+        self.assertEqual(result["changed"][0]["changed_fields"], {"f": {"reset": [0, 1]}})
+
+    def test_exit_code(self):
+        self.run_commandline(['diff', self.old, self.old, "--exit-code"])
+        self.assertEqual(self.capsys.readouterr().out, "")
+        self.run_commandline(['diff', self.old, self.new, "--exit-code"], expects_error=True)
@@ -0,0 +1,49 @@
+import os
+import json
+
+from systemrdl import RDLCompiler
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.fingerprint import Fingerprinter
+
+class TestFingerprint(PeakRDLTestcase):
+    def get_fingerprint(self, *args):
+        output = os.path.join(self.get_output_dir(), "fingerprint.json")
+        self.run_commandline(['fingerprint', *args, "-o", output])
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_stable(self):
+        rdl_path = os.path.join(self.testdata_dir, "structural.rdl")
+        fp1 = self.get_fingerprint(rdl_path)
+        fp2 = self.get_fingerprint(rdl_path)
+        self.assertEqual(fp1, fp2)
+        self.assertEqual(
+            set(fp1["subtrees"].keys()),
+            {"regblock", "regblock.sub2[]", "regblock.sub2[].sub[]"}
+        )
+
+    def test_parameters(self):
+        rdl_path = os.path.join(self.testdata_dir, "variants.rdl")
+        fp1 = self.get_fingerprint(rdl_path, "-P", "N=1")
+        fp2 = self.get_fingerprint(rdl_path, "-P", "N=2")
+        fp3 = self.get_fingerprint(rdl_path, "-P", "N=1")
+        self.assertNotEqual(fp1["hash"], fp2["hash"])
+        self.assertEqual(fp1["hash"], fp3["hash"])
+
+    def test_memoized(self):
+        rdlc = RDLCompiler()
+        rdlc.compile_file(os.path.join(self.testdata_dir, "structural.rdl"))
+        top = rdlc.elaborate().top
+
+        fp = Fingerprinter()
+        r0 = fp.get_hash(top.get_child_by_name("r0"))
+        r2 = fp.get_hash(top.get_child_by_name("r2"))
+        r3 = fp.get_hash(top.get_child_by_name("r3"))
+        sub_r1 = fp.get_hash(top.find_by_path("sub2[0].r1"))
+
+        # Same type, but with different resets assigned
+        self.assertNotEqual(r0, r2)
+        # Identical instances of the same type
+        self.assertEqual(r3, sub_r1)
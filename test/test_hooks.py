@@ -0,0 +1,45 @@
+import os
+import sys
+
+from unittest_utils import PeakRDLTestcase
+
+class TestHooks(PeakRDLTestcase):
+    def run_with_hooks(self, argv, **kwargs):
+        self.run_commandline([
+            "--peakrdl-cfg", os.path.join(self.testdata_dir, "hooks.toml"),
+            *argv
+        ], **kwargs)
+        events = sys.modules["recording_hook"].EVENTS
+        result = list(events)
+        events.clear()
+        return result
+
+    def test_lifecycle(self):
+        rdl = os.path.join(self.testdata_dir, "structural.rdl")
+        events = self.run_with_hooks(["dump", rdl])
+        self.assertEqual(events, [
+            ("post_config_load", "hello"),
+            ("pre_compile_file", rdl),
+            ("post_compile_file", rdl),
+            ("pre_elaborate", None),
+            ("post_elaborate", "regblock"),
+            ("pre_export", "dump"),
+            ("post_export", "dump"),
+        ])
+
+        # Failing hooks do not fail the run
+        captured = self.capsys.readouterr()
+        self.assertIn("0x0000-0x0003: regblock.r0", captured.out)
+        self.assertIn("warning: hook 'broken' failed in post_elaborate(): RuntimeError: oops", captured.err)
+
+    def test_not_reused(self):
+        # Hooks from a previously loaded config are not kept
+        self.run_with_hooks(["dump", os.path.join(self.testdata_dir, "structural.rdl")])
+        self.run_commandline(["dump", os.path.join(self.testdata_dir, "structural.rdl")])
+        self.assertEqual(sys.modules["recording_hook"].EVENTS, [])
+
+    def test_plugins_report(self):
+        self.run_with_hooks(["--plugins"])
+        captured = self.capsys.readouterr()
+        self.assertIn("hooks:", captured.out)
+        self.assertIn("recorder --> ", captured.out)
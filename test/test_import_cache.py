@@ -0,0 +1,59 @@
+import os
+import shutil
+from unittest.mock import patch
+
+from unittest_utils import PeakRDLTestcase
+
+class TestImportCache(PeakRDLTestcase):
+    def setUp(self):
+        out_dir = self.get_output_dir()
+        shutil.rmtree(out_dir)
+        os.makedirs(out_dir)
+        self.xml_path = os.path.join(out_dir, "structural.cxml")
+        shutil.copy(os.path.join(self.testdata_dir, "structural.xml"), self.xml_path)
+
+    def dump(self, path, *args):
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": os.path.join(self.get_output_dir(), "cache")}):
+            self.run_commandline([
+                "--peakrdl-cfg", os.path.join(self.testdata_dir, "import_cache.toml"),
+                "dump", path,
+                "--top", "regblock__regblock_mmap__regblock",
+                "--rename", "regblock",
+                *args
+            ])
+        from cached_importer import CachedImporter
+        return CachedImporter.n_imports, self.capsys.readouterr()
+
+    def test_replay(self):
+        n_imports, captured = self.dump(self.xml_path)
+        self.assertEqual(captured.err, "")
+        expected = captured.out
+        self.assertIn("0x2014-0x201b: regblock.sub2[2].sub[2].r2[2]", expected)
+
+        # Second run is replayed from the cache, and produces the same design
+        n, captured = self.dump(self.xml_path)
+        self.assertEqual(n, n_imports)
+        self.assertEqual(captured.err, "")
+        self.assertEqual(captured.out, expected)
+
+        # A copy of the file at a different path also hits
+        other_path = os.path.join(self.get_output_dir(), "copy.cxml")
+        shutil.copy(self.xml_path, other_path)
+        n, captured = self.dump(other_path)
+        self.assertEqual(n, n_imports)
+        self.assertEqual(captured.out, expected)
+
+        # Importer options are part of the key
+        n, captured = self.dump(self.xml_path, "--remap-state", "foo")
+        self.assertEqual(n, n_imports + 1)
+
+    def test_content_change(self):
+        n_imports, captured = self.dump(self.xml_path)
+        with open(self.xml_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        with open(self.xml_path, "w", encoding="utf-8") as f:
+            f.write(content.replace("<ipxact:name>r0</ipxact:name>", "<ipxact:name>r9</ipxact:name>"))
+
+        n, captured = self.dump(self.xml_path)
+        self.assertEqual(n, n_imports + 1)
+        self.assertIn("0x0000-0x0003: regblock.r9", captured.out)
@@ -0,0 +1,75 @@
+import os
+import shutil
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.incindex import IncludeIndex
+
+class TestIncIndex(PeakRDLTestcase):
+    def setUp(self):
+        os.environ["PEAKRDL_CACHE_DIR"] = os.path.join(self.get_output_dir(), "cache")
+
+        self.root = os.path.join(self.get_output_dir(), "incindex")
+        shutil.rmtree(self.root, ignore_errors=True)
+        for name in ("a", "b", "c"):
+            os.makedirs(os.path.join(self.root, name))
+        self.write("a/common.rdl", "reg common_t { field {} a; };")
+        self.write("b/common.rdl", "reg common_t { field {} b; };")
+        self.write("b/b_regs.rdl", '`include "local.rdl"\nreg b_t { field {} f; };')
+        self.write("b/local.rdl", "reg local_t { field {} f; };")
+        self.write("c/unused.rdl", "")
+        self.write("top.rdl", "\n".join([
+            '`include "common.rdl"',
+            '`include <b_regs.rdl>',
+            "addrmap top { common_t common; b_t b; local_t local; };",
+        ]))
+        self.incdirs = [os.path.join(self.root, name) for name in ("a", "b", "c")]
+
+    def tearDown(self):
+        del os.environ["PEAKRDL_CACHE_DIR"]
+
+    def write(self, path, text):
+        with open(os.path.join(self.root, path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_search_paths(self):
+        index = IncludeIndex(self.incdirs)
+        self.assertEqual(
+            index.get_search_paths(os.path.join(self.root, "top.rdl")),
+            self.incdirs[:2]
+        )
+        self.assertEqual(index.get_unused_incdirs(), self.incdirs[2:])
+
+    def test_perl_fallback(self):
+        self.write("perl.rdl", "<% my $x = 1; %>\naddrmap top {};")
+        index = IncludeIndex(self.incdirs)
+        self.assertEqual(
+            index.get_search_paths(os.path.join(self.root, "perl.rdl")),
+            self.incdirs
+        )
+
+    def test_persisted(self):
+        index = IncludeIndex(self.incdirs, persist=True)
+        self.assertFalse(index.is_file(os.path.join(self.incdirs[2], "new.rdl")))
+
+        # Persisted listing is reused while the directory's mtime is unchanged
+        st = os.stat(self.incdirs[2])
+        self.write("c/new.rdl", "")
+        os.utime(self.incdirs[2], ns=(st.st_atime_ns, st.st_mtime_ns))
+        index = IncludeIndex(self.incdirs, persist=True)
+        self.assertFalse(index.is_file(os.path.join(self.incdirs[2], "new.rdl")))
+
+        os.utime(self.incdirs[2], ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        index = IncludeIndex(self.incdirs, persist=True)
+        self.assertTrue(index.is_file(os.path.join(self.incdirs[2], "new.rdl")))
+
+    def test_precedence(self):
+        args = ['dump', os.path.join(self.root, "top.rdl"), "-F", "--report-unused-incdirs"]
+        for incdir in self.incdirs:
+            args.extend(["-I", incdir])
+        self.run_commandline(args)
+        captured = self.capsys.readouterr()
+        self.assertIn("top.common\n\t[0:0] a\n", captured.out)
+        self.assertNotIn("[0:0] b\n", captured.out)
+        self.assertIn(f"Include directory was never used: {self.incdirs[2]}", captured.err)
+        self.assertNotIn(self.incdirs[0], captured.err)
@@ -0,0 +1,100 @@
+import os
+import shutil
+from unittest.mock import patch
+
+from unittest_utils import PeakRDLTestcase
+
+class TestIncremental(PeakRDLTestcase):
+    def setUp(self):
+        shutil.rmtree(self.get_output_dir())
+        self.rdl = os.path.join(self.get_output_dir(), "top.rdl")
+        self.out = os.path.join(self.get_output_dir(), "out")
+        self.write_rdl(0)
+
+    def write_rdl(self, reset):
+        with open(self.rdl, "w", encoding="utf-8") as f:
+            f.write(f"""
+                regfile rf_t {{ reg {{ field {{}} f = 0; }} x; }};
+                addrmap top {{
+                    rf_t a;
+                    regfile {{ reg {{ field {{}} f = {reset}; }} x; }} b;
+                    rf_t c;
+                }};
+            """)
+
+    def export(self, *args, out=None, exporter="pages"):
+        cfg = os.path.join(self.testdata_dir, "incremental.toml")
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": os.path.join(self.get_output_dir(), "cache")}):
+            self.run_commandline([
+                "--peakrdl-cfg", cfg, exporter, self.rdl, "-o", out or self.out, "--incremental", *args
+            ])
+        return sorted(line for line in self.capsys.readouterr().out.splitlines() if line.startswith("wrote"))
+
+    def test_incremental(self):
+        with self.subTest("first run"):
+            self.assertEqual(self.export(), ["wrote a.txt", "wrote b.txt", "wrote c.txt", "wrote top.txt"])
+
+        with self.subTest("unchanged"):
+            self.assertEqual(self.export(), [])
+
+        with self.subTest("changed subtree"):
+            self.write_rdl(1)
+            self.assertEqual(self.export(), ["wrote b.txt", "wrote top.txt"])
+
+        with self.subTest("deleted output"):
+            os.remove(os.path.join(self.out, "c.txt"))
+            self.assertEqual(self.export(), ["wrote c.txt"])
+
+        with self.subTest("full export"):
+            # Outputs of a full export are not tracked, even if the design
+            # changes back to what the stored hashes describe
+            self.write_rdl(0)
+            with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": os.path.join(self.get_output_dir(), "cache")}):
+                self.run_commandline([
+                    "--peakrdl-cfg", os.path.join(self.testdata_dir, "incremental.toml"),
+                    "pages", self.rdl, "-o", self.out
+                ])
+            self.capsys.readouterr()
+            self.write_rdl(1)
+            self.assertEqual(self.export(), ["wrote a.txt", "wrote b.txt", "wrote c.txt", "wrote top.txt"])
+
+        with self.subTest("changed options"):
+            self.assertEqual(self.export("-D", "UNUSED"), ["wrote a.txt", "wrote b.txt", "wrote c.txt", "wrote top.txt"])
+
+    def test_removed_output(self):
+        self.assertEqual(len(self.export()), 4)
+        with open(self.rdl, "w", encoding="utf-8") as f:
+            f.write("""
+                regfile rf_t { reg { field {} f = 0; } x; };
+                addrmap top { rf_t a; };
+            """)
+        with patch.dict(os.environ, {"PEAKRDL_CACHE_DIR": os.path.join(self.get_output_dir(), "cache")}):
+            self.run_commandline([
+                "--peakrdl-cfg", os.path.join(self.testdata_dir, "incremental.toml"),
+                "pages", self.rdl, "-o", self.out, "--incremental"
+            ])
+        captured = self.capsys.readouterr()
+        self.assertIn("removed 2 outputs that are no longer generated", captured.err)
+        self.assertEqual(sorted(os.listdir(self.out)), ["a.txt", "top.txt"])
+
+        # Removed outputs are no longer tracked
+        self.write_rdl(0)
+        self.assertEqual(self.export(), ["wrote b.txt", "wrote c.txt", "wrote top.txt"])
+
+    def test_relative_output(self):
+        cwd = os.getcwd()
+        os.chdir(self.get_output_dir())
+        try:
+            self.assertEqual(len(self.export(out="out")), 4)
+            self.assertEqual(self.export(out="out"), [])
+        finally:
+            os.chdir(cwd)
+
+    def test_output_backend(self):
+        # Options that only control how outputs are written do not invalidate
+        # the previous run
+        self.assertEqual(len(self.export(exporter="backend-pages")), 4)
+        self.assertEqual(self.export(exporter="backend-pages"), [])
+        self.assertEqual(self.export("--write-threads", "2", "--fsync", exporter="backend-pages"), [])
+        self.assertEqual(self.export("--profile-listeners", exporter="backend-pages"), [])
+        self.capsys.readouterr()
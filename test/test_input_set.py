@@ -0,0 +1,71 @@
+import os
+import shutil
+
+from unittest_utils import PeakRDLTestcase
+
+class TestInputSet(PeakRDLTestcase):
+    def setUp(self):
+        self.root = os.path.join(self.get_output_dir(), "inputs")
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, "sub"))
+        self.write("regs.rdl", "reg my_reg_t { field {} f; };")
+        self.write("sub/regs_copy.rdl", "reg my_reg_t { field {} f; };")
+        self.write("common.rdl", "reg common_t { field {} f; };")
+        self.write("block.rdl", '`include "common.rdl"\nreg block_t { field {} f; };')
+        self.write("top.rdl", "addrmap top { my_reg_t a; common_t b; block_t c; };")
+
+    def write(self, path, text):
+        with open(os.path.join(self.root, path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def test_duplicates(self):
+        self.run_commandline([
+            'dump',
+            self.path("regs.rdl"),
+            self.path("sub", "..", "regs.rdl"),
+            self.path("sub", "regs_copy.rdl"),
+            self.path("block.rdl"),
+            self.path("common.rdl"),
+            self.path("top.rdl"),
+        ])
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out, "\n".join([
+            "0x0-0x3: top.a",
+            "0x4-0x7: top.b",
+            "0x8-0xb: top.c",
+            "",
+        ]))
+        self.assertIn("Same file as", captured.err)
+        self.assertIn("Same contents as", captured.err)
+        self.assertIn("Already included by", captured.err)
+
+    def test_list_inputs(self):
+        self.write("broken.rdl", "this is not valid")
+        self.run_commandline([
+            'dump',
+            self.path("broken.rdl"),
+            self.path("regs.rdl"),
+            self.path("sub", "regs_copy.rdl"),
+            self.path("top.rdl"),
+            "--list-inputs",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out, "\n".join([
+            self.path("broken.rdl"),
+            self.path("regs.rdl"),
+            self.path("top.rdl"),
+            "",
+        ]))
+
+        # Also available when listing globals
+        self.run_commandline([
+            'globals', self.path("broken.rdl"), self.path("top.rdl"), "--list-inputs",
+        ])
+        self.assertEqual(self.capsys.readouterr().out, "\n".join([
+            self.path("broken.rdl"),
+            self.path("top.rdl"),
+            "",
+        ]))
@@ -0,0 +1,59 @@
+import os
+import re
+
+from systemrdl import RDLCompiler, RDLWalker, RDLListener
+from systemrdl import walker
+
+from peakrdl.instrument import WalkerProfile
+
+from unittest_utils import PeakRDLTestcase
+
+class TestInstrument(PeakRDLTestcase):
+    def test_profile_listeners(self):
+        orig_walk = RDLWalker.walk
+        self.run_commandline([
+            'dump',
+            os.path.join(self.testdata_dir, "structural.rdl"),
+            "--unroll", "-F", "--profile-listeners",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertIn("0x0000-0x0003: regblock.r0", captured.out)
+
+        calls = {}
+        for line in captured.err.splitlines():
+            m = re.fullmatch(r"\s*[\d.]+\s+(\d+)\s+[\d.]+\s+(\S+)", line)
+            if m:
+                calls[m.group(2)] = int(m.group(1))
+        self.assertEqual(calls["DumpListener.enter_Reg(RegNode)"], 61)
+        self.assertEqual(calls["DumpListener.enter_Field(FieldNode)"], 115)
+        # Callbacks that are not overridden are not timed
+        self.assertNotIn("DumpListener.exit_Reg(RegNode)", calls)
+
+        self.assertRegex(captured.err, r"\s+2\s+regblock\.sub2\[\]\n")
+        self.assertRegex(captured.err, r"\s+4\s+regblock\.sub2\[\]\.sub\[\]\n")
+
+        # Walker is restored afterwards
+        self.assertIs(RDLWalker.walk, orig_walk)
+
+    def test_simple_walker(self):
+        if not hasattr(walker, "RDLSimpleWalker"):
+            self.skipTest("RDLSimpleWalker is not available")
+
+        class RegCounter(RDLListener):
+            def __init__(self):
+                self.count = 0
+
+            def enter_Reg(self, node):
+                self.count += 1
+
+        rdlc = RDLCompiler()
+        rdlc.compile_file(os.path.join(self.testdata_dir, "structural.rdl"))
+        top = rdlc.elaborate().top
+
+        listener = RegCounter()
+        profile = WalkerProfile()
+        with profile.instrument():
+            walker.RDLSimpleWalker(unroll=True).walk(top, listener)
+        self.assertEqual(listener.count, 61)
+        self.assertEqual(profile.callbacks[("RegCounter", "enter_Reg", "RegNode")][0], 61)
+        self.assertEqual(profile.subtrees[id(top.inst)][1], 1)
@@ -0,0 +1,119 @@
+import os
+import json
+import shutil
+from unittest import mock
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.stats import DesignStats
+
+class TestLedger(PeakRDLTestcase):
+    def test_record(self):
+        out_dir = self.get_output_dir()
+        ledger_path = os.path.join(out_dir, "runs.jsonl")
+        if os.path.exists(ledger_path):
+            os.remove(ledger_path)
+        cfg_path = os.path.join(out_dir, "peakrdl.toml")
+        with open(cfg_path, "w", encoding="utf-8") as f:
+            f.write('[peakrdl]\nledger = "runs.jsonl"\n')
+
+        rdl = os.path.join(self.testdata_dir, "structural.rdl")
+        self.run_commandline(["--peakrdl-cfg", cfg_path, "dump", rdl])
+        self.run_commandline(["--peakrdl-cfg", cfg_path, "dump", rdl, "--top", "nope"], expects_error=True)
+        with mock.patch("peakrdl.cmd.dump.Dump.do_export", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                self.run_commandline(["--peakrdl-cfg", cfg_path, "dump", rdl])
+        self.run_commandline(["--peakrdl-cfg", cfg_path, "history", "--format", "json"])
+
+        with open(ledger_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        # History is not recorded itself
+        self.assertEqual(len(records), 3)
+
+        ok, failed, crashed = records
+        self.assertEqual(ok["subcommand"], "dump")
+        self.assertEqual(ok["design"], "regblock")
+        self.assertEqual(ok["exit_code"], 0)
+        self.assertEqual(ok["nodes"], {"declared": 33, "unrolled": 183})
+        self.assertEqual(set(ok["timings"]), {"config", "compile", "elaborate", "export", "total"})
+        self.assertGreater(ok["peak_rss"], 0)
+        self.assertIn("peakrdl", ok["plugins"])
+        self.assertEqual(ok["input_fingerprint"], failed["input_fingerprint"])
+        self.assertEqual(failed["exit_code"], 1)
+        self.assertEqual(crashed["exit_code"], 1)
+
+    def test_batch_record(self):
+        # Batch jobs run in-process reload the plugins, which must keep the ledger
+        out_dir = self.get_output_dir()
+        ledger_path = os.path.join(out_dir, "runs.jsonl")
+        if os.path.exists(ledger_path):
+            os.remove(ledger_path)
+        cfg_path = os.path.join(out_dir, "peakrdl.toml")
+        with open(cfg_path, "w", encoding="utf-8") as f:
+            f.write('[peakrdl]\nledger = "runs.jsonl"\n')
+        queue_dir = os.path.join(out_dir, "queue")
+        shutil.rmtree(queue_dir, ignore_errors=True)
+
+        manifest = os.path.join(self.testdata_dir, "batch.toml")
+        report_path = os.path.join(out_dir, "report.json")
+        self.run_commandline([
+            "--peakrdl-cfg", cfg_path, "batch", manifest, "--report", report_path, "-j", "1",
+        ])
+        self.run_commandline([
+            "--peakrdl-cfg", cfg_path, "batch", manifest, "--report", report_path,
+            "--queue", queue_dir, "--no-wait",
+        ])
+        self.run_commandline(["--peakrdl-cfg", cfg_path, "worker", "--queue", queue_dir])
+
+        with open(ledger_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["subcommand"] for r in records], ["batch", "batch", "worker"])
+        for record in (records[0], records[2]):
+            self.assertEqual(record["design"], "regblock,elab_params")
+            self.assertGreater(record["nodes"]["unrolled"], 0)
+            self.assertGreater(record["timings"]["export"], 0)
+            self.assertIsNotNone(record["input_fingerprint"])
+
+    def test_stats_computed_once(self):
+        # The ledger and the resource limit check share the design's stats
+        out_dir = self.get_output_dir()
+        cfg_path = os.path.join(out_dir, "peakrdl.toml")
+        with open(cfg_path, "w", encoding="utf-8") as f:
+            f.write('[peakrdl]\nledger = "runs.jsonl"\n')
+
+        rdl = os.path.join(self.testdata_dir, "structural.rdl")
+        with mock.patch("peakrdl.stats.DesignStats._visit", autospec=True, side_effect=DesignStats._visit) as visit:
+            self.run_commandline([
+                "--peakrdl-cfg", cfg_path, "dump", rdl, "--max-unrolled-nodes", "1000",
+            ])
+        n_traversals = sum(1 for call in visit.call_args_list if call[0][3] == 1)
+        self.assertEqual(n_traversals, 1)
+
+    def test_history(self):
+        ledger_path = os.path.join(self.get_output_dir(), "runs.jsonl")
+        with open(ledger_path, "w", encoding="utf-8") as f:
+            for i, t in enumerate([1.0, 1.2, 0.8, 1.1, 3.0, 1.0]):
+                f.write(json.dumps({
+                    "time": f"run{i}",
+                    "subcommand": "regblock",
+                    "design": "soc",
+                    "exit_code": 0,
+                    "timings": {"total": t},
+                    "peak_rss": 1000,
+                }) + "\n")
+            f.write("not json\n")
+
+        self.run_commandline(["history", "--ledger", ledger_path, "--format", "json"])
+        result = json.loads(self.capsys.readouterr().out)
+        self.assertEqual(len(result["summary"]), 1)
+        summary = result["summary"][0]
+        self.assertEqual(summary["runs"], 6)
+        self.assertAlmostEqual(summary["p50"], 1.05)
+        self.assertEqual(summary["max"], 3.0)
+        self.assertEqual([r["time"] for r in result["regressions"]], ["run4"])
+
+        self.run_commandline(["history", "--ledger", ledger_path])
+        out = self.capsys.readouterr().out
+        self.assertIn("run4 regblock soc: time 3.000s vs. median 1.050s (2.9x)", out)
+
+        self.run_commandline(["history", "--ledger", "does-not-exist.jsonl"], expects_error=True)
@@ -0,0 +1,77 @@
+import os
+import shutil
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.libindex import LibraryIndex, scan_rdl_text
+
+class TestLibIndex(PeakRDLTestcase):
+    def setUp(self):
+        os.environ["PEAKRDL_CACHE_DIR"] = os.path.join(self.get_output_dir(), "cache")
+
+    def tearDown(self):
+        del os.environ["PEAKRDL_CACHE_DIR"]
+
+    def test_scan(self):
+        definitions, references = scan_rdl_text("""
+            // addrmap commented_t {};
+            reg my_reg_t { field {} f; };
+            addrmap top_t #(longint W = 1) {
+                my_reg_t r; /* other_t x; */
+                desc = "uses fake_t";
+            };
+            property my_udp { type = boolean; component = reg; };
+        """)
+        self.assertEqual(definitions, ["my_reg_t", "top_t", "my_udp"])
+        self.assertIn("my_reg_t", scan_rdl_text("addrmap t { my_reg_t r; };")[1])
+        self.assertNotIn("other_t", references)
+        self.assertNotIn("fake_t", references)
+        self.assertNotIn("commented_t", definitions)
+
+    def test_library_input(self):
+        self.run_commandline([
+            'dump',
+            os.path.join(self.testdata_dir, "lib_top.rdl"),
+            "-L", os.path.join(self.testdata_dir, "lib"),
+        ])
+        captured = self.capsys.readouterr()
+        expected = "\n".join([
+            "0x000-0x003: lib_top.uart0.ctrl",
+            "0x004-0x007: lib_top.uart0.status",
+            "0x100-0x103: lib_top.timer0.ctrl",
+            "",
+        ])
+        self.assertEqual(captured.out, expected)
+
+    def test_library_top(self):
+        self.run_commandline([
+            'dump',
+            "-L", os.path.join(self.testdata_dir, "lib"),
+            "--top", "timer_t",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out, "0x0-0x3: timer_t.ctrl\n")
+
+    def test_no_inputs(self):
+        self.run_commandline([
+            'dump',
+        ], expects_error=True)
+
+    def test_incremental(self):
+        libdir = os.path.join(self.get_output_dir(), "lib")
+        shutil.rmtree(libdir, ignore_errors=True)
+        os.makedirs(libdir)
+        path = os.path.join(libdir, "a.rdl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("reg a_t { field {} f; };")
+
+        index = LibraryIndex([libdir])
+        self.assertEqual(index.definers, {"a_t": os.path.realpath(path)})
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("reg a2_t { field {} f; };\nreg b_t { field {} f; };")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+        index = LibraryIndex([libdir])
+        self.assertEqual(set(index.definers.keys()), {"a2_t", "b_t"})
@@ -0,0 +1,60 @@
+import os
+import json
+
+from unittest_utils import PeakRDLTestcase
+
+class TestListOutputs(PeakRDLTestcase):
+    rdl = os.path.join(PeakRDLTestcase.testdata_dir, "structural.rdl")
+
+    def list_outputs(self, cfg, argv):
+        self.run_commandline([
+            "--peakrdl-cfg", os.path.join(self.testdata_dir, cfg),
+            *argv, "--list-outputs"
+        ])
+        return json.loads(self.capsys.readouterr().out)
+
+    def test_from_design(self):
+        out = os.path.join(self.get_output_dir(), "tree")
+        outputs = self.list_outputs("tree.toml", ["tree", self.rdl, "-o", out])
+        self.assertEqual(outputs, [
+            os.path.join(out, "regblock", "regs.txt"),
+            os.path.join(out, "regblock", "sub2", "regs.txt"),
+            os.path.join(out, "regblock", "sub2", "sub", "regs.txt"),
+            os.path.join(out, "top.bin"),
+        ])
+        # Nothing was exported
+        self.assertFalse(os.path.exists(out))
+
+    def test_incremental_dependencies(self):
+        out = os.path.join(self.get_output_dir(), "pages")
+        outputs = self.list_outputs("incremental.toml", ["pages", self.rdl, "-o", out])
+        self.assertEqual(sorted(outputs), [
+            os.path.join(out, "regblock.txt"),
+            os.path.join(out, "sub.txt"),
+            os.path.join(out, "sub2.txt"),
+        ])
+        self.assertFalse(os.path.exists(out))
+
+    def test_from_options(self):
+        # The design is not compiled, so the input file does not need to exist
+        missing = os.path.join(self.get_output_dir(), "missing.rdl")
+        outputs = self.list_outputs("tree.toml", [
+            "header", missing, "--top", "a", "--top", "b", "-o", "out/{top}.h"
+        ])
+        self.assertEqual(outputs, ["out/a.h", "out/b.h"])
+
+        outputs = self.list_outputs("tree.toml", ["tree", missing, "-o", "out.tar.gz"])
+        self.assertEqual(outputs, ["out.tar.gz"])
+
+    def test_default_top(self):
+        # The name of the default top is only known once compiled
+        outputs = self.list_outputs("tree.toml", ["header", self.rdl, "-o", "{top}.h"])
+        self.assertEqual(outputs, ["regblock.h"])
+
+    def test_not_supported(self):
+        # Outputs depend on the design, but the exporter cannot list them
+        self.run_commandline([
+            "--peakrdl-cfg", os.path.join(self.testdata_dir, "tree.toml"),
+            "header", self.rdl, "-o", self.get_output_dir(), "--list-outputs"
+        ], expects_error=True)
+        self.assertIn("cannot list its outputs", self.capsys.readouterr().err)
@@ -0,0 +1,234 @@
+import os
+import io
+import time
+import shutil
+import argparse
+from unittest import mock
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl import lsp
+from peakrdl import process_input
+
+class TestLSP(PeakRDLTestcase):
+    def setUp(self):
+        self.root = os.path.join(self.get_output_dir(), "design")
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root)
+        self.regs = self.write("regs.rdl", '`include "reg_def.rdl"\n')
+        self.write("reg_def.rdl", "reg my_reg_t { field {} f[8]; };\n")
+        self.top = self.write("top.rdl", "addrmap top {\n    my_reg_t a;\n    my_reg_t b[4];\n};\n")
+
+    def write(self, path, text):
+        path = os.path.realpath(os.path.join(self.root, path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def get_server(self, messages):
+        parser = argparse.ArgumentParser()
+        process_input.add_rdl_compile_arguments(parser)
+        process_input.add_elaborate_arguments(parser)
+        options = parser.parse_args([self.regs, self.top])
+
+        stdin = io.BytesIO()
+        for i, (method, params) in enumerate(messages):
+            lsp.write_message(stdin, {"jsonrpc": "2.0", "id": i, "method": method, "params": params})
+        lsp.write_message(stdin, {"jsonrpc": "2.0", "method": "exit"})
+        stdin.seek(0)
+        stdout = io.BytesIO()
+        workspace = lsp.Workspace([], [], options)
+        self.addCleanup(workspace.close)
+        server = lsp.LanguageServer(workspace, stdin, stdout)
+        return server, stdout
+
+    def get_responses(self, stdout):
+        stdout.seek(0)
+        responses = []
+        while True:
+            message = lsp.read_message(stdout)
+            if message is None:
+                return responses
+            responses.append(message)
+
+    def hover(self, path, line, character):
+        return ("textDocument/hover", {
+            "textDocument": {"uri": lsp.path_to_uri(path)},
+            "position": {"line": line, "character": character},
+        })
+
+    def test_hover(self):
+        server, stdout = self.get_server([
+            ("initialize", {}),
+            ("initialized", {}),
+            self.hover(self.top, 2, 13),
+            ("shutdown", {}),
+        ])
+        self.assertEqual(server.serve(), 0)
+        responses = {r["id"]: r for r in self.get_responses(stdout) if "id" in r}
+        hover = responses[2]["result"]["contents"]["value"]
+        self.assertIn("**top.b[]**", hover)
+        self.assertIn("address: `0x4`", hover)
+        self.assertIn("array: `[4]`, stride `0x4`", hover)
+
+    def test_unsaved_edits(self):
+        broken = "addrmap top {\n    my_reg_t a;\n    not_a_type b;\n};\n"
+        server, stdout = self.get_server([
+            ("initialize", {}),
+            ("initialized", {}),
+            ("textDocument/didOpen", {"textDocument": {"uri": lsp.path_to_uri(self.top), "text": broken}}),
+            ("textDocument/didChange", {
+                "textDocument": {"uri": lsp.path_to_uri(self.top)},
+                "contentChanges": [{"text": "addrmap top {\n    my_reg_t a;\n    my_reg_t c;\n};\n"}],
+            }),
+            self.hover(self.top, 2, 13),
+        ])
+        server.serve()
+
+        # Editing the top-level only recompiles the top-level file
+        self.assertEqual(server.workspace.get_first_affected(self.top), 1)
+        self.assertEqual(server.workspace.get_first_affected(os.path.join(self.root, "reg_def.rdl")), 0)
+
+        responses = self.get_responses(stdout)
+        diagnostics = [
+            r["params"]["diagnostics"] for r in responses
+            if r.get("method") == "textDocument/publishDiagnostics"
+        ]
+        self.assertEqual(len(diagnostics), 2)
+        self.assertEqual(len(diagnostics[0]), 1)
+        self.assertEqual(diagnostics[0][0]["range"]["start"], {"line": 2, "character": 4})
+        self.assertEqual(diagnostics[1], [])
+
+        hover = [r for r in responses if r.get("id") == 4][0]["result"]["contents"]["value"]
+        self.assertIn("**top.c**", hover)
+
+        # Only the edited file is checkpointed, and the file on disk is unchanged
+        self.assertEqual(sorted(server.workspace.checkpoints), [0, 1])
+        with open(self.top, "r", encoding="utf-8") as f:
+            self.assertIn("my_reg_t b[4];", f.read())
+
+    def test_included_edit(self):
+        reg_def = os.path.realpath(os.path.join(self.root, "reg_def.rdl"))
+        server, stdout = self.get_server([
+            ("initialize", {}),
+            ("initialized", {}),
+            ("textDocument/didOpen", {
+                "textDocument": {
+                    "uri": lsp.path_to_uri(reg_def),
+                    "text": "reg my_reg_t { regwidth = 64; field {} f[64]; };\n",
+                },
+            }),
+            self.hover(self.top, 2, 13),
+        ])
+        server.serve()
+        responses = self.get_responses(stdout)
+        hover = [r for r in responses if r.get("id") == 3][0]["result"]["contents"]["value"]
+        self.assertIn("address: `0x8`", hover)
+        self.assertIn("stride `0x8`", hover)
+
+    def test_closed_edit(self):
+        reg_def = os.path.realpath(os.path.join(self.root, "reg_def.rdl"))
+        server, stdout = self.get_server([
+            ("initialize", {}),
+            ("initialized", {}),
+            ("textDocument/didOpen", {
+                "textDocument": {
+                    "uri": lsp.path_to_uri(reg_def),
+                    "text": "reg my_reg_t { regwidth = 64; field {} f[64]; };\n",
+                },
+            }),
+            ("textDocument/didClose", {"textDocument": {"uri": lsp.path_to_uri(reg_def)}}),
+            self.hover(self.top, 2, 13),
+        ])
+        server.serve()
+
+        # Once closed without saving, the file's contents on disk are used again
+        responses = self.get_responses(stdout)
+        hover = [r for r in responses if r.get("id") == 4][0]["result"]["contents"]["value"]
+        self.assertIn("address: `0x4`", hover)
+        with open(reg_def, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "reg my_reg_t { field {} f[8]; };\n")
+
+    def test_closed_checkpoint(self):
+        server, _ = self.get_server([
+            ("initialize", {}),
+            ("initialized", {}),
+            ("textDocument/didOpen", {"textDocument": {"uri": lsp.path_to_uri(self.top), "text": "addrmap top { my_reg_t a; };\n"}}),
+            ("textDocument/didClose", {"textDocument": {"uri": lsp.path_to_uri(self.top)}}),
+        ])
+        server.serve()
+        # Files that are no longer open are not checkpointed
+        self.assertEqual(sorted(server.workspace.checkpoints), [0])
+
+    def test_large_design_edit(self):
+        # Editing the top-level of a large design does not parse, or copy, the
+        # library before it again
+        lines = []
+        for i in range(300):
+            lines.append(f"reg lib_reg{i}_t {{ field {{}} a[8]; field {{ sw=r; hw=w; }} b[8] = {i % 256}; }};")
+        with open(self.regs, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        top_text = "addrmap top {\n    lib_reg0_t a;\n    lib_reg299_t b[4];\n};\n"
+        self.write("top.rdl", top_text)
+
+        server, _ = self.get_server([])
+        workspace = server.workspace
+        t_start = time.perf_counter()
+        workspace.update()
+        t_full = time.perf_counter() - t_start
+        self.assertIsNotNone(workspace.root)
+
+        workspace.buffers[self.top] = top_text
+        workspace.update(self.top)
+        t_edits = []
+        for i in range(5):
+            workspace.buffers[self.top] = top_text.replace("lib_reg0_t", f"lib_reg{i + 1}_t")
+            t_start = time.perf_counter()
+            workspace.update(self.top)
+            t_edits.append(time.perf_counter() - t_start)
+            self.assertEqual(workspace.diagnostics, {})
+            self.assertEqual(workspace.root.find_by_path("top.a").inst.type_name, f"lib_reg{i + 1}_t")
+        self.assertLess(min(t_edits), t_full / 4)
+
+        # Types from before the checkpoint are still known to the namespace
+        workspace.buffers[self.top] = "reg lib_reg0_t { field {} f; };\n" + top_text
+        workspace.update(self.top)
+        self.assertIsNone(workspace.root)
+        messages = [d["message"] for d in workspace.diagnostics[self.top]]
+        self.assertIn("Multiple declarations of type 'lib_reg0_t'", messages)
+
+    def test_internal_error(self):
+        server, stdout = self.get_server([
+            ("initialize", {}),
+            ("initialized", {}),
+            self.hover(self.top, 2, 13),
+            ("textDocument/didSave", {"textDocument": {"uri": lsp.path_to_uri(self.top)}}),
+            ("shutdown", {}),
+        ])
+        with mock.patch.object(server.workspace, "get_hover", side_effect=RuntimeError("hover failed")):
+            with mock.patch.object(server.workspace, "_update_hover_index", side_effect=[None, RuntimeError("update failed")]):
+                # Errors are returned to the client, and the server keeps running
+                self.assertEqual(server.serve(), 0)
+        self.capsys.readouterr()
+
+        responses = self.get_responses(stdout)
+        errors = {r["id"]: r["error"] for r in responses if "error" in r}
+        self.assertEqual(sorted(errors), [2, 3])
+        self.assertEqual(errors[2]["code"], -32603)
+        self.assertIn("hover failed", errors[2]["message"])
+        self.assertIn("update failed", errors[3]["message"])
+        self.assertEqual([r for r in responses if r.get("id") == 4][0]["result"], None)
+
+    def test_notification_error(self):
+        stdin = io.BytesIO()
+        lsp.write_message(stdin, {"jsonrpc": "2.0", "method": "textDocument/didSave", "params": {}})
+        stdin.seek(0)
+        stdout = io.BytesIO()
+        server = lsp.LanguageServer(mock.Mock(), stdin, stdout)
+        server.serve()
+        self.capsys.readouterr()
+
+        # Notifications have no response, so the error is logged by the client
+        responses = self.get_responses(stdout)
+        self.assertEqual(responses[0]["method"], "window/logMessage")
+        self.assertIn("KeyError", responses[0]["params"]["message"])
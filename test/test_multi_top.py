@@ -0,0 +1,95 @@
+import os
+
+from unittest_utils import PeakRDLTestcase
+
+class TestMultiTop(PeakRDLTestcase):
+    def test_repeated_top(self):
+        self.run_commandline([
+            'dump',
+            os.path.join(self.testdata_dir, "parameters.rdl"),
+            "--top", "amap2",
+            "--top", "nested",
+            "--rename", "a",
+            "--rename", "b",
+        ])
+        captured = self.capsys.readouterr()
+        expected = "\n".join([
+            "0x0-0x3: a.reg1",
+            "0x4-0x7: a.reg2",
+            "0x8-0xb: a.reg3",
+            "0x00-0x03: b.rf_inst.r_inst1",
+            "0x04-0x07: b.rf_inst.r_inst2",
+            "0x08-0x0b: b.r1_inst",
+            "0x0c-0x0f: b.r1_inst2",
+            "",
+        ])
+        self.assertEqual(captured.out, expected)
+
+    def test_output_template(self):
+        out_dir = self.get_output_dir()
+        for parallel in ["1", "2"]:
+            with self.subTest(parallel=parallel):
+                os.makedirs(os.path.join(out_dir, parallel), exist_ok=True)
+                self.run_commandline([
+                    'ip-xact',
+                    os.path.join(self.testdata_dir, "parameters.rdl"),
+                    "--top", "amap*",
+                    "--top", "nested",
+                    "--parallel", parallel,
+                    "-o", os.path.join(out_dir, parallel, "{top}.xml"),
+                ])
+                for name in ["amap2", "nested"]:
+                    self.assertTrue(os.path.isfile(os.path.join(out_dir, parallel, f"{name}.xml")))
+
+    def test_errors(self):
+        with self.subTest("missing placeholder"):
+            self.run_commandline([
+                'ip-xact',
+                os.path.join(self.testdata_dir, "parameters.rdl"),
+                "--top", "amap2",
+                "--top", "nested",
+                "-o", os.path.join(self.get_output_dir(), "out.xml"),
+            ], expects_error=True)
+
+        with self.subTest("rename mismatch"):
+            self.run_commandline([
+                'dump',
+                os.path.join(self.testdata_dir, "parameters.rdl"),
+                "--top", "amap2",
+                "--top", "nested",
+                "--rename", "a",
+            ], expects_error=True)
+            self.assertIn("Number of --rename arguments (1) does not match the number of --top arguments (2)", self.capsys.readouterr().err)
+
+        with self.subTest("more renames than tops"):
+            # Outputs are listed without compiling the design
+            out = os.path.join(self.get_output_dir(), "{top}.h")
+            for tops in [[], ["--top", "amap2"]]:
+                self.run_commandline([
+                    "--peakrdl-cfg", os.path.join(self.testdata_dir, "tree.toml"),
+                    'header',
+                    os.path.join(self.testdata_dir, "parameters.rdl"),
+                    *tops,
+                    "--rename", "a",
+                    "--rename", "b",
+                    "-o", out,
+                    "--list-outputs",
+                ], expects_error=True)
+                self.assertIn("does not match the number of --top arguments", self.capsys.readouterr().err)
+
+        with self.subTest("pattern rename mismatch"):
+            self.run_commandline([
+                'dump',
+                os.path.join(self.testdata_dir, "parameters.rdl"),
+                "--top", "amap*",
+                "--rename", "a",
+                "--rename", "b",
+            ], expects_error=True)
+            self.assertIn("does not match the number of tops (1)", self.capsys.readouterr().err)
+
+        with self.subTest("no match"):
+            self.run_commandline([
+                'dump',
+                os.path.join(self.testdata_dir, "parameters.rdl"),
+                "--top", "nope*",
+            ], expects_error=True)
@@ -0,0 +1,144 @@
+import os
+import json
+from unittest import mock
+
+from systemrdl import RDLCompiler
+from systemrdl.node import RegNode
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.api import Session
+from peakrdl.node_index import NodeIndex, get_node_index
+
+class TestNodeIndex(PeakRDLTestcase):
+    def setUp(self):
+        rdlc = RDLCompiler()
+        rdlc.compile_file(os.path.join(self.testdata_dir, "structural.rdl"))
+        self.top = rdlc.elaborate().top
+        self.index = NodeIndex(self.top)
+
+    def test_find_by_path(self):
+        node = self.index.find_by_path("regblock.sub2.sub.r2")
+        self.assertEqual(node.get_path(), "regblock.sub2[].sub[].r2[]")
+        node = self.index.find_by_path("regblock.sub2[1].sub[0].r2[1]")
+        self.assertEqual(node.get_path(), "regblock.sub2[1].sub[0].r2[1]")
+        self.assertEqual(node.absolute_address, 0x2058)
+        self.assertEqual(self.index.find_by_path("regblock.r0.a").get_path(), "regblock.r0.a")
+        self.assertIsNone(self.index.find_by_path("regblock.nope"))
+
+        with self.assertRaises(IndexError):
+            self.index.find_by_path("regblock.sub2[2]")
+        with self.assertRaises(IndexError):
+            self.index.find_by_path("regblock.sub2[-1]")
+        with self.assertRaises(IndexError):
+            self.index.find_by_path("regblock.r0[0]")
+        with self.assertRaises(ValueError):
+            self.index.find_by_path("regblock.r0+")
+
+    def test_find_by_address(self):
+        # Every byte of every register resolves to that register
+        for node in self.top.descendants(unroll=True):
+            if isinstance(node, RegNode):
+                for address in range(node.absolute_address, node.absolute_address + node.size):
+                    self.assertEqual(self.index.find_by_address(address).get_path(), node.get_path())
+
+        # Addresses that no register covers resolve to the deepest container
+        self.assertEqual(self.index.find_by_address(0x4).get_path(), "regblock")
+        self.assertEqual(self.index.find_by_address(0x70).get_path(), "regblock")
+        self.assertIsNone(self.index.find_by_address(0x3008))
+
+    def test_scoped(self):
+        index = NodeIndex(self.index.find_by_path("regblock.sub2[1]"))
+        self.assertEqual(index.nodes[1].get_path(), "regblock.sub2[1].r1[]")
+        self.assertEqual(index.find_by_address(0x205c).get_path(), "regblock.sub2[1].sub[0].r3")
+        self.assertIsNone(index.find_by_address(0x2000))
+        self.assertEqual(index.get_span(index.top_node), (0x2040, 0x207f))
+
+    def test_structure(self):
+        sub = self.index.find_by_path("regblock.sub2.sub")
+        self.assertEqual(
+            [child.inst_name for child in self.index.get_children(sub)],
+            ["r1", "r2", "r3"]
+        )
+        self.assertEqual(self.index.get_parent(sub).get_path(), "regblock.sub2[]")
+        self.assertIsNone(self.index.get_parent(self.top))
+        self.assertEqual(self.index.get_span(sub), (0x2010, 0x206f))
+        self.assertEqual(len(self.index.nodes), 1 + 2 + 11 + 19)
+
+    def test_span_not_indexed(self):
+        # Nodes from outside of the indexed design have their span computed
+        rdlc = RDLCompiler()
+        rdlc.compile_file(os.path.join(self.testdata_dir, "structural.rdl"))
+        other = NodeIndex(rdlc.elaborate().top)
+        sub = other.find_by_path("regblock.sub2.sub")
+        self.assertEqual(self.index.get_span(sub), (0x2010, 0x206f))
+        self.assertEqual(self.index.get_span(other.top_node), self.index.get_span(self.top))
+
+    def test_types(self):
+        self.assertEqual(
+            [node.get_path() for node in self.index.get_instances("my_reg")],
+            ["regblock.r0", "regblock.r1[][][]", "regblock.r2"]
+        )
+        self.assertEqual(self.index.get_instances("not_a_type"), [])
+        self.assertIn("subrf", self.index.type_names)
+
+    def test_shared(self):
+        index = get_node_index(self.top)
+        self.assertIs(get_node_index(self.top), index)
+
+        # A new elaboration gets a new index
+        rdlc = RDLCompiler()
+        rdlc.compile_file(os.path.join(self.testdata_dir, "structural.rdl"))
+        self.assertIsNot(get_node_index(rdlc.elaborate().top), index)
+
+    def test_shared_between_exports(self):
+        session = Session()
+        root = session.elaborate(os.path.join(self.testdata_dir, "structural.rdl"))
+        with mock.patch.object(NodeIndex, "_visit", autospec=True, side_effect=NodeIndex._visit) as visit:
+            session.export("dump", root.top, addr_range=(0, 0x100))
+            session.export("query", root.top, query_types=["subreg"])
+        # The design was only indexed once
+        self.assertEqual(sum(1 for call in visit.call_args_list if call.args[2] is None), 1)
+        self.capsys.readouterr()
+
+
+class TestQuery(PeakRDLTestcase):
+    def query(self, *args):
+        self.run_commandline([
+            "query", os.path.join(self.testdata_dir, "structural.rdl"),
+            "--format", "json", *args
+        ])
+        return json.loads(self.capsys.readouterr().out)
+
+    def test_query(self):
+        results = self.query(
+            "--path", "regblock.sub2[1].sub[0].r2[1]",
+            "--address", "0x2080",
+            "--address", "0x9000",
+            "--type", "my_reg",
+            "--children",
+        )
+        self.assertEqual([result["query"] for result in results], [
+            "path regblock.sub2[1].sub[0].r2[1]",
+            "address 0x2080",
+            "address 0x9000",
+            "type my_reg",
+        ])
+        self.assertEqual(results[0]["matches"], [{
+            "path": "regblock.sub2[1].sub[0].r2[1]",
+            "type": "subreg",
+            "address": 0x2058,
+            "end_address": 0x205b,
+            "children": ["x"],
+        }])
+        self.assertEqual(results[1]["matches"][0]["path"], "regblock.r3")
+        self.assertEqual(results[2]["matches"], [])
+        self.assertEqual(results[3]["matches"][1]["path"], "regblock.r1[][][]")
+        self.assertEqual(results[3]["matches"][1]["address"], 0x10)
+
+    def test_bad_path(self):
+        self.run_commandline([
+            "query", os.path.join(self.testdata_dir, "structural.rdl"),
+            "--path", "regblock.r2[1]",
+        ], expects_error=True)
+        self.assertIn("Index attempted on non-array", self.capsys.readouterr().err)
@@ -0,0 +1,150 @@
+import os
+import time
+import random
+import shutil
+import tarfile
+import zipfile
+import threading
+
+import pytest
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.api import Session
+from peakrdl.output import MemoryOutput, BackgroundWriter, OutputWriteError, normalize_path
+
+EXPECTED_FILES = {
+    "regblock/regs.txt": b"r0 0x0\nr1 0x10\nr2 0x1000\nr3 0x2080\nrw_reg 0x3000\nrw_reg_lsb0 0x3004\n",
+    "regblock/sub2/sub/regs.txt": b"r1 0x2010\nr2 0x2014\nr3 0x201c\n",
+    "top.bin": (0x3008).to_bytes(4, "little"),
+}
+
+class TestOutputBackends(PeakRDLTestcase):
+    cfg = os.path.join(PeakRDLTestcase.testdata_dir, "tree.toml")
+    rdl = os.path.join(PeakRDLTestcase.testdata_dir, "structural.rdl")
+
+    def setUp(self):
+        out_dir = self.get_output_dir()
+        shutil.rmtree(out_dir)
+        os.makedirs(out_dir)
+
+    def export(self, output, *args, **kwargs):
+        self.run_commandline(["--peakrdl-cfg", self.cfg, "tree", self.rdl, "-o", output, *args], **kwargs)
+
+    def check_files(self, files):
+        for path, content in EXPECTED_FILES.items():
+            self.assertEqual(files[path], content)
+        self.assertEqual(len(files), 4)
+
+    def test_directory(self):
+        out = os.path.join(self.get_output_dir(), "out")
+        self.export(out)
+        files = {}
+        for dirpath, _, filenames in os.walk(out):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, out).replace(os.sep, "/")] = f.read()
+        self.check_files(files)
+
+    def test_zip(self):
+        out = os.path.join(self.get_output_dir(), "out.zip")
+        self.export(out)
+        with zipfile.ZipFile(out) as zf:
+            self.check_files({name: zf.read(name) for name in zf.namelist()})
+
+    def test_tar(self):
+        for ext in (".tar", ".tar.gz"):
+            out = os.path.join(self.get_output_dir(), "out" + ext)
+            self.export(out)
+            with tarfile.open(out) as tf:
+                self.check_files({m.name: tf.extractfile(m).read() for m in tf.getmembers()})
+
+    def test_failed_export(self):
+        out = os.path.join(self.get_output_dir(), "out.zip")
+        with pytest.raises(RuntimeError):
+            self.export(out, "--fail")
+        # Partial archives are removed
+        self.assertFalse(os.path.exists(out))
+
+    def test_memory(self):
+        session = Session(cfg_path=self.cfg)
+        root = session.elaborate(self.rdl)
+        backend = MemoryOutput()
+        session.export("tree", root.top, output=backend)
+        self.check_files(backend.files)
+
+        with pytest.raises(ValueError):
+            session.export("dump", root.top, output=MemoryOutput())
+
+    def test_background_writer(self):
+        for ext in ("", ".zip"):
+            out = os.path.join(self.get_output_dir(), "out" + ext)
+            self.export(out, "--write-threads", "4", "--fsync")
+        with zipfile.ZipFile(out) as zf:
+            self.check_files({name: zf.read(name) for name in zf.namelist()})
+        with open(os.path.join(self.get_output_dir(), "out", "regblock", "sub2", "sub", "regs.txt"), "rb") as f:
+            self.assertEqual(f.read(), EXPECTED_FILES["regblock/sub2/sub/regs.txt"])
+
+    def test_background_write_error(self):
+        out = os.path.join(self.get_output_dir(), "out")
+        os.makedirs(out)
+        # Blocks the creation of the 'regblock' directory
+        with open(os.path.join(out, "regblock"), "w", encoding="utf-8") as f:
+            f.write("")
+        self.export(out, "--write-threads", "4", expects_error=True)
+        self.assertIn("Unable to write output file 'regblock/regs.txt'", self.capsys.readouterr().err)
+
+    def test_normalize_path(self):
+        self.assertEqual(normalize_path("a/./b/../c.txt"), "a/c.txt")
+        for path in ("../a.txt", "/a.txt", "a/../..", "."):
+            with pytest.raises(ValueError):
+                normalize_path(path)
+
+
+class SlowOutput(MemoryOutput):
+    """
+    Writes take a random amount of time, and fail for some paths
+    """
+    def __init__(self, fail):
+        super().__init__()
+        self.fail = fail
+        self.aborted = False
+        self.lock = threading.Lock()
+        self.writer = None
+        self.max_pending = 0
+
+    def write(self, path, data, encoding="utf-8"):
+        with self.lock:
+            self.max_pending = max(self.max_pending, self.writer._n_queued - len(self.files))
+        time.sleep(random.random() * 0.002)
+        if path in self.fail:
+            raise OSError("disk full")
+        super().write(path, data, encoding)
+
+    def abort(self):
+        self.aborted = True
+
+
+class TestBackgroundWriter(PeakRDLTestcase):
+    def test_errors_are_deterministic(self):
+        for _ in range(5):
+            backend = SlowOutput(fail={"f10.txt", "f30.txt"})
+            writer = BackgroundWriter(backend, threads=8, max_pending=4)
+            backend.writer = writer
+            for i in range(50):
+                writer.write(f"f{i}.txt", str(i))
+
+            with pytest.raises(OutputWriteError) as exc_info:
+                writer.close()
+            self.assertEqual(exc_info.value.path, "f10.txt")
+            self.assertTrue(backend.aborted)
+            self.assertEqual(len(backend.files), 48)
+            # Back-pressure bounds the number of queued files
+            self.assertLessEqual(backend.max_pending, 4 + 2)
+
+    def test_invalid_path(self):
+        writer = BackgroundWriter(MemoryOutput(), threads=2)
+        with pytest.raises(ValueError):
+            writer.open("../escape.txt")
+        writer.close()
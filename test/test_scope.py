@@ -0,0 +1,82 @@
+import os
+
+from unittest_utils import PeakRDLTestcase
+
+class TestScope(PeakRDLTestcase):
+    def setUp(self):
+        self.rdl = os.path.join(self.get_output_dir(), "soc.rdl")
+        with open(self.rdl, "w", encoding="utf-8") as f:
+            f.write("""
+                reg r_t { field {} f = 0; };
+                addrmap uart { r_t ctrl; r_t status; r_t debug; };
+                addrmap soc {
+                    uart uart0 @ 0x1000;
+                    uart uart1[2] @ 0x2000 += 0x100;
+                    r_t id @ 0x0;
+                };
+            """)
+
+    def dump(self, *args, expects_error=False):
+        self.run_commandline(['dump', self.rdl, *args], expects_error=expects_error)
+        return self.capsys.readouterr().out.splitlines()
+
+    def test_scope(self):
+        with self.subTest("subtree"):
+            self.assertEqual(self.dump("--scope", "soc.uart0"), [
+                "0x1000-0x1003: soc.uart0.ctrl",
+                "0x1004-0x1007: soc.uart0.status",
+                "0x1008-0x100b: soc.uart0.debug",
+            ])
+
+        with self.subTest("array element"):
+            self.assertEqual(self.dump("--scope", "soc.uart1[1]", "--exclude", "*.debug", "--unroll"), [
+                "0x2100-0x2103: soc.uart1[1].ctrl",
+                "0x2104-0x2107: soc.uart1[1].status",
+            ])
+
+        with self.subTest("not found"):
+            self.dump("--scope", "soc.uart2", expects_error=True)
+
+        with self.subTest("not an addrmap"):
+            self.dump("--scope", "soc.id", expects_error=True)
+
+    def test_exclude_restored(self):
+        # Exports in a batch share the same elaborated design. Excluded nodes
+        # shall not leak into later exports
+        manifest = os.path.join(self.get_output_dir(), "batch.toml")
+        rdl_path = self.rdl.replace("\\", "/")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(f"""
+[[jobs]]
+name = "soc"
+inputs = ["{rdl_path}"]
+exports = [
+    {{exporter = "dump", args = ["--exclude", "soc.uart*"]}},
+    {{exporter = "dump"}},
+]
+""")
+        self.run_commandline(['batch', manifest, "-j", "1"])
+        out = self.capsys.readouterr().out
+        self.assertEqual(out.count("soc.id"), 2)
+        self.assertEqual(out.count("soc.uart0.ctrl"), 1)
+
+    def test_exclude_shared_index(self):
+        # Exports of the same elaborated design share its node index. An index
+        # of a pruned design shall not be reused by later exports
+        manifest = os.path.join(self.get_output_dir(), "batch.toml")
+        rdl_path = self.rdl.replace("\\", "/")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(f"""
+[[jobs]]
+name = "soc"
+inputs = ["{rdl_path}"]
+exports = [
+    {{exporter = "dump", args = ["--exclude", "soc.uart*", "--range", "0:0xffff"]}},
+    {{exporter = "dump", args = ["--range", "0x1000:0x1fff"]}},
+]
+""")
+        self.run_commandline(['batch', manifest, "-j", "1"])
+        out = self.capsys.readouterr().out.splitlines()
+        self.assertIn("0x0000-0x0003: soc.id", out)
+        self.assertIn("0x1000-0x1003: soc.uart0.ctrl", out)
+        self.assertEqual(sum("soc.uart0" in line for line in out), 3)
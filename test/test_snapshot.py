@@ -0,0 +1,72 @@
+import os
+
+from systemrdl import RDLCompiler
+from systemrdl.node import RegNode
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.snapshot import SnapshotReader
+
+class TestSnapshot(PeakRDLTestcase):
+    def test_snapshot(self):
+        rdl_path = os.path.join(self.testdata_dir, "structural.rdl")
+        output = os.path.join(self.get_output_dir(), "map.bin")
+        self.run_commandline(['snapshot', rdl_path, "-o", output])
+
+        rdlc = RDLCompiler()
+        rdlc.compile_file(rdl_path)
+        top = rdlc.elaborate().top
+        expected = {}
+        for node in top.descendants(unroll=True):
+            if isinstance(node, RegNode):
+                path = node.get_path(array_suffix="[]")
+                expected.setdefault(path, []).append(node.absolute_address)
+
+        with SnapshotReader(output) as snapshot:
+            actual = {}
+            for idx in snapshot.iter_registers():
+                actual[snapshot.get_path(idx)] = list(snapshot.iter_addresses(idx))
+            self.assertEqual(actual, expected)
+
+            r1 = snapshot.find("regblock.r1")
+            self.assertEqual(snapshot.get_dims(r1), (2, 3, 4))
+            self.assertEqual(snapshot.get_node(r1).array_stride, 4)
+
+            r0 = snapshot.find("regblock.r0")
+            fields = {snapshot.get_string(f.name): f for f in snapshot.iter_fields(r0)}
+            self.assertEqual(fields["a"].reset, 0x42)
+            self.assertEqual((fields["c"].lsb, fields["c"].width), (31, 1))
+
+            sub = snapshot.find("regblock.sub2[].sub[].r2")
+            self.assertEqual(snapshot.get_kind(sub), "reg")
+            self.assertIsNone(snapshot.find("regblock.not_a_node"))
+
+    def test_wide_reset(self):
+        rdl_path = os.path.join(self.get_output_dir(), "wide.rdl")
+        output = os.path.join(self.get_output_dir(), "wide.bin")
+        with open(rdl_path, "w", encoding="utf-8") as f:
+            f.write("""
+                addrmap top {
+                    reg {
+                        regwidth = 128;
+                        field {} narrow[8] = 0x5;
+                        field {} wide[100] = 0xF000000000000000000000A;
+                        field {} no_reset[8];
+                    } wide_r;
+                };
+            """)
+        self.run_commandline(['snapshot', rdl_path, "-o", output])
+
+        with SnapshotReader(output) as snapshot:
+            r = snapshot.find("top.wide_r")
+            fields = {snapshot.get_string(f.name): f for f in snapshot.iter_fields(r)}
+            self.assertEqual(snapshot.get_reset(fields["narrow"]), 0x5)
+            self.assertEqual(snapshot.get_reset(fields["wide"]), 0xF000000000000000000000A)
+            self.assertIsNone(snapshot.get_reset(fields["no_reset"]))
+
+    def test_bad_file(self):
+        path = os.path.join(self.get_output_dir(), "bad.bin")
+        with open(path, "wb") as f:
+            f.write(b"not a snapshot" * 10)
+        with self.assertRaises(ValueError):
+            SnapshotReader(path)
@@ -0,0 +1,45 @@
+import os
+import json
+
+from unittest_utils import PeakRDLTestcase
+
+class TestStats(PeakRDLTestcase):
+    def test_stats(self):
+        self.run_commandline([
+            'stats',
+            os.path.join(self.testdata_dir, "structural.rdl"),
+            "--format", "json",
+        ])
+        stats = json.loads(self.capsys.readouterr().out)
+        self.assertEqual(stats["declared"], {
+            "addrmaps": 1, "regfiles": 2, "mems": 0, "registers": 11, "fields": 19,
+        })
+        self.assertEqual(stats["unrolled"], {
+            "addrmaps": 1, "regfiles": 6, "mems": 0, "registers": 61, "fields": 115,
+        })
+        self.assertEqual(stats["max_expansion"], 24)
+        self.assertEqual(stats["depth"], 5)
+        self.assertEqual(stats["address_span"], 0x3008)
+        self.assertAlmostEqual(stats["density"], 61 * 4 / 0x3008)
+
+    def test_limits(self):
+        rdl = os.path.join(self.testdata_dir, "structural.rdl")
+        with self.subTest("nodes ok"):
+            self.run_commandline(['dump', rdl, "--max-unrolled-nodes", "183"])
+            self.assertIn("regblock.r0", self.capsys.readouterr().out)
+
+        with self.subTest("nodes exceeded"):
+            self.run_commandline(['dump', rdl, "--max-unrolled-nodes", "182"], expects_error=True)
+            captured = self.capsys.readouterr()
+            self.assertEqual(captured.out, "")
+            self.assertIn("exceeds --max-unrolled-nodes 182", captured.err)
+
+        with self.subTest("memory exceeded"):
+            self.run_commandline(['dump', rdl, "--max-memory", "64KiB"], expects_error=True)
+            self.assertIn("exceeds --max-memory 64.0 KiB", self.capsys.readouterr().err)
+
+        with self.subTest("memory ok"):
+            self.run_commandline(['dump', rdl, "--max-memory", "1G"])
+
+        with self.subTest("invalid size"):
+            self.run_commandline(['dump', rdl, "--max-memory", "lots"], expects_error=True)
@@ -0,0 +1,81 @@
+import os
+from unittest import mock
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl import process_input
+
+class TestVariants(PeakRDLTestcase):
+    def test_parameter_sweep(self):
+        self.run_commandline([
+            'dump',
+            os.path.join(self.testdata_dir, "variants.rdl"),
+            "-P", "N=1,2",
+        ])
+        captured = self.capsys.readouterr()
+        expected = "\n".join([
+            "0x0-0x3: variants.regs[1]",
+            "0x0-0x7: variants.regs[2]",
+            "",
+        ])
+        self.assertEqual(captured.out, expected)
+
+    def test_sweep_output_template(self):
+        out_dir = self.get_output_dir()
+        self.run_commandline([
+            'ip-xact',
+            os.path.join(self.testdata_dir, "parameters.rdl"),
+            "--top", "elab_params",
+            "-P", "INT=1,2",
+            "-P", "INTARR='{3,2},'{1,1}",
+            "-o", os.path.join(out_dir, "{variant}.xml"),
+        ])
+        for name in ["INT1_INTARR32", "INT1_INTARR11", "INT2_INTARR32", "INT2_INTARR11"]:
+            self.assertTrue(os.path.isfile(os.path.join(out_dir, f"{name}.xml")))
+
+        with self.subTest("output collision"):
+            self.run_commandline([
+                'ip-xact',
+                os.path.join(self.testdata_dir, "parameters.rdl"),
+                "--top", "elab_params",
+                "-P", "INT=1,2",
+                "-o", os.path.join(out_dir, "{INTARR}.xml"),
+            ], expects_error=True)
+
+    def test_cfg_variants(self):
+        self.run_commandline([
+            "--peakrdl-cfg", os.path.join(self.testdata_dir, "variants.toml"),
+            'dump',
+            os.path.join(self.testdata_dir, "variants.rdl"),
+            "--variant", "*",
+            "--parallel", "2",
+        ])
+        captured = self.capsys.readouterr()
+        self.assertIn("0x0-0x3: variants.regs[1]", captured.out)
+        self.assertIn("0x00-0x0f: variants.regs[4]", captured.out)
+        self.assertIn("0x10-0x13: variants.extra", captured.out)
+
+        with self.subTest("undefined variant"):
+            self.run_commandline([
+                "--peakrdl-cfg", os.path.join(self.testdata_dir, "variants.toml"),
+                'dump',
+                os.path.join(self.testdata_dir, "variants.rdl"),
+                "--variant", "huge",
+            ], expects_error=True)
+
+    def test_shared_files(self):
+        # Files that do not depend on the variant defines are only parsed once
+        lib = os.path.join(self.testdata_dir, "variants_lib.rdl")
+        top = os.path.join(self.testdata_dir, "variants_top.rdl")
+        with mock.patch.object(process_input, "load_file", wraps=process_input.load_file) as load_file:
+            self.run_commandline([
+                "--peakrdl-cfg", os.path.join(self.testdata_dir, "variants.toml"),
+                'dump', lib, top,
+                "--variant", "*",
+            ])
+        loaded = [call.args[2] for call in load_file.call_args_list]
+        self.assertEqual(loaded, [lib, top, top])
+        captured = self.capsys.readouterr()
+        self.assertEqual(captured.out.count("variants_top.a"), 2)
+        self.assertEqual(captured.out.count("variants_top.extra"), 1)
+
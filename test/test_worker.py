@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+from unittest import mock
+
+from unittest_utils import PeakRDLTestcase
+
+from peakrdl.work_queue import WorkQueue
+
+class TestWorker(PeakRDLTestcase):
+    def get_queue_dir(self):
+        path = os.path.join(self.get_output_dir(), "queue")
+        shutil.rmtree(path, ignore_errors=True)
+        return path
+
+    def test_distributed(self):
+        queue_dir = self.get_queue_dir()
+        report_path = os.path.join(self.get_output_dir(), "report.json")
+        os.makedirs(queue_dir)
+
+        workers = [
+            subprocess.Popen(
+                [
+                    sys.executable, "-m", "peakrdl", "worker",
+                    "--queue", queue_dir,
+                    "--idle-timeout", "30",
+                    "--poll-interval", "0.1",
+                ],
+                stdout=subprocess.DEVNULL,
+                cwd=self.this_dir,
+            )
+            for _ in range(3)
+        ]
+        try:
+            self.run_commandline([
+                'batch',
+                os.path.join(self.testdata_dir, "batch.toml"),
+                "--report", report_path,
+                "--queue", queue_dir,
+            ])
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.wait()
+
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertEqual(len(report["jobs"]), 3)
+        for job in report["jobs"]:
+            self.assertEqual(job["status"], "ok")
+            self.assertIn("worker", job)
+
+    def test_stale_lease(self):
+        queue = WorkQueue(self.get_queue_dir(), lease_timeout=30)
+        queue.enqueue("unit", [])
+
+        lease = queue.try_claim("unit", "w1")
+        self.assertIsNotNone(lease)
+        self.assertEqual(lease.attempt, 1)
+
+        # Held by a live worker
+        self.assertIsNone(queue.try_claim("unit", "w2"))
+
+        # Holder stops sending heartbeats
+        os.utime(lease.path, (0, 0))
+        lease2 = queue.try_claim("unit", "w2")
+        self.assertIsNotNone(lease2)
+        self.assertEqual(lease2.attempt, 2)
+
+        queue.complete(lease2, ["done"])
+        self.assertEqual(queue.pending_units(), [])
+        self.assertEqual(queue.get_result("unit"), ["done"])
+        self.assertIsNone(queue.try_claim("unit", "w3"))
+
+    def test_lease_break_race(self):
+        queue = WorkQueue(self.get_queue_dir(), lease_timeout=30)
+        queue.enqueue("unit", [])
+        lease = queue.try_claim("unit", "w1")
+        os.utime(lease.path, (0, 0))
+
+        # w2 sees the stale lease. Before it moves it aside, w3 breaks it and
+        # claims the unit
+        real_rename = os.rename
+        lease3 = []
+        def rename(src, dst):
+            if not lease3:
+                lease3.append(None)
+                lease3[0] = queue.try_claim("unit", "w3")
+            real_rename(src, dst)
+
+        with mock.patch("os.rename", side_effect=rename):
+            self.assertIsNone(queue.try_claim("unit", "w2"))
+
+        # w3's live lease was put back
+        self.assertIsNotNone(lease3[0])
+        self.assertTrue(lease3[0].is_held())
+        self.assertFalse(lease.is_held())
+        self.assertEqual(os.listdir(queue.leases_dir), ["unit.lease"])
+
+        # Releasing the broken lease does not remove w3's lease
+        lease.release()
+        self.assertTrue(lease3[0].is_held())
+
+    def test_abandoned(self):
+        queue_dir = self.get_queue_dir()
+        self.run_commandline([
+            'batch',
+            os.path.join(self.testdata_dir, "batch.toml"),
+            "--report", os.path.join(self.get_output_dir(), "report.json"),
+            "--queue", queue_dir,
+            "--no-wait",
+        ])
+        self.run_commandline([
+            'worker',
+            "--queue", queue_dir,
+            "--max-attempts", "0",
+        ])
+        queue = WorkQueue(queue_dir)
+        for unit_id in queue.list_units():
+            for result in queue.get_result(unit_id):
+                self.assertEqual(result["status"], "failed")
@@ -0,0 +1,21 @@
+from peakrdl_ipxact.__peakrdl__ import Importer
+
+class CachedImporter(Importer):
+    file_extensions = ["cxml"]
+    supports_import_cache = True
+
+    n_imports = 0
+
+    def is_compatible(self, path: str) -> bool:
+        return True
+
+    def add_importer_arguments(self, arg_group):
+        # Reuse the arguments of the IP-XACT importer
+        pass
+
+    def get_import_cache_options(self, options):
+        return {"remap_state": options.remap_state}
+
+    def do_import(self, rdlc, options, path):
+        type(self).n_imports += 1
+        super().do_import(rdlc, options, path)
@@ -0,0 +1,43 @@
+import os
+
+from systemrdl.node import AddrmapNode, RegfileNode
+from peakrdl.plugins.exporter import ExporterSubcommandPlugin
+
+class PageExporter(ExporterSubcommandPlugin):
+    short_desc = "write one page per block"
+    supports_incremental_export = True
+
+    def get_output_dependencies(self, top_node, options):
+        outputs = {}
+        for node in top_node.descendants(unroll=False, in_post_order=False):
+            if isinstance(node, (AddrmapNode, RegfileNode)):
+                outputs[os.path.join(options.output, node.inst_name + ".txt")] = node
+        outputs[os.path.join(options.output, top_node.inst_name + ".txt")] = top_node
+        return outputs
+
+    def do_export_outputs(self, top_node, options, outputs):
+        os.makedirs(options.output, exist_ok=True)
+        for path, node in self.get_output_dependencies(top_node, options).items():
+            if path not in outputs:
+                continue
+            with open(path, "w", encoding="utf-8") as f:
+                for reg in node.registers(unroll=False):
+                    f.write(f"{reg.inst_name} {reg.raw_absolute_address:#x}\n")
+            print(f"wrote {os.path.basename(path)}")
+
+    def do_export(self, top_node, options):
+        self.do_export_outputs(top_node, options, list(self.get_output_dependencies(top_node, options)))
+
+
+class BackendPageExporter(PageExporter):
+    short_desc = "write one page per block, through the output backend"
+    supports_output_backend = True
+
+    def do_export_outputs(self, top_node, options, outputs):
+        for path, node in self.get_output_dependencies(top_node, options).items():
+            if path not in outputs:
+                continue
+            with options.output_backend.open(os.path.relpath(path, options.output)) as f:
+                for reg in node.registers(unroll=False):
+                    f.write(f"{reg.inst_name} {reg.raw_absolute_address:#x}\n")
+            print(f"wrote {os.path.basename(path)}")
@@ -0,0 +1,35 @@
+from peakrdl.plugins.hooks import HookPlugin
+from peakrdl.config import schema
+
+#: Callbacks received by all RecordingHook instances
+EVENTS = []
+
+class RecordingHook(HookPlugin):
+    cfg_schema = {"label": schema.String()}
+
+    def post_config_load(self, cfg, elapsed):
+        EVENTS.append(("post_config_load", self.cfg["label"]))
+
+    def pre_compile_file(self, path):
+        EVENTS.append(("pre_compile_file", path))
+
+    def post_compile_file(self, path, elapsed):
+        EVENTS.append(("post_compile_file", path))
+
+    def pre_elaborate(self, top_def_name):
+        EVENTS.append(("pre_elaborate", top_def_name))
+
+    def post_elaborate(self, top_node, elapsed):
+        EVENTS.append(("post_elaborate", top_node.inst_name))
+
+    def pre_export(self, subcommand, top_node, options):
+        EVENTS.append(("pre_export", subcommand.name))
+
+    def post_export(self, subcommand, top_node, options, elapsed):
+        assert elapsed >= 0
+        EVENTS.append(("post_export", subcommand.name))
+
+
+class BrokenHook(HookPlugin):
+    def post_elaborate(self, top_node, elapsed):
+        raise RuntimeError("oops")
@@ -0,0 +1,52 @@
+import os
+
+from systemrdl.node import AddrmapNode, RegfileNode
+from peakrdl.plugins.exporter import ExporterSubcommandPlugin
+
+class TreeExporter(ExporterSubcommandPlugin):
+    short_desc = "write one file per block, through the output backend"
+    supports_output_backend = True
+
+    def add_exporter_arguments(self, arg_group):
+        arg_group.add_argument("--fail", action="store_true", default=False)
+
+    def get_blocks(self, top_node):
+        for node in [top_node] + list(top_node.descendants(unroll=False)):
+            if isinstance(node, (AddrmapNode, RegfileNode)):
+                yield node.get_path(hier_separator="/", empty_array_suffix="") + "/regs.txt", node
+
+    def get_output_files(self, top_node, options):
+        paths = [path for path, _ in self.get_blocks(top_node)] + ["top.bin"]
+        return [os.path.join(options.output, *path.split("/")) for path in paths]
+
+    def do_export(self, top_node, options):
+        backend = options.output_backend
+        for path, node in self.get_blocks(top_node):
+            with backend.open(path) as f:
+                for reg in node.registers(unroll=False):
+                    f.write(f"{reg.inst_name} {reg.raw_absolute_address:#x}\n")
+            if options.fail:
+                raise RuntimeError("export failed")
+        backend.write("top.bin", top_node.size.to_bytes(4, "little"))
+
+
+class HeaderExporter(ExporterSubcommandPlugin):
+    short_desc = "write a single file whose path only depends on the options"
+
+    def get_output_files_from_options(self, options):
+        if not options.output.endswith(".h"):
+            # Header is written into a directory, named after the top node
+            return None
+        return [options.output]
+
+    def do_export(self, top_node, options):
+        path = options.output
+        if not path.endswith(".h"):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, f"{top_node.inst_name}.h")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"// {top_node.inst_name}\n")
+
+
+class StatsExporter(HeaderExporter):
+    short_desc = "exporter plugin that uses the name of a built-in subcommand"